@@ -0,0 +1,61 @@
+"""Block splitting and classification speed of parse_blocks against the
+previous split-on-blank-lines-then-classify approach.
+
+Run from the repository root with: python3 src/bench_block_markdown.py
+"""
+import time
+
+from block_markdown import block_to_blocktype, parse_blocks
+
+
+def markdown_to_typed_blocks_multipass(markdown):
+    blocks = []
+    for block in markdown.split("\n\n"):
+        block = block.strip()
+        if block == "":
+            continue
+        blocks.append((block, block_to_blocktype(block)))
+    return blocks
+
+
+def synthetic_document(target_bytes):
+    sections = [
+        "## Section heading",
+        "A paragraph with **bold** text and a [link](/somewhere)\nthat continues on a second line.",
+        "- first item\n- second item\n- third item\n- fourth item",
+        "1. one\n2. two\n3. three\n4. four\n5. five",
+        "> quoted line\n> another quoted line",
+        "```\nfor i in range(10):\n    print(i)\n```",
+    ]
+    parts = ["# Title"]
+    size = len(parts[0])
+    while size < target_bytes:
+        section = sections[len(parts) % len(sections)]
+        parts.append(section)
+        size += len(section) + 2
+    return "\n\n".join(parts)
+
+
+def measure(function, text, min_seconds=1.0):
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        function(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / runs
+
+
+def main():
+    print(f"{'document':>10}{'multipass ms':>15}{'single scan ms':>17}{'speedup':>10}")
+    for megabytes in (1, 4):
+        markdown = synthetic_document(megabytes * 1_000_000)
+        assert [(block.text, block.block_type) for block in parse_blocks(markdown)] == markdown_to_typed_blocks_multipass(markdown)
+        multipass = measure(markdown_to_typed_blocks_multipass, markdown)
+        single_scan = measure(parse_blocks, markdown)
+        print(f"{str(megabytes) + ' MB':>10}{multipass * 1000:>15.1f}{single_scan * 1000:>17.1f}{multipass / single_scan:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
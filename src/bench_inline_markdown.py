@@ -0,0 +1,55 @@
+"""Throughput of text_to_textnodes against the previous multi-pass pipeline.
+
+Run from the repository root with: python3 src/bench_inline_markdown.py
+"""
+import time
+
+from inline_markdown import split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType
+
+
+def text_to_textnodes_multipass(text):
+    textnodes = [TextNode(text, TextType.TEXT)]
+    textnodes = split_nodes_delimiter(textnodes, '**', TextType.BOLD)
+    textnodes = split_nodes_delimiter(textnodes, '_', TextType.ITALIC)
+    textnodes = split_nodes_delimiter(textnodes, '`', TextType.CODE)
+    textnodes = split_nodes_image(textnodes)
+    return split_nodes_link(textnodes)
+
+
+def link_heavy_paragraph(count):
+    return " ".join(f"see [page {i}](/blog/page-{i}) and ![figure {i}](/images/figure-{i}.png)" for i in range(count))
+
+
+def emphasis_heavy_paragraph(count):
+    return " ".join(f"some **bold {i}** then _italic {i}_ then `code {i}`" for i in range(count))
+
+
+def measure(function, text, min_seconds=0.5):
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        function(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / runs
+
+
+def main():
+    print(f"{'paragraph':<24}{'size':>10}{'multipass MB/s':>17}{'single pass MB/s':>19}{'speedup':>10}")
+    for name, make_paragraph in (("link-heavy", link_heavy_paragraph), ("emphasis-heavy", emphasis_heavy_paragraph)):
+        for count in (10, 100, 1000):
+            text = make_paragraph(count)
+            assert text_to_textnodes(text) == text_to_textnodes_multipass(text)
+            megabytes = len(text.encode()) / 1e6
+            multipass = measure(text_to_textnodes_multipass, text)
+            single_pass = measure(text_to_textnodes, text)
+            print(
+                f"{name + ' x' + str(count):<24}{len(text):>10}"
+                f"{megabytes / multipass:>17.2f}{megabytes / single_pass:>19.2f}{multipass / single_pass:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Memory used by the node tree of a large synthetic corpus, comparing the
+__slots__ node classes with equivalent __dict__-based classes laid out the
+way TextNode/HTMLNode used to be.
+
+Run from the repository root with: python3 src/bench_memory.py
+"""
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+import block_markdown
+import inline_markdown
+import textnode
+from bench_block_markdown import synthetic_document
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def use_dict_nodes():
+    block_markdown.ParentNode = DictParentNode
+    block_markdown.TextNode = DictTextNode
+    inline_markdown.TextNode = DictTextNode
+    textnode.LeafNode = DictLeafNode
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+        count += 1
+        if node.children is not None:
+            stack.extend(node.children)
+    return count
+
+
+def measure(layout, megabytes):
+    """Parse the corpus with the given node layout and print nodes, bytes
+    retained by the tree and peak RSS of this process."""
+    if layout == "dict":
+        use_dict_nodes()
+
+    markdown = synthetic_document(megabytes * 1_000_000)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = block_markdown.markdown_to_html_node(markdown)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(count_nodes(tree), retained, peak_rss_kb)
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"corpus: {megabytes} MB of synthetic markdown")
+    print(f"{'layout':<10}{'nodes':>12}{'tree MB':>10}{'bytes/node':>12}{'peak RSS MB':>13}")
+    for layout in ("dict", "slots"):
+        # A fresh interpreter per layout so peak RSS is not shared between them
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", layout, str(megabytes)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        nodes, retained, peak_rss_kb = (int(value) for value in output.split())
+        print(f"{layout:<10}{nodes:>12}{retained / 1e6:>10.1f}{retained / nodes:>12.1f}{peak_rss_kb / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
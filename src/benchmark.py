@@ -0,0 +1,315 @@
+"""Build benchmark: generates a synthetic content tree and times every stage
+of the pipeline separately, each through the function the build calls.
+
+    python3 src/benchmark.py --pages 500 --output bench_output.json
+    python3 src/benchmark.py --compare bench_output.json
+
+Results are written as JSON so runs from different commits can be compared;
+--compare exits with status 1 when a stage got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from block_markdown import BlockType, blocks_to_html_node, parse_blocks
+from copystatic import copy_files
+from gencontent import first_h1_text, page_metadata, write_file
+from inline_markdown import text_to_textnodes
+from template import compile_template
+
+
+STAGES = (
+    "parse_blocks",
+    "text_to_textnodes",
+    "to_html",
+    "template_fill",
+    "write_file",
+    "copy_files",
+)
+
+WORDS = (
+    "middle", "earth", "ring", "hobbit", "shire", "wizard", "elf", "dwarf", "river",
+    "mountain", "forest", "road", "journey", "song", "tale", "king", "tower", "light",
+)
+
+TEMPLATE = """<!doctype html>
+<html>
+<head>
+	<title>{{ Title }}</title>
+	<link href="/index.css" rel="stylesheet" />
+</head>
+<body>
+	<article>{{ Content }}</article>
+</body>
+</html>"""
+
+
+class CorpusConfig:
+    def __init__(self, pages=200, depth=3, paragraphs=20, links=5, images=1, code_blocks=2, list_size=8, static_files=20, static_kb=64, seed=0):
+        self.pages = pages
+        self.depth = depth
+        self.paragraphs = paragraphs
+        self.links = links
+        self.images = images
+        self.code_blocks = code_blocks
+        self.list_size = list_size
+        self.static_files = static_files
+        self.static_kb = static_kb
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return f"CorpusConfig({self.to_dict()})"
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def generate_markdown(rng, config, page_number):
+    blocks = [f"# Page {page_number} {words(rng, 3)}"]
+    for i in range(config.paragraphs):
+        sentence = f"{words(rng, 8)} **{words(rng, 2)}** {words(rng, 6)} _{words(rng, 2)}_ {words(rng, 4)} `{words(rng, 1)}`"
+        for link in range(config.links // max(1, config.paragraphs) + (1 if i < config.links % max(1, config.paragraphs) else 0)):
+            sentence += f" [{words(rng, 2)}](/page-{rng.randrange(config.pages)}/)"
+        if i < config.images:
+            sentence += f" ![{words(rng, 2)}](/images/image-{rng.randrange(max(1, config.static_files))}.png)"
+        blocks.append(sentence + "\n" + words(rng, 10))
+        if i % 5 == 2:
+            blocks.append(f"## {words(rng, 4)}")
+        if i % 7 == 3:
+            blocks.append("\n".join(f"- {words(rng, 5)}" for _ in range(config.list_size)))
+        if i % 7 == 5:
+            blocks.append("\n".join(f"{n}. {words(rng, 5)}" for n in range(1, config.list_size + 1)))
+        if i % 9 == 4:
+            blocks.append(f"> {words(rng, 8)}\n> {words(rng, 8)}")
+    for _ in range(config.code_blocks):
+        blocks.append("```\n" + "\n".join(f"print('{words(rng, 3)}')" for _ in range(6)) + "\n```")
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root, config: CorpusConfig):
+    """Write content/, static/ and template.html for config under root."""
+    rng = random.Random(config.seed)
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    os.makedirs(os.path.join(static_dir, "images"), exist_ok=True)
+
+    for page_number in range(config.pages):
+        depth = page_number % (config.depth + 1)
+        page_dir = os.path.join(content_dir, *(f"section-{(page_number + level) % 7}" for level in range(depth)), f"page-{page_number}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), 'w') as file:
+            file.write(generate_markdown(rng, config, page_number))
+
+    for i in range(config.static_files):
+        with open(os.path.join(static_dir, "images", f"image-{i}.png"), 'wb') as file:
+            file.write(rng.randbytes(config.static_kb * 1024))
+    with open(os.path.join(static_dir, "index.css"), 'w') as file:
+        file.write("body { font-family: sans-serif; }\n" * 50)
+    with open(os.path.join(root, "template.html"), 'w') as file:
+        file.write(TEMPLATE)
+
+
+def collect_markdown_files(content_dir):
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(content_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(".md"):
+                paths.append(os.path.join(dir_path, file_name))
+    return paths
+
+
+def run_stages(root):
+    """Time each pipeline stage over every page of the corpus under root."""
+    timings = {stage: 0.0 for stage in STAGES}
+    clock = time.perf_counter
+    out_dir = os.path.join(root, "docs")
+
+    start = clock()
+    copy_files(os.path.join(root, "static"), out_dir)
+    timings["copy_files"] = clock() - start
+
+    with open(os.path.join(root, "template.html"), 'r') as file:
+        template = compile_template(file.read(), "/")
+
+    for path in collect_markdown_files(os.path.join(root, "content")):
+        with open(path, 'r') as file:
+            markdown = file.read()
+
+        # Splits and classifies the blocks in one pass
+        start = clock()
+        blocks = parse_blocks(markdown)
+        timings["parse_blocks"] += clock() - start
+
+        inline_texts = [block.text.replace("\n", " ") for block in blocks if block.block_type != BlockType.CODE]
+        start = clock()
+        for text in inline_texts:
+            text_to_textnodes(text)
+        timings["text_to_textnodes"] += clock() - start
+
+        html_node = blocks_to_html_node(blocks)
+        start = clock()
+        html = html_node.to_html()
+        timings["to_html"] += clock() - start
+
+        # The title the build uses: the first h1, as there is no front matter
+        title = page_metadata({}, first_h1_text(html_node), path)["title"]
+        start = clock()
+        page = template.render({"Title": title, "Content": html})
+        timings["template_fill"] += clock() - start
+
+        dest_path = os.path.join(out_dir, os.path.relpath(path, os.path.join(root, "content"))).replace(".md", ".html")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        # Hashes the page and writes it through a temp file, like a build
+        start = clock()
+        write_file(dest_path, page)
+        timings["write_file"] += clock() - start
+
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(config: CorpusConfig, repeat=3):
+    """Generate the corpus once, run every stage repeat times and keep the
+    fastest time per stage to damp noise."""
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        generate_corpus(root, config)
+        best = None
+        for _ in range(repeat):
+            timings = run_stages(root)
+            shutil.rmtree(os.path.join(root, "docs"))
+            if best is None:
+                best = timings
+            else:
+                best = {stage: min(best[stage], timings[stage]) for stage in STAGES}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "corpus": config.to_dict(),
+        "stages": {stage: round(best[stage], 6) for stage in STAGES},
+        "total": round(sum(best.values()), 6),
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """Return the stages of current that are slower than baseline by more
+    than threshold (a fraction, 0.1 == 10%) as (stage, before, after) tuples."""
+    regressions = []
+    for stage in STAGES:
+        before = baseline["stages"].get(stage)
+        after = current["stages"].get(stage)
+        if before is None or after is None or before == 0:
+            continue
+        if (after - before) / before > threshold:
+            regressions.append((stage, before, after))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    total = results["total"]
+    print(f"commit {results['commit']}, corpus {results['corpus']['pages']} pages, best of {results['repeat']}")
+    header = f"{'stage':<20}{'seconds':>10}{'share':>8}"
+    if baseline is not None:
+        header += f"{'baseline':>10}{'change':>9}"
+    print(header)
+    for stage in STAGES:
+        seconds = results["stages"][stage]
+        line = f"{stage:<20}{seconds:>10.4f}{seconds / total:>8.1%}"
+        if baseline is not None and baseline["stages"].get(stage):
+            before = baseline["stages"][stage]
+            line += f"{before:>10.4f}{(seconds - before) / before:>+9.1%}"
+        print(line)
+    print(f"{'total':<20}{total:>10.4f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the site build on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=3, help="maximum directory nesting of pages")
+    parser.add_argument("--paragraphs", type=int, default=20, help="paragraphs per page")
+    parser.add_argument("--links", type=int, default=5, help="links per page")
+    parser.add_argument("--images", type=int, default=1, help="images per page")
+    parser.add_argument("--code-blocks", type=int, default=2, help="code blocks per page")
+    parser.add_argument("--list-size", type=int, default=8, help="items per list")
+    parser.add_argument("--static-files", type=int, default=20)
+    parser.add_argument("--static-kb", type=int, default=64, help="size of each static file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown fraction reported as a regression")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = CorpusConfig(
+        pages=args.pages,
+        depth=args.depth,
+        paragraphs=args.paragraphs,
+        links=args.links,
+        images=args.images,
+        code_blocks=args.code_blocks,
+        list_size=args.list_size,
+        static_files=args.static_files,
+        static_kb=args.static_kb,
+        seed=args.seed,
+    )
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if baseline["corpus"] != config.to_dict():
+            print("Warning: baseline was measured on a different corpus configuration")
+
+    # copy_files prints a line per file, keep the report readable
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        results = run_benchmark(config, args.repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print_results(results, baseline)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+        print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_results(baseline, results, args.threshold)
+        for stage, before, after in regressions:
+            print(f"REGRESSION {stage}: {before:.4f}s -> {after:.4f}s")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 from enum import Enum
-from re import findall
+from re import compile, findall
 
 from htmlnode import ParentNode
 from inline_markdown import text_to_textnodes
 from textnode import TextNode, TextType, text_node_to_html_node
 
+# Bump whenever the HTML produced for the same markdown or the cached entry
+# format changes, so cached page bodies (see parsecache.py) from older
+# versions are not reused
+PARSER_VERSION = 6
+
 class BlockType(Enum):
     PARAGRAPH = 'paragraph'
     HEADING = 'heading'
@@ -13,17 +18,164 @@ class BlockType(Enum):
     UNORDERED_LIST = 'unordered_list'
     ORDERED_LIST = 'ordered_list'
 
-def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    new_blocks = []
-    for block in blocks:
-        block = block.strip()
+heading_regex = compile(r"#{1,6} ")
+# Shared tag strings so every heading node does not carry its own copy
+heading_tags = ("h0", "h1", "h2", "h3", "h4", "h5", "h6")
+ordered_list_item_regex = compile(r"(\d+)\. ")
+
+# Plain ints keep the per-line checks in parse_blocks cheap
+PARAGRAPH_CANDIDATE = 0
+HEADING_CANDIDATE = 1
+QUOTE_CANDIDATE = 2
+UNORDERED_LIST_CANDIDATE = 3
+ORDERED_LIST_CANDIDATE = 4
+candidate_block_types = [
+    BlockType.PARAGRAPH,
+    BlockType.HEADING,
+    BlockType.QUOTE,
+    BlockType.UNORDERED_LIST,
+    BlockType.ORDERED_LIST,
+]
+
+
+class Block:
+    def __init__(self, block_type: BlockType, text, start_line, end_line):
+        self.block_type = block_type
+        self.text = text
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def __eq__(self, other_block):
+        return (
+            self.block_type == other_block.block_type
+            and self.text == other_block.text
+            and self.start_line == other_block.start_line
+            and self.end_line == other_block.end_line
+        )
+
+    def __repr__(self) -> str:
+        return f"Block({self.block_type.value}, lines {self.start_line}-{self.end_line}, {self.text!r})"
+
+
+def parse_blocks(markdown) -> list[Block]:
+    """Split markdown into typed blocks in one pass over its lines.
+
+    Blocks are separated by empty lines, except inside a ``` fence which runs
+    until the next line ending with ```, blank lines included. Each block is
+    classified while its lines are read, so nothing is re-split afterwards.
+    Line numbers are 1-based and inclusive.
+    """
+    return list(iter_blocks(markdown.split("\n")))
 
-        if block == "":
+def iter_blocks(lines):
+    """Yield the blocks of parse_blocks from an iterable of lines (without
+    their line endings), each as soon as its last line has been read, so a
+    document can be parsed holding one block at a time. Only an unclosed
+    fence reads further ahead: its lines are buffered until the end of the
+    document shows that nothing closes it.
+    """
+    lines = iter(lines)
+    # Lines read ahead while looking for a closing fence, to be parsed again
+    pending = []
+    line_number = 0
+    # Once a fence is found to have no closing line, no later fence can close either
+    fences_can_close = True
+
+    def next_line():
+        nonlocal line_number
+        if len(pending) > 0:
+            line = pending.pop()
+        else:
+            line = next(lines, None)
+            if line is None:
+                return None
+        line_number += 1
+        return line
+
+    line = next_line()
+    while line is not None:
+        stripped = line.strip()
+        if stripped == "":
+            line = next_line()
             continue
 
-        new_blocks.append(block)
-    return new_blocks
+        start = line_number
+        if fences_can_close and stripped.startswith("```"):
+            block_lines = [line]
+            # Only a run of at least as many backticks closes the fence, so
+            # a ```` fence can hold ``` examples
+            fence = "`" * (len(stripped) - len(stripped.lstrip("`")))
+            # A one line fence needs something between its backtick runs
+            closed = stripped.strip("`") != "" and stripped.endswith(fence)
+            while not closed:
+                fence_line = next_line()
+                if fence_line is None:
+                    break
+                block_lines.append(fence_line)
+                closed = fence_line.rstrip().endswith(fence)
+            if closed:
+                yield Block(BlockType.CODE, "\n".join(block_lines).strip(), start, line_number)
+                line = next_line()
+                continue
+            fences_can_close = False
+            # Parse the lines after the opening fence again as ordinary blocks
+            pending.extend(reversed(block_lines[1:]))
+            line_number = start
+
+        # The first line decides the only type the block can still be, later
+        # lines just have to keep agreeing with it
+        if heading_regex.match(stripped) is not None:
+            candidate = HEADING_CANDIDATE
+        elif stripped.startswith(">"):
+            candidate = QUOTE_CANDIDATE
+        elif stripped.startswith("- "):
+            candidate = UNORDERED_LIST_CANDIDATE
+        elif ordered_list_item_regex.match(stripped) is not None:
+            candidate = ORDERED_LIST_CANDIDATE
+        else:
+            candidate = PARAGRAPH_CANDIDATE
+        item_number = 1
+
+        block_lines = []
+        # Only an empty line ends a block: lines of whitespace are kept in it,
+        # as when blocks were split on "\n\n", and are trimmed at its end
+        whitespace_lines = 0
+        while line is not None and line != "":
+            stripped = line.strip()
+            if stripped == "":
+                whitespace_lines += 1
+                block_lines.append(line)
+                line = next_line()
+                continue
+            if whitespace_lines > 0 and candidate != HEADING_CANDIDATE:
+                # A whitespace line inside a quote or list makes it a paragraph
+                candidate = PARAGRAPH_CANDIDATE
+            whitespace_lines = 0
+            if candidate == QUOTE_CANDIDATE:
+                if not stripped.startswith(">"):
+                    candidate = PARAGRAPH_CANDIDATE
+            elif candidate == UNORDERED_LIST_CANDIDATE:
+                if not stripped.startswith("- "):
+                    candidate = PARAGRAPH_CANDIDATE
+            elif candidate == ORDERED_LIST_CANDIDATE:
+                item_match = ordered_list_item_regex.match(stripped)
+                if item_match is None or int(item_match.group(1)) != item_number:
+                    candidate = PARAGRAPH_CANDIDATE
+                item_number += 1
+            block_lines.append(line)
+            line = next_line()
+
+        if whitespace_lines > 0:
+            del block_lines[-whitespace_lines:]
+        text = "\n".join(block_lines).strip()
+        if candidate == PARAGRAPH_CANDIDATE and text.startswith("```") and text.endswith("```") and text.strip("`") != "":
+            block_type = BlockType.CODE
+        else:
+            block_type = candidate_block_types[candidate]
+        yield Block(block_type, text, start, start + len(block_lines) - 1)
+
+def markdown_to_blocks(markdown):
+    return [block.text for block in parse_blocks(markdown)]
 
 def block_to_blocktype(block: str) -> BlockType:
     if is_heading(block):
@@ -73,38 +225,41 @@ def check_all_lines(filter, block):
             return False
     return True
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+def markdown_to_html_node(markdown, resolve_url=None):
+    return blocks_to_html_node(parse_blocks(markdown), resolve_url)
+
+def blocks_to_html_node(blocks, resolve_url=None):
     children = []
     for block in blocks:
-        html_node = block_to_html_node(block)
+        html_node = block_to_html_node(block.text, block.block_type, resolve_url)
         children.append(html_node)
     return ParentNode("div", children)
 
-def block_to_html_node(block):
-    block_type = block_to_blocktype(block)
+def block_to_html_node(block, block_type=None, resolve_url=None):
+    if block_type is None:
+        block_type = block_to_blocktype(block)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        return heading_to_html_node(block, resolve_url)
     if block_type == BlockType.CODE:
         return code_to_html_node(block)
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_to_html_node(block, resolve_url)
     if block_type == BlockType.UNORDERED_LIST:
-        return unordered_list_to_html_node(block)
+        return unordered_list_to_html_node(block, resolve_url)
     if block_type == BlockType.ORDERED_LIST:
-        return ordered_list_to_html_node(block)
+        return ordered_list_to_html_node(block, resolve_url)
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(block, resolve_url)
 
-def text_to_children(text):
+def text_to_children(text, resolve_url=None):
     text_nodes = text_to_textnodes(text)
     children = []
     for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
+        html_node = text_node_to_html_node(text_node, resolve_url)
         children.append(html_node)
     return children
 
-def heading_to_html_node(block):
+def heading_to_html_node(block, resolve_url=None):
     level = 0
     for char in block:
         if char == '#':
@@ -114,19 +269,25 @@ def heading_to_html_node(block):
     if level + 1 >= len(block) or level > 6:
         raise ValueError(f"invalid heading level: {level}")
     text = block[level+1:]
-    children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    children = text_to_children(text, resolve_url)
+    return ParentNode(heading_tags[level], children)
 
 def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
+    if len(block) < 6 or not block.startswith("```") or not block.endswith("```"):
         raise ValueError("invalid code block")
-    text = block[4:-3]
+    # Drop the opening fence line (and its info string) and the whole closing
+    # run, which can be longer than the opening one
+    first_newline = block.find("\n")
+    if first_newline == -1:
+        text = block.lstrip("`").rstrip("`")
+    else:
+        text = block[first_newline + 1:].rstrip("`")
     text_node = TextNode(text, TextType.TEXT)
     child = text_node_to_html_node(text_node)
     code = ParentNode("code", [child])
     return ParentNode("pre", [code])
 
-def quote_to_html_node(block):
+def quote_to_html_node(block, resolve_url=None):
     lines = block.split("\n")
     new_lines = []
     for line in lines:
@@ -134,29 +295,29 @@ def quote_to_html_node(block):
             raise ValueError(f"invalid quote block from line: {line}")
         new_lines.append(line.lstrip(">").strip())
     content = " ".join(new_lines)
-    children = text_to_children(content)
+    children = text_to_children(content, resolve_url)
     return ParentNode("blockquote", children)
 
-def unordered_list_to_html_node(block):
+def unordered_list_to_html_node(block, resolve_url=None):
     items = block.split("\n")
     html_items = []
     for item in items:
         text = item[2:]
-        children = text_to_children(text)
+        children = text_to_children(text, resolve_url)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
-def ordered_list_to_html_node(block):
+def ordered_list_to_html_node(block, resolve_url=None):
     items = block.split("\n")
     html_items = []
     for item in items:
         text = item.split(" ", 1)[1]
-        children = text_to_children(text)
+        children = text_to_children(text, resolve_url)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
-def paragraph_to_html_node(block):
+def paragraph_to_html_node(block, resolve_url=None):
     lines = block.split("\n")
     paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+    children = text_to_children(paragraph, resolve_url)
     return ParentNode("p", children)
@@ -0,0 +1,438 @@
+"""In-process build API. main.py is a thin command line wrapper over it; a
+long-lived process (a CMS, a build daemon) can keep one Site and call
+build() again whenever its inputs change:
+
+    site = Site(SiteConfig(basepath="/blog/", incremental=True, jobs=4))
+    report = site.build()
+    ...
+    report = site.build()  # reuses everything the first build loaded
+
+A Site keeps its page index, manifest, parse cache and fragment cache in
+memory between builds, together with a stat snapshot of the markdown and
+templates it built from, so pages whose files were not touched since are
+skipped without being read. Compiled templates and static sync state are
+cached per process by template.py and copystatic.py.
+"""
+import os
+import time
+
+from compress import compress_outputs, gzip_path_for, is_compressible, remove_compressed_outputs
+from copystatic import copy_files, sync_files
+from fingerprint import build_asset_map, copy_assets, remove_published_assets
+from fragmentcache import DEFAULT_MAX_ENTRIES, FragmentCache
+from block_markdown import markdown_to_html_node
+from frontmatter import split_front_matter
+from gencontent import (
+    STREAM_THRESHOLD_BYTES, PageResult, first_h1_text, generate_pages_recursive, get_file_contents, page_dest_path, page_metadata, page_template_path,
+    page_variables,
+)
+from linkcheck import check_links
+from listings import generate_listings
+from manifest import BuildManifest, hash_bytes, snapshot_files
+from outputs import OutputChanges, remove_stale_outputs
+from pageindex import PageIndex
+from parsecache import DEFAULT_MAX_BYTES, ParseCache
+from profiler import NULL_PROFILER
+from search import build_search_index
+from shards import (
+    SHARD_DIR, load_shard_manifest, remove_shard_manifest, save_shard_manifest, shard_cache_dir, shard_dest_dir, shard_manifest_path,
+)
+from template import load_template
+from urls import UrlResolver
+
+
+class SiteConfig:
+    def __init__(
+        self,
+        content_dir="./content",
+        static_dir="./static",
+        template_path="./template.html",
+        dest_dir="./docs",
+        cache_dir="./.cache",
+        basepath="/",
+        jobs=1,
+        incremental=False,
+        hash_static=False,
+        hardlink_static=False,
+        parse_cache=True,
+        cache_size=DEFAULT_MAX_BYTES,
+        fragment_cache_size=DEFAULT_MAX_ENTRIES,
+        stream_threshold=STREAM_THRESHOLD_BYTES,
+        gzip=False,
+        fingerprint=False,
+        search=False,
+        site_url=None,
+        check_links=False,
+        changes_path=None,
+        shard=None,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.cache_dir = cache_dir
+        self.basepath = basepath
+        self.jobs = jobs if jobs > 0 else os.cpu_count()
+        self.incremental = incremental
+        self.hash_static = hash_static
+        self.hardlink_static = hardlink_static
+        self.parse_cache = parse_cache
+        self.cache_size = cache_size
+        # Blocks kept by the fragment cache, 0 turns it off
+        self.fragment_cache_size = fragment_cache_size
+        self.stream_threshold = stream_threshold
+        self.gzip = gzip
+        self.fingerprint = fingerprint
+        self.search = search
+        self.site_url = site_url
+        self.check_links = check_links
+        self.changes_path = changes_path if changes_path is not None else os.path.join(cache_dir, "changes.json")
+        # (i, N) to build only shard i of N, see shards.py
+        self.shard = shard
+
+    def cache_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return f"SiteConfig({self.to_dict()})"
+
+
+class BuildReport:
+    """What one build did: the PageResult of every page, the OutputChanges
+    of every output, and the report of each optional stage that ran (None
+    for stages that did not)."""
+
+    def __init__(self, results, changes):
+        self.results = results
+        self.changes = changes
+        self.listings = None
+        self.search = None
+        self.compress = None
+        self.links = None
+        self.seconds = 0.0
+
+    @property
+    def pages_rendered(self):
+        return sum(1 for result in self.results if result.rendered)
+
+    @property
+    def pages_skipped(self):
+        return sum(1 for result in self.results if not result.rendered and not result.draft)
+
+    @property
+    def broken_links(self):
+        return [] if self.links is None else self.links.failures
+
+    def to_dict(self):
+        return {
+            "pages": len(self.results),
+            "rendered": self.pages_rendered,
+            "skipped": self.pages_skipped,
+            "changed": sorted(self.changes.changed),
+            "deleted": sorted(self.changes.deleted),
+            "unchanged": self.changes.unchanged,
+            "broken_links": [list(failure) for failure in self.broken_links],
+            "seconds": round(self.seconds, 6),
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"BuildReport(pages={len(self.results)}, rendered={self.pages_rendered}, skipped={self.pages_skipped}, "
+            f"changed={len(self.changes.changed)}, deleted={len(self.changes.deleted)}, "
+            f"broken_links={len(self.broken_links)}, seconds={self.seconds:.3f})"
+        )
+
+
+class Site:
+    def __init__(self, config=None):
+        self.config = config if config is not None else SiteConfig()
+        self.parse_cache = None
+        if self.config.parse_cache:
+            self.parse_cache = ParseCache(self.config.cache_path("parse"), self.config.cache_size)
+        self.fragment_cache = None
+        if self.config.fragment_cache_size > 0:
+            self.fragment_cache = FragmentCache(self.config.cache_path("fragments.json"), self.config.fragment_cache_size)
+            self.fragment_cache.load()
+        self.page_index = PageIndex.load(self.config.cache_path("pages.json"))
+        self.manifest = None
+        if self.config.incremental:
+            self.manifest = BuildManifest.load(self.config.cache_path("manifest.json"))
+        # Stats of the markdown and templates as the last successful build
+        # started, and the URL key and fingerprinted assets it resolved with
+        self.snapshot = None
+        self.url_key = None
+        self.assets = None
+        self.builds = 0
+
+    def template_paths(self):
+        paths = {self.config.template_path}
+        for page in self.page_index.pages.values():
+            paths.add(page_template_path(self.config.template_path, page))
+        return sorted(paths)
+
+    def unchanged_sources(self, snapshot, template_snapshot, url_key):
+        """Sources whose markdown and templates have the same stats as when
+        the previous build started, or None when that cannot be trusted."""
+        if self.snapshot is None or url_key != self.url_key:
+            return None
+        for path, stat in template_snapshot.items():
+            if self.snapshot.get(path) != stat:
+                return None
+        return {path for path, stat in snapshot.items() if self.snapshot.get(path) == stat}
+
+    def build(self, profiler=NULL_PROFILER):
+        """Build the site and return a BuildReport. If pages fail, a
+        BuildError is raised once every other page has been built."""
+        config = self.config
+        start = time.perf_counter()
+        changes = OutputChanges(config.dest_dir)
+        self.page_index.begin_build()
+        if self.manifest is not None:
+            self.manifest.begin_build()
+        assets = None
+        if config.fingerprint:
+            assets = build_asset_map(config.static_dir, config.cache_path("fingerprints.json"))
+        url_key = UrlResolver(config.basepath, assets).key
+
+        # Taken before any page is read, so edits made during the build are
+        # seen by the next one
+        template_snapshot = snapshot_files(self.template_paths())
+        snapshot = snapshot_files([config.content_dir])
+        snapshot.update(template_snapshot)
+        unchanged_sources = None
+        if self.manifest is not None:
+            unchanged_sources = self.unchanged_sources(snapshot, template_snapshot, url_key)
+        self.snapshot = None
+
+        sharded = config.shard is not None
+        if sharded:
+            remove_shard_manifest(shard_manifest_path(config.cache_dir))
+            # Static files are published by the merge
+            static_paths = []
+        else:
+            static_paths = self.publish_static(assets, profiler, changes)
+
+        results = generate_pages_recursive(
+            config.content_dir, config.template_path, config.dest_dir, config.basepath, self.manifest, config.jobs, profiler,
+            self.parse_cache, changes, self.page_index, assets, config.stream_threshold, unchanged_sources, config.shard,
+            self.fragment_cache,
+        )
+        report = BuildReport(results, changes)
+        if self.manifest is not None:
+            for dest_path in self.manifest.prune(config.dest_dir):
+                if dest_path is not None:
+                    changes.record_deleted(dest_path)
+            self.manifest.save()
+        self.page_index.prune()
+
+        if sharded:
+            expected_paths = None
+            if not config.incremental:
+                expected_paths = [result.dest_path for result in results if not result.draft]
+            self.finish_shard(report, url_key, expected_paths)
+        else:
+            expected_paths = None
+            if not config.incremental:
+                expected_paths = static_paths + [result.dest_path for result in results if not result.draft]
+            self.finish_site(report, assets, expected_paths, profiler)
+
+        self.snapshot = snapshot
+        self.url_key = url_key
+        self.assets = assets
+        self.builds += 1
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def rebuild(self, changed, deleted, profiler=NULL_PROFILER):
+        """build() for a caller that knows which files changed and were
+        deleted since the last build, such as a file watcher. When only
+        markdown under the content directory changed, the pages come from
+        the manifest instead of a walk of the content directory and only the
+        changed ones are read; anything else (templates, static files) runs
+        a full build()."""
+        config = self.config
+        content_prefix = os.path.join(config.content_dir, "")
+        if (
+            self.snapshot is None
+            or self.manifest is None
+            or config.shard is not None
+            or not all(path.startswith(content_prefix) for path in changed + deleted)
+        ):
+            return self.build(profiler)
+
+        start = time.perf_counter()
+        changes = OutputChanges(config.dest_dir)
+        self.page_index.begin_build()
+        self.manifest.begin_build()
+        snapshot = self.snapshot
+        self.snapshot = None
+        changed_snapshot = snapshot_files(changed)
+
+        deleted_paths = set(deleted)
+        pages = {from_path: entry["dest_path"] for from_path, entry in self.manifest.pages.items() if from_path not in deleted_paths}
+        unchanged_sources = set(pages)
+        for from_path in changed:
+            pages[from_path] = page_dest_path(from_path, config.content_dir, config.dest_dir)
+            unchanged_sources.discard(from_path)
+
+        results = generate_pages_recursive(
+            config.content_dir, config.template_path, config.dest_dir, config.basepath, self.manifest, config.jobs, profiler,
+            self.parse_cache, changes, self.page_index, self.assets, config.stream_threshold, unchanged_sources, None,
+            self.fragment_cache, sorted(pages.items()),
+        )
+        report = BuildReport(results, changes)
+        for dest_path in self.manifest.prune(config.dest_dir):
+            if dest_path is not None:
+                changes.record_deleted(dest_path)
+        self.manifest.save()
+        self.page_index.prune()
+        self.finish_site(report, self.assets, None, profiler)
+
+        for path in deleted:
+            snapshot.pop(path, None)
+        snapshot.update(changed_snapshot)
+        self.snapshot = snapshot
+        self.builds += 1
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def publish_static(self, assets, profiler, changes, incremental=None):
+        """Copy or sync the static files; returns their destination paths, or
+        None when an incremental sync does not list them."""
+        config = self.config
+        if incremental is None:
+            incremental = config.incremental
+        if assets is not None:
+            return copy_assets(assets, config.static_dir, config.dest_dir, config.cache_path("assets.json"), profiler, changes)
+        # Assets a fingerprinting build published are no longer linked
+        remove_published_assets(config.static_dir, config.dest_dir, config.cache_path("assets.json"), changes)
+        if not incremental:
+            return copy_files(config.static_dir, config.dest_dir, profiler, changes)
+        sync_files(
+            config.static_dir,
+            config.dest_dir,
+            config.cache_path("static.json"),
+            use_hash=config.hash_static,
+            hardlink=config.hardlink_static,
+            profiler=profiler,
+            changes=changes,
+        )
+        return None
+
+    def finish_site(self, report, assets, expected_paths, profiler):
+        """The stages that need every page of the site: listings, search,
+        removing stale outputs (when expected_paths lists the pages and
+        static files), gzip and the link check."""
+        config = self.config
+        changes = report.changes
+        report.listings = generate_listings(
+            self.page_index, config.template_path, config.dest_dir, config.basepath, config.site_url, config.cache_path("listings.json"),
+            changes=changes, assets=assets,
+        )
+        if config.search:
+            report.search = build_search_index(
+                report.results, self.page_index, config.dest_dir, config.cache_path("search.json"), changes,
+                UrlResolver(config.basepath, assets),
+            )
+        if expected_paths is not None:
+            expected_paths = expected_paths + report.listings.outputs
+            if report.search is not None:
+                expected_paths += report.search.outputs
+            if config.gzip:
+                expected_paths += [gzip_path_for(path) for path in expected_paths if is_compressible(path)]
+            remove_stale_outputs(config.dest_dir, expected_paths, changes)
+        self.page_index.save()
+
+        if config.gzip:
+            report.compress = compress_outputs(config.dest_dir, config.cache_path("gzip.json"), config.jobs, changes)
+        else:
+            remove_compressed_outputs(config.dest_dir, config.cache_path("gzip.json"), changes)
+
+        self.save_changes(changes)
+        if config.check_links:
+            report.links = check_links(self.page_index, config.dest_dir, assets)
+
+    def finish_shard(self, report, url_key, expected_paths):
+        config = self.config
+        if expected_paths is not None:
+            remove_stale_outputs(config.dest_dir, expected_paths, report.changes)
+        self.page_index.save()
+        save_shard_manifest(shard_manifest_path(config.cache_dir), config.shard, url_key, report.results, config.dest_dir)
+        self.save_changes(report.changes)
+
+    def save_changes(self, changes):
+        changes.save(self.config.changes_path)
+        print(
+            f"Outputs: {len(changes.changed)} changed, {changes.unchanged} unchanged, "
+            f"{len(changes.deleted)} deleted (listed in {self.config.changes_path})"
+        )
+
+    def merge(self, shard_count, shard_dir=SHARD_DIR, profiler=NULL_PROFILER):
+        """Assemble the site from the outputs of shard_count shard builds in
+        shard_dir and build the site-wide outputs from their merged page
+        metadata. Returns a BuildReport."""
+        config = self.config
+        start = time.perf_counter()
+        changes = OutputChanges(config.dest_dir)
+        assets = None
+        if config.fingerprint:
+            assets = build_asset_map(config.static_dir, config.cache_path("fingerprints.json"))
+        url_key = UrlResolver(config.basepath, assets).key
+
+        self.page_index.pages = {}
+        self.page_index.links = {}
+        self.page_index.begin_build()
+        results = []
+        page_paths = []
+        for index in range(1, shard_count + 1):
+            cache_dir = shard_cache_dir(shard_dir, index, shard_count)
+            shard_manifest = load_shard_manifest(shard_manifest_path(cache_dir), (index, shard_count))
+            if shard_manifest["url_key"] != url_key:
+                raise ValueError(f"Shard {index}/{shard_count} was built with another basepath or other assets than this merge")
+            shard_index = PageIndex.load(os.path.join(cache_dir, "pages.json"))
+            for from_path, page in shard_manifest["pages"].items():
+                if from_path in self.page_index.pages:
+                    raise ValueError(f"{from_path} was built by more than one shard")
+                self.page_index.pages[from_path] = shard_index.pages[from_path]
+                self.page_index.links[from_path] = shard_index.links.get(from_path, [])
+                self.page_index.keep(from_path)
+                results.append(PageResult(from_path, os.path.join(config.dest_dir, page["output"]), page["source_hash"]))
+            page_paths += copy_files(shard_dest_dir(shard_dir, index, shard_count), config.dest_dir, profiler, changes)
+        print(f"Merged {len(results)} pages from {shard_count} shards")
+
+        # Merging always assembles the whole tree, so whatever it did not
+        # write is stale
+        static_paths = self.publish_static(assets, profiler, changes, incremental=False)
+        report = BuildReport(results, changes)
+        self.finish_site(report, assets, static_paths + page_paths, profiler)
+        self.assets = assets
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def preview(self, from_path, markdown=None):
+        """Render one page the way build() would and return its HTML without
+        writing anything. markdown replaces the file's content, e.g. with an
+        editor's unsaved buffer. Fingerprinted asset names are those of the
+        last build."""
+        config = self.config
+        if markdown is None:
+            markdown = get_file_contents(from_path)
+        front_matter, body_markdown, _ = split_front_matter(markdown)
+        template = load_template(page_template_path(config.template_path, front_matter), config.basepath, self.assets)
+        url_resolver = UrlResolver(config.basepath, self.assets)
+
+        cached = None
+        if self.parse_cache is not None:
+            cached = self.parse_cache.get(hash_bytes(markdown.encode()), url_resolver.key)
+        if cached is not None:
+            body, h1_title, _ = cached
+        else:
+            body = markdown_to_html_node(body_markdown, url_resolver.resolve)
+            h1_title = first_h1_text(body)
+        return template.render(page_variables(body, page_metadata(front_matter, h1_title, from_path)))
+
+    def __repr__(self) -> str:
+        return f"Site(dest_dir={self.config.dest_dir}, basepath={self.config.basepath}, builds={self.builds})"
@@ -0,0 +1,72 @@
+"""Command line client of the build daemon (see daemon.py). It imports only
+the standard library so that each call starts in a few milliseconds:
+
+    python3 src/client.py build
+    python3 src/client.py status
+    python3 src/client.py preview content/index.md > preview.html
+    python3 src/client.py stop
+
+Requests and responses are single lines of JSON over a Unix socket.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+DEFAULT_SOCKET_PATH = "./.cache/daemon.sock"
+
+
+def send_request(socket_path, request):
+    """Send one request to the daemon and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile('rb') as responses:
+            line = responses.readline()
+    if line == b"":
+        raise ConnectionError(f"build daemon at {socket_path} closed the connection without answering")
+    return json.loads(line)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="client.py", description="Talk to a running build daemon")
+    parser.add_argument("command", choices=["build", "preview", "status", "stop"])
+    parser.add_argument("path", nargs="?", help="markdown file to preview")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket the daemon listens on")
+    parser.add_argument("--stdin", action="store_true", help="with preview, render the markdown read from stdin instead of the file")
+    args = parser.parse_args(argv)
+    if args.command == "preview" and args.path is None:
+        parser.error("preview needs the path of a markdown file")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    request = {"command": args.command}
+    if args.command == "preview":
+        # The daemon may run in another directory
+        request["path"] = os.path.abspath(args.path)
+        if args.stdin:
+            request["markdown"] = sys.stdin.read()
+
+    try:
+        response = send_request(args.socket, request)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No build daemon is listening on {args.socket}; start one with: python3 src/main.py daemon", file=sys.stderr)
+        sys.exit(2)
+
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        sys.exit(1)
+    if args.command == "preview":
+        sys.stdout.write(response["html"])
+        return
+    print(json.dumps(response, indent=1))
+    if len(response.get("build", {}).get("broken_links", [])) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,137 @@
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from outputs import load_json_state, save_json_state, write_output
+
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".svg")
+
+
+def gzip_path_for(path):
+    return path + ".gz"
+
+
+def is_compressible(path) -> bool:
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+class CompressReport:
+    def __init__(self):
+        self.files_compressed = 0
+        self.files_skipped = 0
+        self.files_deleted = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def ratio(self):
+        if self.bytes_in == 0:
+            return 1.0
+        return self.bytes_out / self.bytes_in
+
+    def __repr__(self) -> str:
+        return (
+            f"CompressReport(compressed={self.files_compressed} files, {self.bytes_in} -> {self.bytes_out} bytes, "
+            f"skipped={self.files_skipped} files, deleted={self.files_deleted} files, seconds={self.seconds:.3f})"
+        )
+
+
+def compress_file(path):
+    """Write path.gz next to path and return (path, bytes_in, bytes_out, changed).
+    The gzip header mtime is zeroed so identical input gives identical output."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    changed = write_output(gzip_path_for(path), compressed)
+    return path, len(data), len(compressed), changed
+
+
+def compress_outputs(dest_dir_path, state_path=None, jobs=1, changes=None):
+    """Precompress every HTML, CSS and SVG file under dest_dir_path.
+
+    Files whose size and mtime match the previous run and whose .gz still
+    exists are skipped; since outputs are only rewritten when their bytes
+    change, that means their contents are the same. .gz files of outputs that
+    no longer exist are deleted."""
+    start = time.perf_counter()
+    previous_files = load_compress_state(state_path)
+    current_files = {}
+    report = CompressReport()
+    paths = []
+
+    for dir_path, dir_names, file_names in os.walk(dest_dir_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(dir_path, file_name)
+            if not is_compressible(path):
+                continue
+            rel_path = os.path.relpath(path, dest_dir_path)
+            stat = os.stat(path)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            current_files[rel_path] = entry
+            if previous_files.get(rel_path) == entry and os.path.isfile(gzip_path_for(path)):
+                report.files_skipped += 1
+                if changes is not None:
+                    changes.record(gzip_path_for(path), False)
+                continue
+            paths.append(path)
+
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(paths) // (jobs * 4))
+            results = list(executor.map(compress_file, paths, chunksize=chunksize))
+    else:
+        results = [compress_file(path) for path in paths]
+
+    for path, bytes_in, bytes_out, changed in results:
+        report.files_compressed += 1
+        report.bytes_in += bytes_in
+        report.bytes_out += bytes_out
+        if changes is not None:
+            changes.record(gzip_path_for(path), changed)
+
+    for rel_path in sorted(set(previous_files) - set(current_files)):
+        gz_path = gzip_path_for(os.path.join(dest_dir_path, rel_path))
+        if os.path.isfile(gz_path):
+            os.remove(gz_path)
+            report.files_deleted += 1
+            if changes is not None:
+                changes.record_deleted(gz_path)
+
+    save_compress_state(state_path, current_files)
+    report.seconds = time.perf_counter() - start
+    print(
+        f"Compressed {report.files_compressed} files ({report.bytes_in} -> {report.bytes_out} bytes, "
+        f"ratio {report.ratio():.2f}) in {report.seconds * 1000:.1f} ms, "
+        f"skipped {report.files_skipped} unchanged, deleted {report.files_deleted} stale .gz files"
+    )
+    return report
+
+
+def remove_compressed_outputs(dest_dir_path, state_path, changes=None):
+    """Delete the .gz files an earlier compress_outputs run recorded in
+    state_path, and the state itself, for a build that no longer
+    compresses. Returns the number of files deleted."""
+    deleted = 0
+    for rel_path in sorted(load_compress_state(state_path)):
+        gz_path = gzip_path_for(os.path.join(dest_dir_path, rel_path))
+        if os.path.isfile(gz_path):
+            os.remove(gz_path)
+            deleted += 1
+            if changes is not None:
+                changes.record_deleted(gz_path)
+    if state_path is not None and os.path.exists(state_path):
+        os.remove(state_path)
+        print(f"Compression disabled: deleted {deleted} .gz files")
+    return deleted
+
+
+def load_compress_state(state_path):
+    state = load_json_state(state_path, "compression state")
+    return {} if state is None else state.get("files", {})
+
+
+def save_compress_state(state_path, files):
+    save_json_state(state_path, {"files": files})
@@ -1,31 +1,260 @@
+import filecmp
 import os
 import shutil
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-def copy_files(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+from manifest import hash_file
+from outputs import load_json_state, remove_empty_dirs, save_json_state, temp_path_for
+from profiler import NULL_PROFILER
 
+
+# state_path -> (mtime_ns, size, files) of the sync state this process last saved or read
+sync_state_cache = {}
+
+
+def copy_files(source_dir_path, dest_dir_path, profiler=NULL_PROFILER, changes=None):
+    """Copy the contents of source_dir_path into dest_dir_path and return the
+    destination paths. Files that already hold the same bytes are left alone
+    so their mtime survives, the rest are replaced atomically."""
     # Check paths are valid directories
     if not os.path.isdir(source_dir_path):
         raise ValueError(f"Invalid source_dir_path path: {source_dir_path}\nMust be to a directory")
 
-    # Delete contents of dest_dir_pathination directory
-    if len(os.listdir(dest_dir_path)) > 0:
-        print(f"Clearing contents of {dest_dir_path}")
-        shutil.rmtree(dest_dir_path)
-        os.mkdir(dest_dir_path)
+    if os.path.isfile(dest_dir_path):
+        os.remove(dest_dir_path)
+    os.makedirs(dest_dir_path, exist_ok=True)
 
     # Copy contents of source_dir_path directory to dest_dir_pathination
+    dest_paths = []
     items = os.listdir(source_dir_path)
     for item in items:
         source_dir_path_path = os.path.join(source_dir_path, item)
         dest_dir_path_path = os.path.join(dest_dir_path, item) 
 
         if os.path.isdir(source_dir_path_path):
-            print(f"Making new directory {dest_dir_path_path}")
-            os.mkdir(dest_dir_path_path)
-            copy_files(source_dir_path_path, dest_dir_path_path)
-        else:
-            print(f"Copying {item} to {dest_dir_path}")
-            shutil.copy(source_dir_path_path, dest_dir_path_path)
+            if not os.path.isdir(dest_dir_path_path):
+                print(f"Making new directory {dest_dir_path_path}")
+            dest_paths.extend(copy_files(source_dir_path_path, dest_dir_path_path, profiler, changes))
+            continue
+
+        dest_paths.append(dest_dir_path_path)
+        if os.path.isdir(dest_dir_path_path):
+            shutil.rmtree(dest_dir_path_path)
+        elif os.path.isfile(dest_dir_path_path) and filecmp.cmp(source_dir_path_path, dest_dir_path_path, shallow=False):
+            if changes is not None:
+                changes.record(dest_dir_path_path, False)
+            continue
+
+        print(f"Copying {item} to {dest_dir_path}")
+        with profiler.span("copy", "asset", {"file": source_dir_path_path}):
+            tmp_path = temp_path_for(dest_dir_path_path)
+            shutil.copy(source_dir_path_path, tmp_path)
+            os.replace(tmp_path, dest_dir_path_path)
+        if changes is not None:
+            changes.record(dest_dir_path_path, True)
+    return dest_paths
+
+
+# ioctl request number for FICLONE on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+
+class SyncReport:
+    def __init__(self):
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.files_skipped = 0
+        self.bytes_skipped = 0
+        self.files_deleted = 0
+        self.copy_methods = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"SyncReport(copied={self.files_copied} files/{self.bytes_copied} bytes, "
+            f"skipped={self.files_skipped} files/{self.bytes_skipped} bytes, "
+            f"deleted={self.files_deleted} files, methods={self.copy_methods})"
+        )
+
+
+def sync_files(source_dir_path, dest_dir_path, state_path=None, use_hash=False, hardlink=False, profiler=NULL_PROFILER, changes=None):
+    """Copy only the files under source_dir_path whose size or mtime differ from
+    their copy in dest_dir_path, and delete files synced by a previous run whose
+    source no longer exists. Files in dest_dir_path that were never synced (e.g.
+    generated pages) are left alone."""
+    if not os.path.isdir(source_dir_path):
+        raise ValueError(f"Invalid source_dir_path path: {source_dir_path}\nMust be to a directory")
+
+    os.makedirs(dest_dir_path, exist_ok=True)
+    previous_files = load_sync_state(state_path)
+    current_files = {}
+    report = SyncReport()
+
+    for dir_path, dir_names, file_names in os.walk(source_dir_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            source_path = os.path.join(dir_path, file_name)
+            rel_path = os.path.relpath(source_path, source_dir_path)
+            dest_path = os.path.join(dest_dir_path, rel_path)
+            source_stat = os.stat(source_path)
+            entry = {"size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns}
+            current_files[rel_path] = entry
+
+            if is_file_synced(source_path, source_stat, dest_path, entry, previous_files.get(rel_path), use_hash):
+                report.files_skipped += 1
+                report.bytes_skipped += source_stat.st_size
+                if changes is not None:
+                    changes.record(dest_path, False)
+                continue
+
+            print(f"Copying {rel_path} to {dest_dir_path}")
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with profiler.span("copy", "asset", {"file": source_path}):
+                method = copy_file_fast(source_path, dest_path, hardlink)
+            report.files_copied += 1
+            report.bytes_copied += source_stat.st_size
+            report.copy_methods[method] = report.copy_methods.get(method, 0) + 1
+            if changes is not None:
+                changes.record(dest_path, True)
+
+    for rel_path in sorted(set(previous_files) - set(current_files)):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if os.path.isfile(dest_path):
+            print(f"Removing stale file {dest_path}")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+            report.files_deleted += 1
+            if changes is not None:
+                changes.record_deleted(dest_path)
+
+    save_sync_state(state_path, current_files)
+    print(
+        f"Synced {source_dir_path} to {dest_dir_path}: "
+        f"copied {report.files_copied} files ({report.bytes_copied} bytes), "
+        f"skipped {report.files_skipped} files ({report.bytes_skipped} bytes), "
+        f"deleted {report.files_deleted} stale files"
+    )
+    return report
+
+
+def is_file_synced(source_path, source_stat, dest_path, entry, previous_entry, use_hash) -> bool:
+    if not os.path.isfile(dest_path):
+        return False
+
+    dest_stat = os.stat(dest_path)
+    if dest_stat.st_size != source_stat.st_size:
+        return False
+
+    if dest_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        if previous_entry is not None and "hash" in previous_entry:
+            entry["hash"] = previous_entry["hash"]
+        return True
+
+    if not use_hash:
+        return False
+
+    # Same size but different mtime (e.g. after a fresh checkout): compare
+    # contents, reusing the recorded hash when the source itself is unchanged
+    if previous_entry is not None and previous_entry.get("size") == entry["size"] \
+            and previous_entry.get("mtime_ns") == entry["mtime_ns"] and "hash" in previous_entry:
+        entry["hash"] = previous_entry["hash"]
+    else:
+        entry["hash"] = hash_file(source_path)
+
+    if hash_file(dest_path) != entry["hash"]:
+        return False
+
+    os.utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return True
+
+
+def copy_file_fast(source_path, dest_path, hardlink=False):
+    """Copy source_path to dest_path using the cheapest method the platform
+    supports and return its name: hardlink, reflink, copy_file_range or copy.
+
+    The copy is made under a temp name and renamed over dest_path, so readers
+    never see a partial file and an existing dest that is a hardlink to the
+    source is never written through."""
+    tmp_path = temp_path_for(dest_path)
+    try:
+        if hardlink:
+            os.remove(tmp_path)
+            try:
+                os.link(source_path, tmp_path)
+                linked = True
+            except OSError:
+                linked = False
+            if linked:
+                os.replace(tmp_path, dest_path)
+                return "hardlink"
+
+        with open(source_path, 'rb') as source_file, open(tmp_path, 'wb') as dest_file:
+            method = kernel_copy(source_file, dest_file, os.fstat(source_file.fileno()).st_size)
+
+        shutil.copystat(source_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return method
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def kernel_copy(source_file, dest_file, size):
+    source_fd = source_file.fileno()
+    dest_fd = dest_file.fileno()
+
+    if fcntl is not None:
+        try:
+            fcntl.ioctl(dest_fd, FICLONE, source_fd)
+            return "reflink"
+        except OSError:
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            copied = 0
+            while copied < size:
+                count = os.copy_file_range(source_fd, dest_fd, size - copied)
+                if count == 0:
+                    break
+                copied += count
+            if copied == size:
+                return "copy_file_range"
+        except OSError:
+            pass
+        source_file.seek(0)
+        dest_file.seek(0)
+        dest_file.truncate()
+
+    shutil.copyfileobj(source_file, dest_file)
+    return "copy"
+
+
+def load_sync_state(state_path):
+    if state_path is None or not os.path.exists(state_path):
+        return {}
+
+    # A long-lived process (see builder.py) reuses the state it last saved or read
+    # instead of parsing it again, as long as nothing else rewrote the file
+    stat = os.stat(state_path)
+    cached = sync_state_cache.get(state_path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    state = load_json_state(state_path, "sync state")
+    files = {} if state is None else state.get("files", {})
+    sync_state_cache[state_path] = (stat.st_mtime_ns, stat.st_size, files)
+    return files
+
+
+def save_sync_state(state_path, files):
+    if state_path is None:
+        return
+
+    save_json_state(state_path, {"files": files})
+    stat = os.stat(state_path)
+    sync_state_cache[state_path] = (stat.st_mtime_ns, stat.st_size, files)
@@ -0,0 +1,132 @@
+"""Build daemon: keeps one Site in memory and answers requests on a Unix
+socket, so an editor can rebuild or preview pages without paying for
+interpreter startup, imports and cold caches on every save.
+
+    python3 src/main.py daemon [--socket .cache/daemon.sock] [basepath] [build options]
+
+Requests and responses are single lines of JSON (see client.py):
+
+    {"command": "build"}                 -> {"ok": true, "build": {...}, "ms": ...}
+    {"command": "preview", "path": ...}  -> {"ok": true, "html": "...", "ms": ...}
+    {"command": "status"}                -> {"ok": true, "builds": ..., ...}
+    {"command": "stop"}                  -> {"ok": true}
+
+A preview may carry "markdown" to render instead of the file, e.g. an
+unsaved buffer. Failures answer {"ok": false, "error": "..."}. Requests are
+handled one at a time, so a preview waits for a running build.
+"""
+import json
+import os
+import socketserver
+import time
+
+from client import send_request
+
+
+class BuildDaemon:
+    def __init__(self, site):
+        self.site = site
+        self.started = time.time()
+        self.last_build = None
+        self.requests = 0
+        self.stopping = False
+
+    def handle(self, request):
+        self.requests += 1
+        start = time.perf_counter()
+        command = request.get("command")
+        try:
+            if command == "build":
+                response = {"build": self.build()}
+            elif command == "preview":
+                if "path" not in request:
+                    raise ValueError("preview needs a path")
+                response = {"html": self.site.preview(request["path"], request.get("markdown"))}
+            elif command == "status":
+                response = self.status()
+            elif command == "stop":
+                self.stopping = True
+                response = {}
+            else:
+                raise ValueError(f"unknown command {command!r}")
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        response["ok"] = True
+        response["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return response
+
+    def build(self):
+        self.last_build = self.site.build().to_dict()
+        return self.last_build
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 3),
+            "requests": self.requests,
+            "builds": self.site.builds,
+            "pages": len(self.site.page_index.pages),
+            "fragment_cache": None if self.site.fragment_cache is None else self.site.fragment_cache.stats(),
+            "last_build": self.last_build,
+            "config": self.site.config.to_dict(),
+        }
+
+    def __repr__(self) -> str:
+        return f"BuildDaemon(site={self.site}, requests={self.requests})"
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # A client may send several requests over one connection
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {"ok": False, "error": f"invalid request: {e}"}
+            else:
+                response = self.server.daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            if self.server.daemon.stopping:
+                return
+
+
+def remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    try:
+        send_request(socket_path, {"command": "status"})
+    except (ConnectionError, OSError, ValueError):
+        os.remove(socket_path)
+        return
+    raise ValueError(f"A build daemon is already listening on {socket_path}")
+
+
+def run_daemon(site, socket_path):
+    """Build the site once, then serve requests on socket_path until a stop
+    request arrives."""
+    socket_dir = os.path.dirname(socket_path)
+    if socket_dir != "":
+        os.makedirs(socket_dir, exist_ok=True)
+    remove_stale_socket(socket_path)
+
+    daemon = BuildDaemon(site)
+    try:
+        daemon.build()
+    except Exception as e:
+        # Keep serving: the next build request reports what is still broken
+        print(f"Initial build failed: {e}")
+
+    server = socketserver.UnixStreamServer(socket_path, DaemonRequestHandler)
+    server.daemon = daemon
+    print(f"Build daemon listening on {socket_path}")
+    try:
+        while not daemon.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("Build daemon stopped")
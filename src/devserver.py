@@ -0,0 +1,201 @@
+"""Development server: rebuilds what changed under content/, static/ and the
+template, serves the output directory and reloads open browsers.
+
+    python3 src/main.py serve --watch [--port 8888] [basepath] [build options]
+"""
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from manifest import snapshot_files
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+
+LIVE_RELOAD_SCRIPT = """<script>
+(function () {
+	var pending = sessionStorage.getItem("livereload");
+	if (pending) {
+		sessionStorage.removeItem("livereload");
+		fetch("%(path)s/ack?build=" + pending);
+	}
+	var source = new EventSource("%(path)s");
+	source.onmessage = function (event) {
+		sessionStorage.setItem("livereload", event.data);
+		location.reload();
+	};
+})();
+</script>""" % {"path": LIVE_RELOAD_PATH}
+
+
+class FileWatcher:
+    def __init__(self, paths):
+        self.paths = paths
+        self.files = snapshot_files(paths)
+
+    def poll(self):
+        """Return (changed, deleted) file paths since the previous poll."""
+        files = snapshot_files(self.paths)
+        changed = [path for path, stat in files.items() if self.files.get(path) != stat]
+        deleted = [path for path in self.files if path not in files]
+        self.files = files
+        return changed, deleted
+
+
+class LiveReload:
+    """Tracks rebuilds so that waiting browsers can be told to reload and
+    report back how long the edit took to reach them."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.build_id = 0
+        self.edit_times = {}
+
+    def notify(self, edit_time_ns):
+        with self.condition:
+            self.build_id += 1
+            self.edit_times[self.build_id] = edit_time_ns
+            self.condition.notify_all()
+            return self.build_id
+
+    def wait(self, build_id, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.build_id != build_id, timeout)
+            return self.build_id
+
+    def acknowledge(self, build_id):
+        edit_time_ns = self.edit_times.pop(build_id, None)
+        if edit_time_ns is not None:
+            latency_ms = (time.time_ns() - edit_time_ns) / 1e6
+            print(f"Browser refreshed {latency_ms:.0f} ms after the edit (build {build_id})")
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == LIVE_RELOAD_PATH:
+            return self.stream_reload_events()
+        if url.path == LIVE_RELOAD_PATH + "/ack":
+            build_id = parse_qs(url.query).get("build", ["0"])[0]
+            if build_id.isdigit():
+                self.server.live_reload.acknowledge(int(build_id))
+            self.send_response(204)
+            self.end_headers()
+            return
+
+        file_path = self.translate_path(url.path)
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        if file_path.endswith(".html") and os.path.isfile(file_path) and url.path.endswith(("/", ".html")):
+            return self.send_html_with_reload(file_path)
+        return super().do_GET()
+
+    def send_html_with_reload(self, file_path):
+        with open(file_path, 'rb') as file:
+            html = file.read()
+        script = LIVE_RELOAD_SCRIPT.encode()
+        body_end = html.rfind(b"</body>")
+        if body_end == -1:
+            html += script
+        else:
+            html = html[:body_end] + script + html[body_end:]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(html)
+
+    def stream_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        live_reload = self.server.live_reload
+        build_id = live_reload.build_id
+        try:
+            while True:
+                new_build_id = live_reload.wait(build_id, timeout=15)
+                if new_build_id == build_id:
+                    # Comment line keeps proxies from closing an idle stream
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    build_id = new_build_id
+                    self.wfile.write(f"data: {build_id}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DevServer:
+    """Serves the output of a Site (see builder.py) and rebuilds it through
+    Site.rebuild as the watched files change, so a dev build runs the same
+    stages with the same options as any other build."""
+
+    def __init__(self, site):
+        self.site = site
+        self.live_reload = LiveReload()
+
+    def build(self):
+        return self.site.build()
+
+    def rebuild(self, changed, deleted):
+        """Rebuild only what the changed and deleted files affect; returns
+        the number of pages written."""
+        return self.site.rebuild(changed, deleted).pages_rendered
+
+    def watch(self, interval):
+        config = self.site.config
+        watcher = FileWatcher([config.content_dir, config.static_dir, config.template_path])
+        print(f"Watching {config.content_dir}, {config.static_dir} and {config.template_path}")
+        while True:
+            time.sleep(interval)
+            changed, deleted = watcher.poll()
+            if len(changed) == 0 and len(deleted) == 0:
+                continue
+
+            start = time.perf_counter()
+            try:
+                pages_written = self.rebuild(changed, deleted)
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+                continue
+            rebuild_ms = (time.perf_counter() - start) * 1000
+            # The newest mtime approximates when the writer saved the file
+            edit_time_ns = max([watcher.files[path][0] for path in changed if path in watcher.files], default=time.time_ns())
+            build_id = self.live_reload.notify(edit_time_ns)
+            print(
+                f"Rebuilt {pages_written} page(s) for {len(changed) + len(deleted)} changed file(s) in {rebuild_ms:.1f} ms, "
+                f"{(time.time_ns() - edit_time_ns) / 1e6:.0f} ms after the edit (build {build_id})"
+            )
+
+    def serve(self, port, watch=False, interval=0.2):
+        self.build()
+        dest_dir = self.site.config.dest_dir
+        server = ThreadingHTTPServer(("", port), lambda *args: DevRequestHandler(*args, directory=dest_dir))
+        server.daemon_threads = True
+        server.live_reload = self.live_reload
+        print(f"Serving {dest_dir} at http://localhost:{port}/")
+
+        if not watch:
+            server.serve_forever()
+            return
+
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.watch(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+
+
+def serve(site, port, watch=False, interval=0.2):
+    DevServer(site).serve(port, watch, interval)
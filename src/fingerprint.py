@@ -0,0 +1,160 @@
+"""Content-hashed asset names, so assets can be served with long cache
+lifetimes: static/index.css is published as index.3f9a1c2e.css and every
+href/src that points at /index.css is rendered with the new name."""
+import filecmp
+import json
+import os
+
+from copystatic import copy_file_fast, load_sync_state, save_sync_state
+from manifest import hash_bytes, hash_file
+from outputs import remove_empty_dirs, write_output
+from profiler import NULL_PROFILER
+
+
+FINGERPRINT_EXTENSIONS = (
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".woff", ".woff2", ".ttf",
+)
+FINGERPRINT_LENGTH = 8
+ASSET_MANIFEST_PATH = "asset-manifest.json"
+
+
+def fingerprinted_path(rel_path, file_hash):
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{file_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class AssetMap:
+    """Maps root-relative asset URLs to their fingerprinted URLs; files maps
+    each static file's path relative to the static dir to its published
+    relative path (unchanged for files that are not fingerprinted)."""
+
+    def __init__(self, urls, files):
+        self.urls = urls
+        self.files = files
+        self.digest = hash_bytes(json.dumps(urls, sort_keys=True).encode())
+
+    def lookup(self, url):
+        # Keep any query string or fragment after the rewritten path
+        cut = len(url)
+        for separator in "?#":
+            index = url.find(separator)
+            if index != -1:
+                cut = min(cut, index)
+        fingerprinted = self.urls.get(url[:cut])
+        if fingerprinted is None:
+            return url
+        return fingerprinted + url[cut:]
+
+    def __repr__(self) -> str:
+        return f"AssetMap(assets={len(self.urls)}, digest={self.digest[:12]})"
+
+
+def build_asset_map(source_dir_path, state_path=None):
+    """Hash every static file that gets fingerprinted. Hashes are cached in
+    state_path by size and mtime, so unchanged files are not read again."""
+    if not os.path.isdir(source_dir_path):
+        raise ValueError(f"Invalid source_dir_path path: {source_dir_path}\nMust be to a directory")
+
+    previous_files = load_sync_state(state_path)
+    current_files = {}
+    urls = {}
+    files = {}
+    hashed = 0
+
+    for dir_path, dir_names, file_names in os.walk(source_dir_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            source_path = os.path.join(dir_path, file_name)
+            rel_path = os.path.relpath(source_path, source_dir_path)
+            if not file_name.endswith(FINGERPRINT_EXTENSIONS):
+                files[rel_path] = rel_path
+                continue
+
+            stat = os.stat(source_path)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            previous = previous_files.get(rel_path)
+            if previous is not None and previous.get("size") == entry["size"] and previous.get("mtime_ns") == entry["mtime_ns"]:
+                entry["hash"] = previous["hash"]
+            else:
+                entry["hash"] = hash_file(source_path)
+                hashed += 1
+            current_files[rel_path] = entry
+
+            published_path = fingerprinted_path(rel_path, entry["hash"])
+            files[rel_path] = published_path
+            urls["/" + rel_path.replace(os.sep, "/")] = "/" + published_path.replace(os.sep, "/")
+
+    save_sync_state(state_path, current_files)
+    print(f"Fingerprinted {len(urls)} assets ({hashed} hashed, {len(urls) - hashed} from cache)")
+    return AssetMap(urls, files)
+
+
+def copy_assets(asset_map, source_dir_path, dest_dir_path, state_path=None, profiler=NULL_PROFILER, changes=None):
+    """Publish the static files under the names in asset_map and write the
+    asset manifest; returns every destination path. A fingerprinted file
+    that already exists with the right size has the same content, since the
+    name carries its hash. Files published by the previous run (recorded in
+    state_path) that are no longer wanted are deleted."""
+    os.makedirs(dest_dir_path, exist_ok=True)
+    previous_outputs = load_sync_state(state_path)
+    dest_paths = []
+
+    for rel_path, published_path in asset_map.files.items():
+        source_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, published_path)
+        dest_paths.append(dest_path)
+        if os.path.isfile(dest_path):
+            if published_path != rel_path:
+                current = os.path.getsize(dest_path) == os.path.getsize(source_path)
+            else:
+                current = filecmp.cmp(source_path, dest_path, shallow=False)
+            if current:
+                if changes is not None:
+                    changes.record(dest_path, False)
+                continue
+
+        print(f"Copying {rel_path} to {dest_path}")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with profiler.span("copy", "asset", {"file": source_path}):
+            copy_file_fast(source_path, dest_path)
+        if changes is not None:
+            changes.record(dest_path, True)
+
+    manifest_path = os.path.join(dest_dir_path, ASSET_MANIFEST_PATH)
+    changed = write_output(manifest_path, json.dumps(asset_map.urls, indent=1, sort_keys=True) + "\n")
+    dest_paths.append(manifest_path)
+    if changes is not None:
+        changes.record(manifest_path, changed)
+
+    current_outputs = {os.path.relpath(path, dest_dir_path): {} for path in dest_paths}
+    for rel_path in sorted(set(previous_outputs) - set(current_outputs)):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if os.path.isfile(dest_path):
+            print(f"Removing stale asset {dest_path}")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+            if changes is not None:
+                changes.record_deleted(dest_path)
+    save_sync_state(state_path, current_outputs)
+    return dest_paths
+
+
+def remove_published_assets(source_dir_path, dest_dir_path, state_path, changes=None):
+    """Delete the fingerprinted files and asset manifest an earlier
+    copy_assets run recorded in state_path, and the state itself, for a
+    build that no longer fingerprints. Files published under their own
+    name are left to the static sync. Returns the number of files deleted."""
+    deleted = 0
+    for rel_path in sorted(load_sync_state(state_path)):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if os.path.isfile(os.path.join(source_dir_path, rel_path)) or not os.path.isfile(dest_path):
+            continue
+        print(f"Removing stale asset {dest_path}")
+        os.remove(dest_path)
+        remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+        deleted += 1
+        if changes is not None:
+            changes.record_deleted(dest_path)
+    if state_path is not None and os.path.exists(state_path):
+        os.remove(state_path)
+    return deleted
@@ -0,0 +1,70 @@
+"""Shared by the test modules: a temporary directory laid out like a site,
+with helpers to write its files and read the outputs back."""
+import os
+import tempfile
+import time
+import unittest
+
+from builder import SiteConfig
+
+
+def write_file(path, content, touch=False):
+    """Write content to path, creating its directory. touch moves the mtime
+    a second ahead, so stat snapshots see the change even on filesystems
+    with a coarse clock."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+    if touch:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, time.time_ns() + 10**9))
+
+
+def read_file(path):
+    with open(path, 'r') as file:
+        return file.read()
+
+
+def read_tree(dir_path):
+    """Every file under dir_path, as relative path -> bytes."""
+    files = {}
+    for cur_dir, _, file_names in os.walk(dir_path):
+        for file_name in file_names:
+            path = os.path.join(cur_dir, file_name)
+            with open(path, 'rb') as file:
+                files[os.path.relpath(path, dir_path)] = file.read()
+    return files
+
+
+class SiteTestCase(unittest.TestCase):
+    """A TestCase with a temporary root holding the paths of a site:
+    content/, static/, template.html, docs/ and cache/. Nothing is created
+    until a test writes it."""
+
+    # Set by tests whose builds compare stat snapshots
+    touch_writes = False
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.root = self.tmp_dir.name
+        self.content_dir = os.path.join(self.root, "content")
+        self.static_dir = os.path.join(self.root, "static")
+        self.template_path = os.path.join(self.root, "template.html")
+        self.dest_dir = os.path.join(self.root, "docs")
+        self.cache_dir = os.path.join(self.root, "cache")
+
+    def write(self, path, content):
+        write_file(path, content, self.touch_writes)
+
+    def site_config(self, **options):
+        """A SiteConfig for this site; options override any setting."""
+        settings = {
+            "content_dir": self.content_dir,
+            "static_dir": self.static_dir,
+            "template_path": self.template_path,
+            "dest_dir": self.dest_dir,
+            "cache_dir": self.cache_dir,
+        }
+        settings.update(options)
+        return SiteConfig(**settings)
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+
+from block_markdown import PARSER_VERSION, block_to_html_node
+from outputs import load_json_state, save_json_state
+
+
+DEFAULT_MAX_ENTRIES = 10000
+# Larger blocks are rendered every time: they rarely repeat and would crowd
+# the boilerplate out of the memo
+MAX_FRAGMENT_CHARS = 4096
+
+# The FragmentCache of each worker process, by the path it was loaded from
+worker_caches = {}
+
+
+def worker_fragment_cache(path, max_entries):
+    """The FragmentCache a FragmentCache sent to a worker process unpickles
+    to: loaded from path on the first page the worker renders, then kept
+    for the rest of the build."""
+    key = (path, max_entries)
+    if key not in worker_caches:
+        cache = FragmentCache(path, max_entries)
+        cache.load()
+        worker_caches[key] = cache
+    return worker_caches[key]
+
+
+class FragmentCache:
+    """Bounded LRU memo of rendered blocks. Large sites repeat the same
+    blocks on many pages (disclaimers, author bios, link lists), so the HTML
+    of a block is kept under its type, its text and the key of the
+    UrlResolver its links were resolved with, and each repeat skips inline
+    parsing and serializing.
+
+    Every process has its own memo. Blocks seen more than once are sent
+    back to the parent with each PageResult (see take_repeated and merge)
+    and saved to path after the build, which is where worker processes of
+    the next build start from. Hits and misses are tallied by the parent
+    with record(), like ParseCache.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        # key -> [html, urls, title, repeated]
+        self.entries = OrderedDict()
+        # Keys that repeated since the last take_repeated()
+        self.repeated = []
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        # Sent to worker processes as a reference to their own memo, not as a copy
+        return worker_fragment_cache, (self.path, self.max_entries)
+
+    def key(self, block, url_key):
+        """The memo key of block, or None for blocks too large to memoize."""
+        if len(block.text) > MAX_FRAGMENT_CHARS:
+            return None
+        return (url_key, block.block_type.value, block.text)
+
+    def get(self, key, resolve_url=None):
+        """Return (html, title) for key or None on a miss. resolve_url is
+        called for every link and image of the block as rendering it would,
+        so callers recording links still see them."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        if not entry[3]:
+            entry[3] = True
+            self.repeated.append(key)
+        if resolve_url is not None:
+            for url in entry[1]:
+                resolve_url(url)
+        return entry[0], entry[2]
+
+    def put(self, key, html, urls, title=None):
+        """Add a rendered block: urls are its link and image URLs as written,
+        title the text of its h1 if it is one (see render_block)."""
+        self.add(key, [html, urls, title, False])
+
+    def add(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def take_repeated(self):
+        """The blocks that repeated since the last call, as [key, html, urls,
+        title] lists for merge()."""
+        fragments = []
+        for key in self.repeated:
+            entry = self.entries.get(key)
+            if entry is not None:
+                fragments.append([key, entry[0], entry[1], entry[2]])
+        self.repeated = []
+        return fragments
+
+    def merge(self, fragments):
+        """Add the repeated blocks a worker process reported."""
+        for key, html, urls, title in fragments:
+            key = tuple(key)
+            if key not in self.entries:
+                self.add(key, [html, urls, title, True])
+
+    def record(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return 0.0 if lookups == 0 else self.hits / lookups
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4), "entries": len(self.entries)}
+
+    def load(self):
+        data = load_json_state(self.path, "fragment cache")
+        if data is None or data.get("version") != PARSER_VERSION:
+            return
+        for url_key, block_type, text, html, urls, title in data["fragments"]:
+            self.add((url_key, block_type, text), [html, urls, title, True])
+
+    def save(self):
+        """Write the blocks that repeated, least recently used first."""
+        fragments = [list(key) + entry[:3] for key, entry in self.entries.items() if entry[3]]
+        save_json_state(self.path, {"version": PARSER_VERSION, "fragments": fragments}, indent=None)
+
+    def __repr__(self) -> str:
+        return f"FragmentCache(path={self.path}, max_entries={self.max_entries}, entries={len(self.entries)}, hits={self.hits}, misses={self.misses})"
+
+
+def render_block(block, resolve_url=None):
+    """block_to_html_node for a block headed for the memo: returns the
+    node, the URLs resolve_url was called with and the h1 title."""
+    urls = []
+
+    def record_url(url):
+        urls.append(url)
+        return url if resolve_url is None else resolve_url(url)
+
+    html_node = block_to_html_node(block.text, block.block_type, record_url)
+    return html_node, urls, h1_title(html_node)
+
+
+def h1_title(html_node):
+    if html_node.tag != "h1":
+        return None
+    return html_node.text_content().strip()
@@ -0,0 +1,112 @@
+import re
+from itertools import chain
+
+
+FRONT_MATTER_DELIMITER = "---"
+
+front_matter_line_regex = re.compile(r"^([A-Za-z_][\w-]*)\s*:\s*(.*)$")
+front_matter_item_regex = re.compile(r"^\s*-\s+(.*)$")
+
+
+def split_front_matter(markdown):
+    """Split a leading front matter block off markdown.
+
+    Front matter is delimited by --- lines at the very start of the document:
+
+        ---
+        title: Why Tom Bombadil Was a Mistake
+        date: 2024-05-01
+        tags: [tolkien, essays]
+        draft: false
+        ---
+
+    Returns (front_matter, body, body_start_line) where body_start_line is the
+    1-based line of markdown that body starts on. Documents without front
+    matter are returned whole with an empty dict."""
+    if not markdown.startswith(FRONT_MATTER_DELIMITER + "\n"):
+        return {}, markdown, 1
+
+    lines = markdown.split("\n")
+    for end, line in enumerate(lines[1:], start=1):
+        if line.rstrip() == FRONT_MATTER_DELIMITER:
+            front_matter = parse_front_matter(lines[1:end])
+            return front_matter, "\n".join(lines[end + 1:]), end + 2
+    # No closing delimiter: the --- is an ordinary line of the document
+    return {}, markdown, 1
+
+
+def split_front_matter_lines(lines):
+    """split_front_matter for an iterable of lines that keep their line
+    endings, such as an open file, reading only as far as the front matter.
+    Returns (front_matter, body_lines, body_start_line) where body_lines
+    iterates the remaining lines of the body without their line endings."""
+    lines = iter(lines)
+    first_line = next(lines, "")
+    if first_line != FRONT_MATTER_DELIMITER + "\n":
+        return {}, strip_line_endings(chain([first_line], lines)), 1
+
+    front_matter_lines = []
+    for line in strip_line_endings(lines):
+        if line.rstrip() == FRONT_MATTER_DELIMITER:
+            return parse_front_matter(front_matter_lines), strip_line_endings(lines), len(front_matter_lines) + 3
+        front_matter_lines.append(line)
+    # No closing delimiter: the --- is an ordinary line of the document
+    return {}, chain([FRONT_MATTER_DELIMITER], front_matter_lines), 1
+
+
+def strip_line_endings(lines):
+    for line in lines:
+        yield line[:-1] if line.endswith("\n") else line
+
+
+def parse_front_matter(lines):
+    front_matter = {}
+    key = None
+    for number, line in enumerate(lines, start=2):
+        if line.strip() == "" or line.lstrip().startswith("#"):
+            continue
+
+        item_match = front_matter_item_regex.match(line)
+        if item_match is not None and key is not None and (front_matter[key] == "" or isinstance(front_matter[key], list)):
+            # "key:" followed by indented "- item" lines is a list
+            if front_matter[key] == "":
+                front_matter[key] = []
+            front_matter[key].append(parse_scalar(item_match.group(1)))
+            continue
+
+        match = front_matter_line_regex.match(line)
+        if match is None:
+            raise ValueError(f"invalid front matter on line {number}: {line}")
+        key, value = match.group(1), match.group(2).strip()
+        front_matter[key] = parse_value(value)
+    return normalize_front_matter(front_matter)
+
+
+def parse_value(value):
+    if value.startswith("[") and value.endswith("]"):
+        return [parse_scalar(item) for item in value[1:-1].split(",") if item.strip() != ""]
+    return parse_scalar(value)
+
+
+def parse_scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+
+def normalize_front_matter(front_matter):
+    if "title" in front_matter and not isinstance(front_matter["title"], str):
+        raise ValueError(f"front matter title must be a string: {front_matter['title']}")
+    if "date" in front_matter and not isinstance(front_matter["date"], str):
+        raise ValueError(f"front matter date must be a string: {front_matter['date']}")
+    if "template" in front_matter and not isinstance(front_matter["template"], str):
+        raise ValueError(f"front matter template must be a path: {front_matter['template']}")
+    if "draft" in front_matter and not isinstance(front_matter["draft"], bool):
+        raise ValueError(f"front matter draft must be true or false: {front_matter['draft']}")
+    if "tags" in front_matter:
+        tags = front_matter["tags"]
+        front_matter["tags"] = [tags] if isinstance(tags, str) else [str(tag) for tag in tags]
+    return front_matter
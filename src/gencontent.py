@@ -1,5 +1,50 @@
+import hashlib
 import os
-from block_markdown import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor
+from block_markdown import BlockType, block_to_html_node, blocks_to_html_node, iter_blocks, parse_blocks
+from fragmentcache import render_block
+from frontmatter import split_front_matter, split_front_matter_lines
+from htmlnode import HTMLNode
+from linkcheck import LinkCollector
+from manifest import hash_bytes, hash_file, is_entry_current
+from outputs import commit_output, temp_path_for, write_output
+from profiler import NULL_PROFILER, Profiler
+from shards import page_shard
+from template import load_template
+from urls import UrlResolver
+
+
+# Pages at least this large are streamed block by block (see stream_page)
+STREAM_THRESHOLD_BYTES = 16 * 1024 * 1024
+
+class PageResult:
+    def __init__(self, from_path, dest_path, source_hash=None, template_hash=None, output_hash=None, rendered=False, error=None):
+        self.from_path = from_path
+        self.dest_path = dest_path
+        self.source_hash = source_hash
+        self.template_hash = template_hash
+        self.output_hash = output_hash
+        self.rendered = rendered
+        self.error = error
+        self.changed = False
+        self.metadata = None
+        self.links = None
+        self.draft = False
+        self.cache_hit = None
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        self.fragments = ()
+        self.spans = ()
+
+    def __repr__(self) -> str:
+        return f"PageResult(from_path={self.from_path}, dest_path={self.dest_path}, rendered={self.rendered}, error={self.error})"
+
+
+class BuildError(Exception):
+    def __init__(self, failed_results):
+        self.failed_results = failed_results
+        details = "\n".join(f"  {result.from_path}: {result.error}" for result in failed_results)
+        super().__init__(f"{len(failed_results)} page(s) failed to build:\n{details}")
 
 
 def get_file_contents(file_path):
@@ -8,33 +53,349 @@ def get_file_contents(file_path):
     file.close()
     return content
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    from_content = get_file_contents(from_path)
-    template_content = get_file_contents(template_path)
-    html_string = markdown_to_html_node(from_content).to_html()
-    title = extract_title(from_content)
-    html_page = template_content.replace("{{ Title }}", title)
-    html_page = html_page.replace("{{ Content }}", html_string)
-    html_page = html_page.replace("href=\"/", f"href=\"{basepath}")
-    html_page = html_page.replace("src=\"/", f"src=\"{basepath}")
-    dest_file = open(dest_path, 'w')
-    dest_file.write(html_page)
-    dest_file.close()
-
-def extract_title(markdown):
-    lines = markdown.split("\n")
-    for line in lines:
-        if line.startswith("# "):
-            return line.split("# ")[1].strip()
-    raise Exception("Markdown should have title")
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def first_h1_in_blocks(blocks):
+    # Stops at the first h1, so a streamed page is only read up to it
+    for block in blocks:
+        if block.block_type == BlockType.HEADING and block.text.startswith("# "):
+            return block_to_html_node(block.text, block.block_type).text_content().strip()
+    return None
+
+def first_h1_text(body):
+    for child in body.children:
+        if child.tag == "h1":
+            return child.text_content().strip()
+    return None
+
+def page_metadata(front_matter, h1_title, from_path=None):
+    """The front matter, with the title falling back to the first h1."""
+    metadata = dict(front_matter)
+    metadata.pop("draft", None)
+    if "title" not in metadata:
+        if h1_title is None:
+            raise ValueError(f"{from_path or 'page'} has no title: set one in its front matter or start it with a '# ' heading")
+        metadata["title"] = h1_title
+    return metadata
+
+def page_template_path(template_path, front_matter):
+    # A front matter template is looked up next to the default template
+    if "template" not in front_matter:
+        return template_path
+    return os.path.join(os.path.dirname(template_path), front_matter["template"])
+
+def page_variables(body, metadata):
+    """body is either the page's HTMLNode, streamed into the template, a
+    generator of its HTML chunks or its already serialized HTML. URLs in it
+    are already resolved. Every front matter field is available to the
+    template, lists joined by commas."""
+    variables = {}
+    for key, value in metadata.items():
+        variables[key] = ", ".join(value) if isinstance(value, list) else value
+    variables["Title"] = metadata["title"]
+    if isinstance(body, HTMLNode):
+        variables["Content"] = body.iter_html()
+    else:
+        variables["Content"] = body
+    return variables
+
+def write_page(dest_path, variables, template):
+    """Stream the rendered page into a temp file next to dest_path and move
+    it into place only if it differs from what is there already. Returns the
+    sha256 hex digest of the page and whether dest_path changed."""
+    hasher = hashlib.sha256()
+    tmp_path = temp_path_for(dest_path)
+
+    try:
+        with open(tmp_path, 'w') as dest_file:
+            def write(chunk):
+                dest_file.write(chunk)
+                hasher.update(chunk.encode())
+
+            template.render_to(write, variables)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return hasher.hexdigest(), commit_output(tmp_path, dest_path)
+
+def write_file(dest_path, html_page):
+    return hash_bytes(html_page.encode()), write_output(dest_path, html_page)
+
+def build_page(from_path, template_path, dest_path, basepath, previous_entry=None, profile=False, parse_cache=None, assets=None, stream_threshold=STREAM_THRESHOLD_BYTES, fragment_cache=None):
+    if not profile:
+        return build_page_stages(from_path, template_path, dest_path, basepath, previous_entry, NULL_PROFILER, parse_cache, assets, stream_threshold, fragment_cache)
+
+    profiler = Profiler()
+    with profiler.span("page", "page", {"page": from_path}):
+        result = build_page_stages(from_path, template_path, dest_path, basepath, previous_entry, profiler, parse_cache, assets, stream_threshold, fragment_cache)
+    result.spans = profiler.events
+    return result
+
+def build_page_stages(from_path, template_path, dest_path, basepath, previous_entry, profiler, parse_cache, assets=None, stream_threshold=None, fragment_cache=None):
+    if stream_threshold is not None and os.path.getsize(from_path) >= stream_threshold:
+        return stream_page(from_path, template_path, dest_path, basepath, previous_entry, profiler, assets)
+
+    span_args = {"page": from_path}
+    url_resolver = UrlResolver(basepath, assets)
+    with profiler.span("read", "page", span_args):
+        from_content = get_file_contents(from_path)
+        front_matter, body_markdown, body_start_line = split_front_matter(from_content)
+        template = load_template(page_template_path(template_path, front_matter), basepath, assets)
+    result = PageResult(from_path, dest_path, hash_bytes(from_content.encode()), template.source_hash)
+
+    if front_matter.get("draft", False):
+        result.draft = True
+        return result
+
+    if previous_entry is not None and is_entry_current(previous_entry, result.source_hash, result.template_hash, url_resolver.key, dest_path):
+        return result
+
+    cached = None
+    if parse_cache is not None:
+        with profiler.span("cache_read", "page", span_args):
+            cached = parse_cache.get(result.source_hash, url_resolver.key)
+        result.cache_hit = cached is not None
+
+    if cached is not None:
+        body, h1_title, result.links = cached
+    else:
+        with profiler.span("block_parse", "page", span_args):
+            blocks = parse_blocks(body_markdown)
+        # Record link and image URLs for the link checker as they are resolved
+        link_collector = LinkCollector(url_resolver.resolve)
+        if fragment_cache is None:
+            with profiler.span("inline_parse", "page", span_args):
+                body = blocks_to_html_node(blocks, link_collector.resolve)
+                h1_title = first_h1_text(body)
+        else:
+            body, h1_title = memoized_body_html(blocks, fragment_cache, url_resolver.key, link_collector.resolve, result, profiler, span_args)
+        result.links = link_collector.locate(body_markdown, body_start_line)
+        if parse_cache is not None:
+            # The cache needs the serialized body anyway, so it is not streamed
+            if not isinstance(body, str):
+                with profiler.span("html_serialize", "page", span_args):
+                    body = body.to_html()
+            parse_cache.put(result.source_hash, body, h1_title, url_resolver.key, result.links)
+    result.metadata = page_metadata(front_matter, h1_title, from_path)
+    variables = page_variables(body, result.metadata)
+
+    if not profiler.enabled:
+        result.output_hash, result.changed = write_page(dest_path, variables, template)
+    else:
+        # Streaming interleaves serializing, filling and writing; build the
+        # page in memory instead so each stage gets its own span
+        if not isinstance(variables["Content"], str):
+            with profiler.span("html_serialize", "page", span_args):
+                variables["Content"] = "".join(variables["Content"])
+        with profiler.span("template_fill", "page", span_args):
+            html_page = template.render(variables)
+        with profiler.span("write", "page", span_args):
+            result.output_hash, result.changed = write_file(dest_path, html_page)
+    result.rendered = True
+    return result
+
+def stream_page(from_path, template_path, dest_path, basepath, previous_entry, profiler, assets=None):
+    """build_page_stages for pages too large to hold in memory: the markdown
+    is read line by line and each block's HTML is written as soon as it is
+    converted, so memory use depends on the largest block, not on the page.
+    The file is read again for each pass (front matter, the h1 title when
+    the front matter has none, the body) and the parse cache is bypassed,
+    as it would need the whole body at once, and so is the fragment cache."""
+    span_args = {"page": from_path}
+    url_resolver = UrlResolver(basepath, assets)
+    with profiler.span("read", "page", span_args):
+        with open(from_path, 'r') as file:
+            front_matter, _, _ = split_front_matter_lines(file)
+        template = load_template(page_template_path(template_path, front_matter), basepath, assets)
+        result = PageResult(from_path, dest_path, hash_file(from_path), template.source_hash)
+
+    if front_matter.get("draft", False):
+        result.draft = True
+        return result
+
+    if previous_entry is not None and is_entry_current(previous_entry, result.source_hash, result.template_hash, url_resolver.key, dest_path):
+        return result
+
+    h1_title = None
+    if "title" not in front_matter:
+        with profiler.span("block_parse", "page", span_args):
+            with open(from_path, 'r') as file:
+                _, body_lines, _ = split_front_matter_lines(file)
+                h1_title = first_h1_in_blocks(iter_blocks(body_lines))
+    result.metadata = page_metadata(front_matter, h1_title, from_path)
+
+    link_collector = LinkCollector(url_resolver.resolve)
+    with profiler.span("stream", "page", span_args):
+        with open(from_path, 'r') as file:
+            _, body_lines, body_start_line = split_front_matter_lines(file)
+            body = stream_body_html(iter_blocks(body_lines), link_collector, body_start_line - 1)
+            result.output_hash, result.changed = write_page(dest_path, page_variables(body, result.metadata), template)
+    result.links = link_collector.links
+    result.rendered = True
+    return result
+
+def memoized_body_html(blocks, fragment_cache, url_key, resolve_url, result, profiler=NULL_PROFILER, span_args=None):
+    """The HTML of blocks_to_html_node(blocks) and the text of its first h1,
+    with every block looked up in fragment_cache first. Blocks it misses
+    are converted to nodes, then serialized in a stage of their own and
+    added to it. Counts the hits and misses on result and hands it the
+    blocks that repeated, for the parent process to merge."""
+    # HTML of the blocks found in the memo, nodes of the others
+    parts = ["<div>"]
+    misses = []
+    h1_title = None
+    with profiler.span("inline_parse", "page", span_args):
+        for block in blocks:
+            key = fragment_cache.key(block, url_key)
+            cached = None if key is None else fragment_cache.get(key, resolve_url)
+            if cached is not None:
+                html, title = cached
+                parts.append(html)
+                result.fragment_hits += 1
+            else:
+                html_node, urls, title = render_block(block, resolve_url)
+                if key is not None:
+                    misses.append((len(parts), key, urls, title))
+                    result.fragment_misses += 1
+                parts.append(html_node)
+            if h1_title is None:
+                h1_title = title
+    parts.append("</div>")
+
+    with profiler.span("html_serialize", "page", span_args):
+        for index, part in enumerate(parts):
+            if not isinstance(part, str):
+                parts[index] = part.to_html()
+        for index, key, urls, title in misses:
+            fragment_cache.put(key, parts[index], urls, title)
+    result.fragments = fragment_cache.take_repeated()
+    return "".join(parts), h1_title
+
+def stream_body_html(blocks, link_collector, line_offset=0):
+    """The same HTML as blocks_to_html_node(blocks).iter_html(), built one
+    block at a time."""
+    yield "<div>"
+    for block in blocks:
+        html_node = block_to_html_node(block.text, block.block_type, link_collector.resolve)
+        link_collector.locate(block.text, block.start_line + line_offset)
+        yield from html_node.iter_html()
+    yield "</div>"
+
+def build_page_job(job):
+    # Runs in a worker process: report failures instead of raising so that one
+    # broken page does not cancel the rest of the pool
+    from_path, template_path, dest_path, basepath, previous_entry, profile, parse_cache, assets, stream_threshold, fragment_cache = job
+    try:
+        return build_page(from_path, template_path, dest_path, basepath, previous_entry, profile, parse_cache, assets, stream_threshold, fragment_cache)
+    except Exception as e:
+        return PageResult(from_path, dest_path, error=f"{type(e).__name__}: {e}")
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    return os.path.join(dest_dir_path, rel_path).replace(".md", ".html")
+
+def collect_pages(dir_path_content, dest_dir_path, pages=None, dest_dirs=None):
+    if pages is None:
+        pages = []
+    if dest_dirs is None:
+        dest_dirs = []
+
     for item in os.listdir(dir_path_content):
         cur_path = os.path.join(dir_path_content, item)
         dest_path = os.path.join(dest_dir_path, item)
         if os.path.isfile(cur_path):
-            generate_page(cur_path, template_path, dest_path.replace(".md", ".html"), basepath)
+            pages.append((cur_path, dest_path.replace(".md", ".html")))
         else:
-            os.mkdir(dest_path)
-            generate_pages_recursive(cur_path, template_path, dest_path, basepath)
+            dest_dirs.append(dest_path)
+            collect_pages(cur_path, dest_path, pages, dest_dirs)
+    return pages, dest_dirs
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest=None, jobs=1, profiler=NULL_PROFILER, parse_cache=None, changes=None, page_index=None, assets=None, stream_threshold=STREAM_THRESHOLD_BYTES, unchanged_sources=None, shard=None, fragment_cache=None, pages=None):
+    """Build every page under dir_path_content. With a manifest, pages whose
+    inputs are unchanged are skipped; unchanged_sources optionally names
+    sources a long-lived caller knows are untouched (markdown and template)
+    since the manifest recorded them, which are skipped without being read.
+    shard=(i, N) builds only the pages of shard i of N (see shards.py).
+    fragment_cache (see fragmentcache.py) memoizes repeated blocks. pages,
+    a list of (from_path, dest_path), replaces walking dir_path_content for
+    a caller that already knows every page."""
+    if pages is None:
+        pages, dest_dirs = collect_pages(dir_path_content, dest_dir_path)
+    else:
+        dest_dirs = sorted({os.path.dirname(dest_path) for _, dest_path in pages})
+    url_key = UrlResolver(basepath, assets).key
+    os.makedirs(dest_dir_path, exist_ok=True)
+    if shard is not None:
+        index, count = shard
+        pages = [(from_path, dest_path) for from_path, dest_path in pages if page_shard(os.path.relpath(from_path, dir_path_content), count) == index]
+        # Only the directories of this shard's pages
+        dest_dirs = sorted({os.path.dirname(dest_path) for _, dest_path in pages})
+    for dest_path in dest_dirs:
+        os.makedirs(dest_path, exist_ok=True)
+
+    page_jobs = []
+    skipped_results = []
+    for from_path, dest_path in pages:
+        previous_entry = None if manifest is None else manifest.entry(from_path)
+        if page_index is not None and from_path not in page_index.pages:
+            # Re-render pages the index has no metadata for
+            previous_entry = None
+        if (
+            previous_entry is not None
+            and unchanged_sources is not None
+            and from_path in unchanged_sources
+            and previous_entry["url_key"] == url_key
+            and previous_entry["dest_path"] == dest_path
+            and os.path.isfile(dest_path)
+        ):
+            skipped_results.append(PageResult(from_path, dest_path, previous_entry["source_hash"], previous_entry["template_hash"], previous_entry["output_hash"]))
+            continue
+        page_jobs.append((from_path, template_path, dest_path, basepath, previous_entry, profiler.enabled, parse_cache, assets, stream_threshold, fragment_cache))
+
+    if jobs > 1 and len(page_jobs) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(page_jobs) // (jobs * 4))
+            results = list(executor.map(build_page_job, page_jobs, chunksize=chunksize))
+    else:
+        results = [build_page(*job) for job in page_jobs]
+    results = skipped_results + results
+
+    failed_results = []
+    for result in results:
+        profiler.extend(result.spans)
+        if parse_cache is not None and result.cache_hit is not None:
+            parse_cache.record(result.cache_hit)
+        if fragment_cache is not None:
+            fragment_cache.record(result.fragment_hits, result.fragment_misses)
+            fragment_cache.merge(result.fragments)
+        if result.error is not None:
+            print(f"Failed to generate page from {result.from_path}: {result.error}")
+            failed_results.append(result)
+            continue
+        if result.draft:
+            print(f"Skipping draft {result.from_path}")
+            if manifest is not None:
+                manifest.remove_page(result.from_path, dest_dir_path)
+            if page_index is not None:
+                page_index.remove(result.from_path)
+            continue
+        if result.rendered:
+            print(f"Generated page from {result.from_path} to {result.dest_path} using {template_path}")
+        if changes is not None:
+            changes.record(result.dest_path, result.changed)
+        if manifest is not None:
+            manifest.record_result(result, url_key)
+        if page_index is not None:
+            if result.metadata is not None:
+                page_index.record(result.from_path, result.metadata, result.dest_path, dest_dir_path, result.links)
+            else:
+                page_index.keep(result.from_path)
+
+    if parse_cache is not None:
+        parse_cache.evict()
+        print(f"Parse cache: {parse_cache.hits} hits, {parse_cache.misses} misses")
+    if fragment_cache is not None:
+        fragment_cache.save()
+        print(f"Fragment cache: {fragment_cache.hits} hits, {fragment_cache.misses} misses ({fragment_cache.hit_rate:.0%} hit rate)")
+
+    if len(failed_results) > 0:
+        raise BuildError(failed_results)
+    return results
@@ -1,5 +1,10 @@
 
 class HTMLNode:
+    # Sites allocate millions of nodes: __slots__ drops the per-instance
+    # __dict__, and the subclasses set their fields directly instead of
+    # going through super().__init__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -7,26 +12,58 @@ class HTMLNode:
         self.props = props
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def render_to(self, write):
+        for chunk in self.iter_html():
+            write(chunk)
+
+    def iter_html(self):
+        # Walk the tree with an explicit stack so deep documents cannot hit the
+        # recursion limit; closing tags are pushed as plain strings
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                yield node.open_html()
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.leaf_html()
+
+    def leaf_html(self):
         raise NotImplementedError()
 
+    def text_content(self):
+        """The values of every leaf below this node, without any markup."""
+        if self.children is None:
+            return "" if self.value is None else self.value
+        return "".join(child.text_content() for child in self.children)
+
     def props_to_html(self):
-        html_props = ""
-        
         if self.props == None:
-            return html_props
+            return ""
 
-        for prop in self.props:
-            html_props += f" {prop}=\"{self.props[prop]}\""
-        return html_props
+        return "".join([f" {prop}=\"{self.props[prop]}\"" for prop in self.props])
 
     def __repr__(self) -> str:
         return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def to_html(self):
+        return self.leaf_html()
+
+    def leaf_html(self):
         if self.value == None:
             raise ValueError('All leaf nodes must have a value')
 
@@ -39,24 +76,22 @@ class LeafNode(HTMLNode):
         return f"LeafNode(tag={self.tag}, value={self.value}, props={self.props})"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def open_html(self):
         if self.tag == None:
             raise ValueError('All parent nodes must have a tag')
 
         if self.children == None:
             raise ValueError('All parent nodes must have children')
 
-        html_str = f"<{self.tag}{self.props_to_html()}>"
-
-        for child in self.children:
-            html_str += child.to_html()
-
-        html_str += f"</{self.tag}>"
-
-        return html_str
+        return f"<{self.tag}{self.props_to_html()}>"
 
     def __repr__(self) -> str:
         return f"ParentNode(tag={self.tag}, children={self.children}, props={self.props})"
@@ -3,30 +3,78 @@ import re
 from textnode import TextNode, TextType
 
 
-def text_to_textnodes(text):
-    base_textnode = TextNode(text, TextType.TEXT);
-
-    delimiters_and_type_tuples = [
-        ('**', TextType.BOLD),
-        ('_', TextType.ITALIC),
-        ('`', TextType.CODE),
-    ]
+inline_token_regex = re.compile(r"[`*_!\[]")
+image_regex = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+link_regex = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
-    textnodes = [base_textnode]
+delimiter_text_types = {
+    '**': TextType.BOLD,
+    '_': TextType.ITALIC,
+    '`': TextType.CODE,
+}
 
-    for delimiters_and_type_tuple in delimiters_and_type_tuples:
-        textnodes = split_nodes_delimiter(
-            textnodes,
-            delimiters_and_type_tuple[0],
-            delimiters_and_type_tuple[1]
-        )
 
-    textnodes = split_nodes_image(textnodes)
-    textnodes = split_nodes_link(textnodes)
+def text_to_textnodes(text):
+    """Split text into TextNodes in a single left-to-right scan.
+
+    Whichever construct starts first wins and its contents are taken
+    literally, so code spans and link/image targets are never split on
+    emphasis delimiters. An unmatched **, _ or ` raises like
+    split_nodes_delimiter does.
+
+    This deliberately differs from the old split_nodes pipeline, which
+    split on delimiters before looking for links: a delimiter inside a link
+    or image no longer pairs with one outside it. "[l](/a_b) some_thing"
+    used to render an italic "b) some" and a broken link, and now raises
+    for the unmatched _ as "some_thing" alone always did.
+    """
+    textnodes = []
+    text_start = 0
+    position = 0
+
+    while True:
+        match = inline_token_regex.search(text, position)
+        if match is None:
+            break
+
+        start = match.start()
+        char = text[start]
+        url = None
+
+        if char == '!' or char == '[':
+            if char == '[' and start > 0 and text[start - 1] == '!':
+                position = start + 1
+                continue
+            regex_match = (image_regex if char == '!' else link_regex).match(text, start)
+            if regex_match is None:
+                position = start + 1
+                continue
+            text_type = TextType.IMAGE if char == '!' else TextType.LINK
+            token_text, url = regex_match.group(1), regex_match.group(2)
+            end = regex_match.end()
+        else:
+            delimiter = '**' if text.startswith('**', start) else char
+            if delimiter == '*':
+                position = start + 1
+                continue
+            close = text.find(delimiter, start + len(delimiter))
+            if close == -1:
+                raise Exception(f"invalid markdown sytax: {text}")
+            text_type = delimiter_text_types[delimiter]
+            token_text = text[start + len(delimiter):close]
+            end = close + len(delimiter)
+
+        if text_start < start:
+            textnodes.append(TextNode(text[text_start:start], TextType.TEXT))
+        if token_text != "" or url is not None:
+            textnodes.append(TextNode(token_text, text_type, url))
+        text_start = position = end
+
+    if text_start < len(text):
+        textnodes.append(TextNode(text[text_start:], TextType.TEXT))
     return textnodes
 
 
-
 def split_nodes_delimiter(old_nodes: list[TextNode], delimiter, text_type: TextType) -> list[TextNode]:
     new_nodes = []
 
@@ -0,0 +1,136 @@
+"""Internal link checking without crawling the generated HTML: every link and
+image URL is recorded while its page is rendered (see LinkCollector), kept
+in the page index next to the page's metadata, and checked after the build
+against a set of every file under the output directory."""
+import os
+import posixpath
+import re
+import time
+from urllib.parse import unquote
+
+
+scheme_regex = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+class LinkCollector:
+    """Wraps a page's resolve_url hook, which the renderer calls for each
+    link and image in document order, and records the URLs as written in
+    the markdown."""
+
+    def __init__(self, resolve_url=None):
+        self.resolve_url = resolve_url
+        self.urls = []
+        self.links = []
+
+    def resolve(self, url):
+        self.urls.append(url)
+        if self.resolve_url is None:
+            return url
+        return self.resolve_url(url)
+
+    def locate(self, markdown, first_line=1):
+        """Give the URLs recorded since the last call a line: the line of
+        markdown (counted from first_line) their "](url)" is on. The URLs
+        are in document order, so one forward scan finds them all. Called
+        once per page, or once per block when blocks are rendered one at a
+        time. Returns every [url, line] located so far."""
+        position = 0
+        line = first_line
+        for url in self.urls:
+            index = markdown.find(f"]({url})", position)
+            if index == -1:
+                # Not written the way it was parsed; report the last line found
+                self.links.append([url, line])
+                continue
+            line += markdown.count("\n", position, index)
+            position = index
+            self.links.append([url, line])
+        self.urls = []
+        return self.links
+
+    def __repr__(self) -> str:
+        return f"LinkCollector(links={len(self.links) + len(self.urls)})"
+
+
+def output_index(dest_dir_path):
+    """The set of every file under dest_dir_path, as "/"-separated paths
+    relative to it."""
+    paths = set()
+    for dir_path, _, file_names in os.walk(dest_dir_path):
+        rel_dir = os.path.relpath(dir_path, dest_dir_path).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else rel_dir + "/"
+        for file_name in file_names:
+            paths.add(prefix + file_name)
+    return paths
+
+
+def link_target(url, page_url):
+    """The root-relative path an internal link points at, or None for
+    external links, fragments on the same page and other schemes."""
+    if url == "" or url.startswith(("#", "//")) or scheme_regex.match(url):
+        return None
+    for separator in "?#":
+        url = url.split(separator, 1)[0]
+    if url == "":
+        return None
+    if not url.startswith("/"):
+        url = posixpath.join(posixpath.dirname(page_url), url)
+    target = posixpath.normpath(unquote(url))
+    # normpath keeps a leading "//" and drops trailing slashes
+    return "/" + target.lstrip("/")
+
+
+def target_exists(target, outputs):
+    rel_path = target.lstrip("/")
+    if rel_path in outputs:
+        return True
+    # Directory URLs are served from their index.html
+    return (rel_path + "/index.html" if rel_path != "" else "index.html") in outputs
+
+
+class LinkCheckReport:
+    def __init__(self):
+        self.failures = []
+        self.pages = 0
+        self.links = 0
+        self.outputs = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"LinkCheckReport(pages={self.pages}, links={self.links}, failures={len(self.failures)}, seconds={self.seconds:.3f})"
+
+
+def check_links(page_index, dest_dir_path, assets=None):
+    """Check the internal links of every page in page_index against the files
+    under dest_dir_path. Links to static files are looked up under their
+    fingerprinted names when assets is given. Returns a LinkCheckReport whose
+    failures are (source_path, line, url) tuples."""
+    start = time.perf_counter()
+    report = LinkCheckReport()
+    outputs = output_index(dest_dir_path)
+    report.outputs = len(outputs)
+
+    for source_path, links in page_index.links.items():
+        page = page_index.pages.get(source_path)
+        if page is None:
+            continue
+        report.pages += 1
+        for url, line in links:
+            target = link_target(url, page["url"])
+            if target is None:
+                continue
+            report.links += 1
+            if assets is not None:
+                target = assets.urls.get(target, target)
+            if not target_exists(target, outputs):
+                report.failures.append((source_path, line, url))
+
+    report.failures.sort()
+    report.seconds = time.perf_counter() - start
+    for source_path, line, url in report.failures:
+        print(f"{source_path}:{line}: broken link to {url}")
+    print(
+        f"Checked {report.links} internal links on {report.pages} pages against {report.outputs} outputs "
+        f"in {report.seconds * 1000:.1f} ms: {len(report.failures)} broken"
+    )
+    return report
@@ -0,0 +1,211 @@
+"""Pages generated from the page index rather than from markdown: the
+paginated blog listing, an RSS feed and sitemap.xml.
+
+Every output records a hash of the index slice and settings it was made
+from, so a build only re-renders the listing pages, feed or sitemap whose
+inputs changed; the markdown itself is never read here."""
+import json
+import os
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_bytes
+from outputs import load_json_state, remove_empty_dirs, save_json_state, write_output
+from template import load_template
+from urls import UrlResolver
+
+
+BLOG_URL = "/blog/"
+PAGE_SIZE = 10
+FEED_SIZE = 20
+FEED_PATH = "feed.xml"
+SITEMAP_PATH = "sitemap.xml"
+
+
+def blog_posts(page_index, blog_url=BLOG_URL):
+    """Index entries under blog_url, newest first; undated posts come last
+    in url order."""
+    posts = [page for page in page_index.pages.values() if page["url"].startswith(blog_url) and page["url"] != blog_url]
+    posts.sort(key=lambda page: page["url"])
+    posts.sort(key=lambda page: page.get("date", ""), reverse=True)
+    return posts
+
+
+def listing_page_url(blog_url, page_number):
+    if page_number == 1:
+        return blog_url
+    return f"{blog_url}page/{page_number}/"
+
+
+def listing_dest_path(dest_dir_path, url):
+    return os.path.join(dest_dir_path, *url.strip("/").split("/"), "index.html")
+
+
+def listing_body(posts, page_number, page_count, blog_url, resolve_url):
+    items = []
+    for post in posts:
+        children = [LeafNode("a", post["title"], {"href": resolve_url(post["url"])})]
+        if "date" in post:
+            children.append(LeafNode(None, " "))
+            children.append(LeafNode("time", post["date"], {"datetime": post["date"]}))
+        items.append(ParentNode("li", children))
+
+    title = "Blog" if page_number == 1 else f"Blog, page {page_number}"
+    children = [LeafNode("h1", title), ParentNode("ul", items)]
+    links = []
+    if page_number > 1:
+        links.append(LeafNode("a", "Newer posts", {"href": resolve_url(listing_page_url(blog_url, page_number - 1)), "rel": "prev"}))
+    if page_number < page_count:
+        links.append(LeafNode("a", "Older posts", {"href": resolve_url(listing_page_url(blog_url, page_number + 1)), "rel": "next"}))
+    if len(links) > 0:
+        children.append(ParentNode("nav", links))
+    return title, ParentNode("div", children)
+
+
+def absolute_url(site_url, resolve_url, url):
+    return site_url.rstrip("/") + resolve_url(url)
+
+
+def rfc822_date(value):
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return None
+    return format_datetime(datetime(day.year, day.month, day.day, tzinfo=timezone.utc))
+
+
+def render_feed(posts, site_url, blog_url, resolve_url, title):
+    link = escape(absolute_url(site_url, resolve_url, blog_url))
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<rss version="2.0">',
+        "<channel>",
+        f"<title>{escape(title)}</title>",
+        f"<link>{link}</link>",
+        f"<description>{escape(title)}</description>",
+    ]
+    for post in posts:
+        post_link = escape(absolute_url(site_url, resolve_url, post["url"]))
+        lines.append("<item>")
+        lines.append(f"<title>{escape(post['title'])}</title>")
+        lines.append(f"<link>{post_link}</link>")
+        lines.append(f'<guid isPermaLink="true">{post_link}</guid>')
+        pub_date = rfc822_date(post["date"]) if "date" in post else None
+        if pub_date is not None:
+            lines.append(f"<pubDate>{pub_date}</pubDate>")
+        if "description" in post:
+            lines.append(f"<description>{escape(str(post['description']))}</description>")
+        lines.append("</item>")
+    lines.extend(["</channel>", "</rss>", ""])
+    return "\n".join(lines)
+
+
+def render_sitemap(entries, site_url, resolve_url):
+    """entries are (url, date or None) pairs."""
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for url, lastmod in entries:
+        lines.append(f"<url><loc>{escape(absolute_url(site_url, resolve_url, url))}</loc>" + (f"<lastmod>{escape(lastmod)}</lastmod>" if lastmod else "") + "</url>")
+    lines.extend(["</urlset>", ""])
+    return "\n".join(lines)
+
+
+class ListingReport:
+    def __init__(self):
+        self.outputs = []
+        self.rendered = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def __repr__(self) -> str:
+        return f"ListingReport(outputs={len(self.outputs)}, rendered={self.rendered}, skipped={self.skipped}, deleted={self.deleted})"
+
+
+def generate_listings(page_index, template_path, dest_dir_path, basepath, site_url=None, state_path=None, page_size=PAGE_SIZE, changes=None, blog_url=BLOG_URL, assets=None):
+    """Write the blog listing pages, and the feed and sitemap when site_url
+    is known (both need absolute URLs). Returns a ListingReport whose
+    outputs are every path this owns, rendered or not."""
+    previous_outputs = load_listing_state(state_path)
+    current_outputs = {}
+    report = ListingReport()
+    url_resolver = UrlResolver(basepath, assets)
+    resolve_url = url_resolver.resolve
+
+    def emit(dest_path, inputs, render):
+        input_hash = hash_bytes(json.dumps(inputs, sort_keys=True).encode())
+        current_outputs[dest_path] = input_hash
+        report.outputs.append(dest_path)
+        if previous_outputs.get(dest_path) == input_hash and os.path.isfile(dest_path):
+            report.skipped += 1
+            if changes is not None:
+                changes.record(dest_path, False)
+            return
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        changed = write_output(dest_path, render())
+        report.rendered += 1
+        if changes is not None:
+            changes.record(dest_path, changed)
+
+    posts = blog_posts(page_index, blog_url)
+    listing_urls = []
+    if any(page["url"] == blog_url for page in page_index.pages.values()):
+        print(f"Not generating the blog listing, content already has a page at {blog_url}")
+    elif len(posts) > 0:
+        template = load_template(template_path, basepath, assets)
+        page_count = (len(posts) + page_size - 1) // page_size
+        for page_number in range(1, page_count + 1):
+            page_posts = posts[(page_number - 1) * page_size:page_number * page_size]
+            url = listing_page_url(blog_url, page_number)
+            listing_urls.append(url)
+
+            def render(page_posts=page_posts, page_number=page_number):
+                title, body = listing_body(page_posts, page_number, page_count, blog_url, resolve_url)
+                return template.render({"Title": title, "Content": body})
+
+            inputs = {
+                "posts": [[post["url"], post["title"], post.get("date")] for post in page_posts],
+                "page": [page_number, page_count],
+                "template": template.source_hash,
+                "url_key": url_resolver.key,
+            }
+            emit(listing_dest_path(dest_dir_path, url), inputs, render)
+
+    if site_url is not None:
+        feed_posts = posts[:FEED_SIZE]
+        home = next((page for page in page_index.pages.values() if page["url"] == "/"), None)
+        feed_title = home["title"] if home is not None else "Blog"
+        emit(
+            os.path.join(dest_dir_path, FEED_PATH),
+            {"posts": feed_posts, "title": feed_title, "site_url": site_url, "basepath": basepath},
+            lambda: render_feed(feed_posts, site_url, blog_url, resolve_url, feed_title),
+        )
+
+        entries = sorted([(page["url"], page.get("date")) for page in page_index.pages.values()] + [(url, None) for url in listing_urls])
+        emit(
+            os.path.join(dest_dir_path, SITEMAP_PATH),
+            {"entries": entries, "site_url": site_url, "basepath": basepath},
+            lambda: render_sitemap(entries, site_url, resolve_url),
+        )
+
+    for dest_path in sorted(set(previous_outputs) - set(current_outputs)):
+        if os.path.isfile(dest_path):
+            print(f"Removing stale listing {dest_path}")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+            report.deleted += 1
+            if changes is not None:
+                changes.record_deleted(dest_path)
+
+    save_listing_state(state_path, current_outputs)
+    print(f"Listings: rendered {report.rendered}, unchanged {report.skipped}, removed {report.deleted}")
+    return report
+
+
+def load_listing_state(state_path):
+    state = load_json_state(state_path, "listing state")
+    return {} if state is None else state.get("outputs", {})
+
+
+def save_listing_state(state_path, outputs):
+    save_json_state(state_path, {"outputs": outputs})
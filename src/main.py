@@ -1,19 +1,215 @@
+import argparse
+import os
 import sys
-from copystatic import copy_files
-from gencontent import generate_pages_recursive
+from builder import Site, SiteConfig
+from client import DEFAULT_SOCKET_PATH
+from daemon import run_daemon
+from shards import SHARD_DIR, parse_shard, shard_cache_dir, shard_dest_dir
+from gencontent import STREAM_THRESHOLD_BYTES
+from devserver import serve
+from fragmentcache import DEFAULT_MAX_ENTRIES
+from parsecache import DEFAULT_MAX_BYTES
+from profiler import NULL_PROFILER, Profiler
 
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
+dir_path_cache = "./.cache"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/", help="path the site is served from")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-render pages whose source, template or basepath changed",
+    )
+    parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="with --incremental, compare static files by content hash when their mtime differs",
+    )
+    parser.add_argument(
+        "--hardlink-static",
+        action="store_true",
+        help="with --incremental, hardlink static files into ./docs instead of copying them",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not read or write the parsed page cache in ./.cache/parse",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="size limit of the parsed page cache in MB, least recently used pages are evicted first",
+    )
+    parser.add_argument(
+        "--fragment-cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="number of rendered blocks memoized for reuse by pages that repeat them, kept in ./.cache/fragments.json (0 disables)",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=STREAM_THRESHOLD_BYTES // (1024 * 1024),
+        help="markdown files of at least this many MB are rendered block by block with bounded memory (0 streams every page)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE_PATH",
+        help="record per-page stage timings and write them as a Chrome trace (chrome://tracing, Perfetto)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="number of slowest pages listed after a --profile build",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="write a precompressed .gz next to every HTML, CSS and SVG output",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="publish CSS, JS, image and font files under content-hashed names and rewrite references to them",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded full-text search index to ./docs/search",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="check every internal link and image of the pages against the generated outputs; exits with status 1 if any is broken",
+    )
+    parser.add_argument(
+        "--site-url",
+        help="absolute URL of the site (e.g. https://example.com); needed for feed.xml and sitemap.xml",
+    )
+    parser.add_argument(
+        "--changes",
+        metavar="CHANGES_PATH",
+        default=os.path.join(dir_path_cache, "changes.json"),
+        help="where to write the list of outputs this build changed or deleted, for deploys",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="build only shard I of N of the pages into the shard directory, to be combined with merge",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        metavar="N",
+        help="with merge, the number of shards to combine",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        default=SHARD_DIR,
+        help="where shard builds write their pages and manifests (a filesystem shared by every machine)",
+    )
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET_PATH,
+        help="with daemon, the Unix socket to listen on",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="with serve, the port to serve the site on",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="with serve, rebuild changed pages and reload open browsers",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.2,
+        help="with serve --watch, seconds between polls of the watched files",
+    )
+    return parser.parse_args(argv)
+
+
+def site_config(args):
+    dest_dir = dir_path_public
+    cache_dir = dir_path_cache
+    changes_path = args.changes
+    if args.shard is not None:
+        dest_dir = shard_dest_dir(args.shard_dir, *args.shard)
+        cache_dir = shard_cache_dir(args.shard_dir, *args.shard)
+        changes_path = os.path.join(cache_dir, "changes.json")
+    return SiteConfig(
+        static_dir=dir_path_static,
+        dest_dir=dest_dir,
+        cache_dir=cache_dir,
+        basepath=args.basepath,
+        jobs=args.jobs,
+        incremental=args.incremental,
+        hash_static=args.hash_static,
+        hardlink_static=args.hardlink_static,
+        parse_cache=not args.no_cache,
+        cache_size=args.cache_size * 1024 * 1024,
+        fragment_cache_size=args.fragment_cache_size,
+        stream_threshold=args.stream_threshold * 1024 * 1024,
+        gzip=args.gzip,
+        fingerprint=args.fingerprint,
+        search=args.search,
+        site_url=args.site_url,
+        check_links=args.check_links,
+        changes_path=changes_path,
+        shard=args.shard,
+    )
 
 
 def main():
-    basepath = '/'
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    
-    copy_files(dir_path_static, dir_path_public)
-    generate_pages_recursive("./content", "./template.html", dir_path_public, basepath)
+    if len(sys.argv) > 1 and sys.argv[1] in ("serve", "daemon"):
+        args = parse_args(sys.argv[2:])
+        # Rebuilds only pay off when unchanged pages are skipped
+        args.incremental = True
+        site = Site(site_config(args))
+        if sys.argv[1] == "serve":
+            serve(site, args.port, args.watch, args.interval)
+        else:
+            run_daemon(site, args.socket)
+        return
+
+    merge = len(sys.argv) > 1 and sys.argv[1] == "merge"
+    args = parse_args(sys.argv[2:] if merge else None)
+    if merge and (args.shards is None or args.shards < 1 or args.shard is not None):
+        sys.exit("merge needs --shards N (and no --shard)")
+    profiler = NULL_PROFILER if args.profile is None else Profiler()
+    site = Site(site_config(args))
+
+    try:
+        if merge:
+            report = site.merge(args.shards, args.shard_dir, profiler)
+        else:
+            report = site.build(profiler)
+    finally:
+        if profiler.enabled:
+            profiler.write_chrome_trace(args.profile)
+            profiler.print_summary(args.profile_top)
+            print(f"Chrome trace written to {args.profile}")
+    if len(report.broken_links) > 0:
+        sys.exit(1)
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+
+from outputs import load_json_state, remove_empty_dirs, save_json_state
+
+
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path) -> str:
+    # Read in chunks so hashing a large file does not load it whole
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def snapshot_files(paths):
+    """Map every file under paths (files or directories) to (mtime_ns, size)."""
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class BuildManifest:
+    """Records the inputs and output of every generated page so that a later
+    build can skip pages whose source, template and URL resolution (basepath
+    and fingerprinted assets) are unchanged."""
+
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path):
+        data = load_json_state(path, "manifest")
+        if data is None or data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+
+        return cls(path, data.get("pages", {}))
+
+    def save(self):
+        save_json_state(self.path, {"version": MANIFEST_VERSION, "pages": self.pages})
+
+    def begin_build(self):
+        """Start tracking a new build over the same manifest."""
+        self.seen = set()
+
+    def entry(self, source_path):
+        self.seen.add(source_path)
+        return self.pages.get(source_path)
+
+    def record_result(self, result, url_key):
+        self.seen.add(result.from_path)
+        if not result.rendered:
+            return
+
+        self.pages[result.from_path] = {
+            "source_hash": result.source_hash,
+            "template_hash": result.template_hash,
+            "url_key": url_key,
+            "dest_path": result.dest_path,
+            "output_hash": result.output_hash,
+        }
+
+    def prune(self, dest_dir_path):
+        """Remove outputs of pages whose sources were not seen during this build."""
+        removed = []
+        for source_path in sorted(set(self.pages) - self.seen):
+            removed.append(self.remove_page(source_path, dest_dir_path))
+        return removed
+
+    def remove_page(self, source_path, dest_dir_path):
+        """Forget source_path and delete its output, returning the output path."""
+        entry = self.pages.pop(source_path, None)
+        self.seen.discard(source_path)
+        if entry is None:
+            return None
+
+        dest_path = entry["dest_path"]
+        if os.path.isfile(dest_path):
+            print(f"Removing {dest_path}, source {source_path} was deleted")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+        return dest_path
+
+
+def is_entry_current(entry, source_hash, template_hash, url_key, dest_path) -> bool:
+    return (
+        entry["source_hash"] == source_hash
+        and entry["template_hash"] == template_hash
+        and entry["url_key"] == url_key
+        and entry["dest_path"] == dest_path
+        and os.path.isfile(dest_path)
+    )
@@ -0,0 +1,153 @@
+import filecmp
+import json
+import os
+import tempfile
+
+
+def current_umask():
+    # os.umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Taken once: reading it briefly clears it for the whole process
+UMASK = current_umask()
+
+
+def temp_path_for(dest_path):
+    """Create an empty temp file next to dest_path so that the final
+    os.replace stays on one filesystem and is atomic. mkstemp creates it
+    private (0600) and os.replace keeps that mode, so it gets the mode of
+    the existing dest_path, or that of a newly created file."""
+    dest_dir = os.path.dirname(dest_path)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir if dest_dir != "" else ".", prefix=".", suffix=".tmp")
+    try:
+        mode = os.stat(dest_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.fchmod(fd, mode)
+    os.close(fd)
+    return tmp_path
+
+
+def commit_output(tmp_path, dest_path) -> bool:
+    """Move tmp_path over dest_path unless dest_path already holds the same
+    bytes, in which case tmp_path is discarded and dest_path keeps its mtime.
+    Returns whether dest_path changed."""
+    try:
+        if os.path.isfile(dest_path) and filecmp.cmp(tmp_path, dest_path, shallow=False):
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, dest_path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_json_state(state_path, description):
+    """The JSON a build saved at state_path with save_json_state, or None
+    if there is none. An unreadable file is reported and ignored, so the
+    build falls back to doing everything again."""
+    if state_path is None or not os.path.exists(state_path):
+        return None
+
+    with open(state_path, 'r') as file:
+        try:
+            return json.load(file)
+        except json.JSONDecodeError:
+            print(f"Ignoring unreadable {description} {state_path}")
+            return None
+
+
+def save_json_state(state_path, data, indent=1):
+    """Write data to state_path through a temp file and os.replace, so a
+    build interrupted mid-write leaves the previous state behind rather than
+    a truncated one. indent=None writes compact JSON."""
+    if state_path is None:
+        return
+
+    state_dir = os.path.dirname(state_path)
+    if state_dir != "":
+        os.makedirs(state_dir, exist_ok=True)
+
+    tmp_path = temp_path_for(state_path)
+    try:
+        with open(tmp_path, 'w') as file:
+            if indent is None:
+                json.dump(data, file, separators=(",", ":"), sort_keys=True)
+            else:
+                json.dump(data, file, indent=indent, sort_keys=True)
+        os.replace(tmp_path, state_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_output(dest_path, content) -> bool:
+    tmp_path = temp_path_for(dest_path)
+    try:
+        with open(tmp_path, 'wb' if isinstance(content, bytes) else 'w') as file:
+            file.write(content)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return commit_output(tmp_path, dest_path)
+
+
+class OutputChanges:
+    """The outputs a build actually changed or deleted, relative to the
+    output directory, so deploys only need to push that delta."""
+
+    def __init__(self, dest_dir_path):
+        self.dest_dir_path = dest_dir_path
+        self.changed = []
+        self.deleted = []
+        self.unchanged = 0
+
+    def record(self, dest_path, changed):
+        if changed:
+            self.changed.append(os.path.relpath(dest_path, self.dest_dir_path))
+        else:
+            self.unchanged += 1
+
+    def record_deleted(self, dest_path):
+        self.deleted.append(os.path.relpath(dest_path, self.dest_dir_path))
+
+    def to_dict(self):
+        return {"changed": sorted(self.changed), "deleted": sorted(self.deleted)}
+
+    def save(self, path):
+        save_json_state(path, self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"OutputChanges(changed={len(self.changed)}, deleted={len(self.deleted)}, unchanged={self.unchanged})"
+
+
+def remove_stale_outputs(dest_dir_path, expected_paths, changes=None):
+    """Delete every file under dest_dir_path that is not in expected_paths."""
+    expected = {os.path.normpath(path) for path in expected_paths}
+    for dir_path, _, file_names in os.walk(dest_dir_path, topdown=False):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            if os.path.normpath(path) in expected:
+                continue
+            print(f"Removing stale output {path}")
+            os.remove(path)
+            if changes is not None:
+                changes.record_deleted(path)
+        remove_empty_dirs(dir_path, dest_dir_path)
+
+
+def remove_empty_dirs(dir_path, stop_dir_path):
+    stop_dir_path = os.path.normpath(stop_dir_path)
+    while (
+        os.path.normpath(dir_path) != stop_dir_path
+        and os.path.isdir(dir_path)
+        and len(os.listdir(dir_path)) == 0
+    ):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
@@ -0,0 +1,69 @@
+import os
+
+from outputs import load_json_state, save_json_state
+
+
+PAGE_INDEX_VERSION = 2
+
+
+def page_url(dest_path, dest_dir_path):
+    """The root-relative URL a page is served at: /blog/tom/ for
+    docs/blog/tom/index.html."""
+    rel_path = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if rel_path == "index.html":
+        return "/"
+    if rel_path.endswith("/index.html"):
+        return "/" + rel_path[:-len("index.html")]
+    return "/" + rel_path
+
+
+class PageIndex:
+    """Site-wide metadata of every published page (url, title, date, tags and
+    any other front matter), kept up to date by each build so that listing
+    and feed pages never have to re-read the markdown. links holds the
+    [url, line] pairs of each page's links, for the link checker."""
+
+    def __init__(self, path, pages=None, links=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.links = links if links is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path):
+        data = load_json_state(path, "page index")
+        if data is None or data.get("version") != PAGE_INDEX_VERSION:
+            return cls(path)
+
+        return cls(path, data.get("pages", {}), data.get("links", {}))
+
+    def save(self):
+        save_json_state(self.path, {"version": PAGE_INDEX_VERSION, "pages": self.pages, "links": self.links})
+
+    def begin_build(self):
+        self.seen = set()
+
+    def record(self, source_path, metadata, dest_path, dest_dir_path, links=None):
+        self.seen.add(source_path)
+        entry = dict(metadata)
+        entry["url"] = page_url(dest_path, dest_dir_path)
+        self.pages[source_path] = entry
+        self.links[source_path] = links if links is not None else []
+
+    def keep(self, source_path):
+        """Mark a page that was not re-rendered as still published."""
+        self.seen.add(source_path)
+
+    def remove(self, source_path):
+        self.pages.pop(source_path, None)
+        self.links.pop(source_path, None)
+        self.seen.discard(source_path)
+
+    def prune(self):
+        """Forget pages that were not seen during this build."""
+        for source_path in set(self.pages) - self.seen:
+            del self.pages[source_path]
+            self.links.pop(source_path, None)
+
+    def __repr__(self) -> str:
+        return f"PageIndex(path={self.path}, pages={len(self.pages)})"
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+
+from block_markdown import PARSER_VERSION
+from manifest import hash_bytes
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ParseCache:
+    """On-disk cache of rendered page bodies (with the title of their first
+    h1 and the links collected while rendering them) keyed by the markdown's
+    hash, the key of the UrlResolver its URLs were resolved with and the
+    parser version, so unchanged pages skip parsing when only the template
+    changed.
+
+    Each entry is one file; a hit refreshes its mtime and evict() drops the
+    least recently used entries once the cache is over max_bytes. Entries
+    are written with a rename so worker processes can share the directory.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, source_hash, url_key='/'):
+        key = hash_bytes(f"{PARSER_VERSION}\0{url_key}\0{source_hash}".encode())
+        return os.path.join(self.cache_dir, key[:2], key + ".html")
+
+    def get(self, source_hash, url_key='/'):
+        """Return (body_html, title, links) or None on a miss."""
+        path = self.entry_path(source_hash, url_key)
+        try:
+            with open(path, 'r') as file:
+                title, links = json.loads(file.readline())
+                body_html = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return body_html, title, links
+
+    def record(self, hit):
+        # Lookups happen in worker processes, the parent tallies the results
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def put(self, source_hash, body_html, title=None, url_key='/', links=()):
+        path = self.entry_path(source_hash, url_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as file:
+                # Title and links go on a JSON line of their own ahead of the body
+                file.write(json.dumps([title, list(links)]) + "\n")
+                file.write(body_html)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes;
+        returns the number of entries removed."""
+        entries = []
+        total_bytes = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total_bytes += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def __repr__(self) -> str:
+        return f"ParseCache(cache_dir={self.cache_dir}, max_bytes={self.max_bytes}, hits={self.hits}, misses={self.misses})"
@@ -0,0 +1,124 @@
+import json
+import os
+import time
+
+
+class Span:
+    __slots__ = ("profiler", "name", "category", "args", "start_ns")
+
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.events.append((self.name, self.category, self.start_ns, time.perf_counter_ns(), os.getpid(), self.args))
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+    """Collects (name, category, start_ns, end_ns, pid, args) spans.
+
+    Timestamps come from perf_counter_ns, which is system wide on Linux, so
+    spans recorded in worker processes line up with the parent's."""
+
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def span(self, name, category, args=None):
+        return Span(self, name, category, args)
+
+    def extend(self, events):
+        self.events.extend(events)
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        trace_events = []
+        for name, category, start_ns, end_ns, span_pid, args in self.events:
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start_ns / 1000,
+                "dur": (end_ns - start_ns) / 1000,
+                "pid": pid,
+                "tid": span_pid,
+            }
+            if args is not None:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        trace_dir = os.path.dirname(path)
+        if trace_dir != "":
+            os.makedirs(trace_dir, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_chrome_trace(), file)
+
+    def slowest_pages(self, count=10):
+        """Return [(page, total_ns, {stage: ns})] for the count slowest pages."""
+        pages = {}
+        for name, category, start_ns, end_ns, _, args in self.events:
+            if category != "page" or args is None:
+                continue
+            stages = pages.setdefault(args["page"], {})
+            stages[name] = stages.get(name, 0) + end_ns - start_ns
+
+        totals = [(page, stages.pop("page", 0), stages) for page, stages in pages.items()]
+        totals.sort(key=lambda item: item[1], reverse=True)
+        return totals[:count]
+
+    def print_summary(self, count=10):
+        slowest = self.slowest_pages(count)
+        if len(slowest) == 0:
+            return
+        stage_names = []
+        for _, _, stages in slowest:
+            for stage in stages:
+                if stage not in stage_names:
+                    stage_names.append(stage)
+
+        print(f"Slowest {len(slowest)} pages (ms):")
+        print(f"{'total':>9}" + "".join(f"{stage:>16}" for stage in stage_names) + "  page")
+        for page, total_ns, stages in slowest:
+            row = f"{total_ns / 1e6:>9.2f}" + "".join(f"{stages.get(stage, 0) / 1e6:>16.2f}" for stage in stage_names)
+            print(f"{row}  {page}")
+
+
+class NullProfiler:
+    """Stands in for Profiler when profiling is off; every span is the same
+    shared no-op context manager so instrumented code pays almost nothing."""
+
+    enabled = False
+    events = ()
+
+    def span(self, name, category, args=None):
+        return NULL_SPAN
+
+    def extend(self, events):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
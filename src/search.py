@@ -0,0 +1,200 @@
+"""Static full-text search index, written under docs/search/ so the site can
+be searched in the browser without a search service:
+
+    search/index.json          {"prefix_length": 2, "shards": ["ba", "to", ...]}
+    search/docs.json           {"<doc id>": [url, title], ...}   (URLs include the basepath)
+    search/shards/<name>.json  {"<term>": [[doc id, count], ...], ...}
+
+A term lives in the shard named after its first prefix_length characters.
+Names that are not plain lowercase ASCII letters and digits are written as
+"_" followed by the hex of the prefix's UTF-8 bytes. A client fetches
+index.json and docs.json once, then only the shards of the query's terms.
+
+Terms come from the TextNodes of each page, never from its HTML. Pages keep
+their doc id and terms in a state file between builds, so only pages whose
+markdown changed are tokenized again and only the shards their terms fall in
+are rewritten. Neither depends on URLs: docs.json is written every build, so
+a basepath or fingerprint change needs no retokenizing. A changed page is read one block at a time, so pages streamed
+for their size (see gencontent.stream_page) are not loaded whole either.
+"""
+import json
+import os
+import re
+import time
+
+from block_markdown import BlockType, iter_blocks
+from frontmatter import split_front_matter_lines
+from inline_markdown import text_to_textnodes
+from outputs import load_json_state, save_json_state, write_output
+
+
+SEARCH_DIR = "search"
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+
+search_term_regex = re.compile(r"\w+")
+plain_shard_name_regex = re.compile(r"^[a-z0-9]+$")
+
+
+def add_terms(text, terms):
+    for match in search_term_regex.finditer(text.lower()):
+        term = match.group()
+        if len(term) >= MIN_TERM_LENGTH:
+            terms[term] = terms.get(term, 0) + 1
+
+
+def markdown_terms(lines):
+    """Count the terms of a page's text, as the reader sees it: link and
+    image URLs and markdown syntax are left out. lines keep their line
+    endings, as from an open file, and are read one block at a time."""
+    _, body_lines, _ = split_front_matter_lines(lines)
+    terms = {}
+    for block in iter_blocks(body_lines):
+        if block.block_type == BlockType.CODE:
+            add_terms(block.text.strip("`"), terms)
+            continue
+        if block.block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+            lines = block.text.split("\n")
+        else:
+            lines = [block.text.replace("\n", " ")]
+        for line in lines:
+            for text_node in text_to_textnodes(line):
+                add_terms(text_node.text, terms)
+    return terms
+
+
+def term_prefix(term):
+    return term[:PREFIX_LENGTH]
+
+
+def shard_name(prefix):
+    if plain_shard_name_regex.match(prefix):
+        return prefix
+    return "_" + prefix.encode().hex()
+
+
+class SearchReport:
+    def __init__(self):
+        self.outputs = []
+        self.pages = 0
+        self.pages_tokenized = 0
+        self.terms = 0
+        self.shards = 0
+        self.shards_written = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"SearchReport(pages={self.pages}, tokenized={self.pages_tokenized}, terms={self.terms}, "
+            f"shards={self.shards}, written={self.shards_written}, bytes={self.bytes}, seconds={self.seconds:.3f})"
+        )
+
+
+def build_search_index(results, page_index, dest_dir_path, state_path=None, changes=None, url_resolver=None):
+    """Update the search index for the PageResults of a build. Page URLs in
+    docs.json go through url_resolver (see urls.UrlResolver) like every
+    other link of the site. Returns a SearchReport whose outputs are every
+    file of the index."""
+    start = time.perf_counter()
+    report = SearchReport()
+    state = load_search_state(state_path)
+    previous_pages = state["pages"]
+    next_id = state["next_id"]
+    pages = {}
+    dirty_prefixes = set()
+
+    # New pages get ids in path order, so the ids do not depend on the order
+    # pages were built in (directory listing order, shards)
+    for result in sorted(results, key=lambda result: result.from_path):
+        entry = page_index.pages.get(result.from_path)
+        if result.error is not None or result.draft or entry is None:
+            continue
+
+        previous = previous_pages.get(result.from_path)
+        if previous is not None and previous["source_hash"] == result.source_hash:
+            terms = previous["terms"]
+        else:
+            with open(result.from_path, 'r') as file:
+                terms = markdown_terms(file)
+            # Counting the title once more ranks title matches higher
+            add_terms(entry["title"], terms)
+            report.pages_tokenized += 1
+            dirty_prefixes.update(term_prefix(term) for term in terms)
+            if previous is not None:
+                dirty_prefixes.update(term_prefix(term) for term in previous["terms"])
+
+        if previous is not None:
+            doc_id = previous["id"]
+        else:
+            doc_id = next_id
+            next_id += 1
+        url = entry["url"] if url_resolver is None else url_resolver.resolve(entry["url"])
+        pages[result.from_path] = {"id": doc_id, "source_hash": result.source_hash, "url": url, "title": entry["title"], "terms": terms}
+
+    for from_path, previous in previous_pages.items():
+        if from_path not in pages:
+            dirty_prefixes.update(term_prefix(term) for term in previous["terms"])
+
+    shards = {}
+    for page in pages.values():
+        for term, count in page["terms"].items():
+            shards.setdefault(term_prefix(term), {}).setdefault(term, []).append([page["id"], count])
+
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    shard_dir = os.path.join(search_dir, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    def emit(path, data):
+        content = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        changed = write_output(path, content)
+        report.outputs.append(path)
+        report.bytes += len(content.encode())
+        if changes is not None:
+            changes.record(path, changed)
+        return changed
+
+    for prefix, postings in shards.items():
+        path = os.path.join(shard_dir, shard_name(prefix) + ".json")
+        report.terms += len(postings)
+        if prefix not in dirty_prefixes and os.path.isfile(path):
+            report.outputs.append(path)
+            report.bytes += os.path.getsize(path)
+            if changes is not None:
+                changes.record(path, False)
+            continue
+        for posting in postings.values():
+            posting.sort()
+        emit(path, postings)
+        report.shards_written += 1
+
+    for prefix in dirty_prefixes - set(shards):
+        path = os.path.join(shard_dir, shard_name(prefix) + ".json")
+        if os.path.isfile(path):
+            os.remove(path)
+            if changes is not None:
+                changes.record_deleted(path)
+
+    emit(os.path.join(search_dir, "docs.json"), {str(page["id"]): [page["url"], page["title"]] for page in pages.values()})
+    emit(os.path.join(search_dir, "index.json"), {"prefix_length": PREFIX_LENGTH, "shards": sorted(shard_name(prefix) for prefix in shards)})
+
+    save_search_state(state_path, {"next_id": next_id, "pages": pages})
+    report.pages = len(pages)
+    report.shards = len(shards)
+    report.seconds = time.perf_counter() - start
+    print(
+        f"Search index: {report.pages} pages ({report.pages_tokenized} tokenized), {report.terms} terms in "
+        f"{report.shards} shards ({report.shards_written} written), {report.bytes} bytes, {report.seconds * 1000:.1f} ms"
+    )
+    return report
+
+
+def load_search_state(state_path):
+    state = load_json_state(state_path, "search state")
+    if state is None or "next_id" not in state or "pages" not in state:
+        return {"next_id": 0, "pages": {}}
+    return state
+
+
+def save_search_state(state_path, state):
+    save_json_state(state_path, state, indent=None)
@@ -0,0 +1,99 @@
+"""Sharded builds: the pages of a site are split across N independent
+builds, e.g. on machines that share nothing but a filesystem, and the
+shards are then merged into one site:
+
+    python3 src/main.py --shard 1/3 [basepath] [build options]   # i = 1..3
+    python3 src/main.py merge --shards 3 [basepath] [build options]
+
+A page belongs to the shard picked by the hash of its path relative to the
+content directory, so every machine agrees without coordinating. Shard i of
+N writes its pages to .shards/<i>-of-<N>/docs, and its page index and a
+partial manifest (shard.json: the shard, its URL key and the source hash and
+output of each page) to .shards/<i>-of-<N>/cache. The merge copies the
+pages of every shard into ./docs and builds what needs the whole site
+(static files, listings, feed, sitemap, search index, link check) from the
+merged page metadata.
+"""
+import argparse
+import json
+import os
+
+from manifest import hash_bytes
+from outputs import save_json_state
+
+
+SHARD_DIR = "./.shards"
+SHARD_MANIFEST_NAME = "shard.json"
+SHARD_MANIFEST_VERSION = 1
+
+
+def parse_shard(value):
+    """Parse "i/N" (1 <= i <= N) into (i, N). Used as an argparse type, so
+    it raises ArgumentTypeError, whose message argparse shows as is."""
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value} is out of range, need 1 <= i <= N")
+    return index, count
+
+
+def page_shard(rel_path, count):
+    """The shard (1 to count) of the page at rel_path, relative to the
+    content directory."""
+    digest = hash_bytes(rel_path.replace(os.sep, "/").encode())
+    return int(digest[:16], 16) % count + 1
+
+
+def shard_path(shard_dir, index, count):
+    return os.path.join(shard_dir, f"{index}-of-{count}")
+
+
+def shard_dest_dir(shard_dir, index, count):
+    return os.path.join(shard_path(shard_dir, index, count), "docs")
+
+
+def shard_cache_dir(shard_dir, index, count):
+    return os.path.join(shard_path(shard_dir, index, count), "cache")
+
+
+def shard_manifest_path(cache_dir):
+    return os.path.join(cache_dir, SHARD_MANIFEST_NAME)
+
+
+def save_shard_manifest(path, shard, url_key, results, dest_dir_path):
+    pages = {}
+    for result in results:
+        if result.error is not None or result.draft:
+            continue
+        pages[result.from_path] = {
+            "source_hash": result.source_hash,
+            "output": os.path.relpath(result.dest_path, dest_dir_path).replace(os.sep, "/"),
+        }
+
+    save_json_state(path, {"version": SHARD_MANIFEST_VERSION, "shard": list(shard), "url_key": url_key, "pages": pages})
+
+
+def load_shard_manifest(path, shard):
+    """Load the partial manifest of shard, raising ValueError if the shard
+    has not (successfully) been built."""
+    index, count = shard
+    if not os.path.exists(path):
+        raise ValueError(f"Shard {index}/{count} has not been built: {path} is missing")
+
+    with open(path, 'r') as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError:
+            raise ValueError(f"Shard {index}/{count} has an unreadable manifest {path}")
+    if data.get("version") != SHARD_MANIFEST_VERSION or data.get("shard") != [index, count]:
+        raise ValueError(f"{path} is not the manifest of shard {index}/{count}")
+    return data
+
+
+def remove_shard_manifest(path):
+    # A shard that fails must not leave the manifest of an older build behind
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,103 @@
+import os
+import re
+from types import GeneratorType
+
+from manifest import hash_bytes
+from urls import UrlResolver, resolve_attribute_urls
+
+
+template_variable_regex = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+
+# (template_path, UrlResolver.key) -> (mtime_ns, size, CompiledTemplate)
+template_cache = {}
+
+
+class CompiledTemplate:
+    """A template split once into static segments and named slots so that a
+    page is produced with a single join instead of one replace per variable."""
+
+    def __init__(self, parts, slots, source_hash=None):
+        self.parts = parts
+        self.slots = slots
+        self.source_hash = source_hash
+
+    def render(self, variables) -> str:
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            value = variables.get(name)
+            if value is None:
+                parts[index] = ""
+            elif isinstance(value, str):
+                parts[index] = value
+            elif hasattr(value, "iter_html"):
+                parts[index] = value.to_html()
+            elif isinstance(value, GeneratorType):
+                parts[index] = "".join(value)
+            else:
+                parts[index] = str(value)
+        return "".join(parts)
+
+    def render_to(self, write, variables):
+        """Write the page chunk by chunk. A variable may be a string, an
+        HTMLNode (streamed with iter_html) or a generator of string chunks."""
+        slot_names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            name = slot_names.get(index)
+            if name is None:
+                write(part)
+                continue
+
+            value = variables.get(name)
+            if value is None:
+                continue
+            if isinstance(value, str):
+                write(value)
+            elif hasattr(value, "iter_html"):
+                value.render_to(write)
+            elif isinstance(value, GeneratorType):
+                for chunk in value:
+                    write(chunk)
+            else:
+                write(str(value))
+
+    def variable_names(self):
+        return [name for _, name in self.slots]
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate(parts={len(self.parts)}, slots={self.variable_names()})"
+
+
+def compile_template(template_content, basepath='/', assets=None) -> CompiledTemplate:
+    """Split the template around its {{ variables }}, resolving the href and
+    src attributes of the static parts against basepath (and fingerprinted
+    assets) once, up front."""
+    resolve_url = UrlResolver(basepath, assets).resolve
+    parts = []
+    slots = []
+    position = 0
+
+    for match in template_variable_regex.finditer(template_content):
+        parts.append(resolve_attribute_urls(template_content[position:match.start()], resolve_url))
+        slots.append((len(parts), match.group(1)))
+        parts.append("")
+        position = match.end()
+
+    parts.append(resolve_attribute_urls(template_content[position:], resolve_url))
+    return CompiledTemplate(parts, slots, hash_bytes(template_content.encode()))
+
+
+def load_template(template_path, basepath='/', assets=None) -> CompiledTemplate:
+    """Return the compiled template for template_path, compiling it only the
+    first time it is used or after the file changes on disk."""
+    stat = os.stat(template_path)
+    key = (template_path, UrlResolver(basepath, assets).key)
+    cached = template_cache.get(key)
+
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(template_path, 'r') as file:
+        template = compile_template(file.read(), basepath, assets)
+
+    template_cache[key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
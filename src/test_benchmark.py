@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import CorpusConfig, collect_markdown_files, compare_results, generate_corpus
+from block_markdown import markdown_to_html_node
+from fixtures import read_file, read_tree
+
+
+class TestBenchmarkGenerateCorpus(unittest.TestCase):
+    def test_generate_corpus_is_deterministic_and_parses(self):
+        config = CorpusConfig(pages=12, depth=2, paragraphs=4, links=6, static_files=2, static_kb=1)
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            generate_corpus(first, config)
+            generate_corpus(second, config)
+            first_paths = collect_markdown_files(os.path.join(first, "content"))
+            self.assertEqual(len(first_paths), 12)
+            self.assertEqual(read_tree(first), read_tree(second))
+            for path in first_paths:
+                self.assertIn("<a href=", markdown_to_html_node(read_file(path)).to_html())
+            self.assertTrue(os.path.isfile(os.path.join(first, "static", "images", "image-1.png")))
+
+
+class TestBenchmarkCompareResults(unittest.TestCase):
+    def test_compare_results_flags_slower_stages(self):
+        baseline = {"stages": {"to_html": 1.0, "write_file": 1.0, "copy_files": 0.0}}
+        current = {"stages": {"to_html": 1.25, "write_file": 1.05, "copy_files": 0.5}}
+        self.assertEqual(compare_results(baseline, current, 0.10), [("to_html", 1.0, 1.25)])
+
+
+if __name__ == "__main__":
+    unittest.main()
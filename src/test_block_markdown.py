@@ -1,6 +1,6 @@
 import unittest
 
-from block_markdown import BlockType, block_to_blocktype, is_code_block, is_heading, is_ordered_list, is_quote_block, is_unordered_list, markdown_to_blocks, markdown_to_html_node
+from block_markdown import Block, BlockType, block_to_blocktype, iter_blocks, parse_blocks, is_code_block, is_heading, is_ordered_list, is_quote_block, is_unordered_list, markdown_to_blocks, markdown_to_html_node
  
 class TestBlockMarkdownMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -46,6 +46,86 @@ This is the same paragraph on a new line
             ],
         )
 
+
+class TestBlockMarkdownParseBlocks(unittest.TestCase):
+    def test_parse_blocks_types_and_lines(self):
+        md = """# Title
+
+Some paragraph
+over two lines
+
+- item
+- item
+
+1. one
+2. two
+
+> quote
+"""
+        self.assertEqual(
+            parse_blocks(md),
+            [
+                Block(BlockType.HEADING, "# Title", 1, 1),
+                Block(BlockType.PARAGRAPH, "Some paragraph\nover two lines", 3, 4),
+                Block(BlockType.UNORDERED_LIST, "- item\n- item", 6, 7),
+                Block(BlockType.ORDERED_LIST, "1. one\n2. two", 9, 10),
+                Block(BlockType.QUOTE, "> quote", 12, 12),
+            ],
+        )
+
+    def test_parse_blocks_code_with_blank_lines(self):
+        md = "text\n\n```\ndef f():\n\n\n    return 1\n```\n\nafter"
+        self.assertEqual(
+            parse_blocks(md),
+            [
+                Block(BlockType.PARAGRAPH, "text", 1, 1),
+                Block(BlockType.CODE, "```\ndef f():\n\n\n    return 1\n```", 3, 8),
+                Block(BlockType.PARAGRAPH, "after", 10, 10),
+            ],
+        )
+
+    def test_parse_blocks_unclosed_fence_is_not_code(self):
+        md = "```\nnot closed\n\nparagraph"
+        self.assertEqual(
+            [block.block_type for block in parse_blocks(md)],
+            [BlockType.PARAGRAPH, BlockType.PARAGRAPH],
+        )
+
+    def test_parse_blocks_only_empty_lines_separate_blocks(self):
+        md = "first\n   \nsecond\n\n- a\n  \n- b\n\n- c\n \n\n \nlast\n\t"
+        self.assertEqual(
+            parse_blocks(md),
+            [
+                Block(BlockType.PARAGRAPH, "first\n   \nsecond", 1, 3),
+                Block(BlockType.PARAGRAPH, "- a\n  \n- b", 5, 7),
+                Block(BlockType.UNORDERED_LIST, "- c", 9, 9),
+                Block(BlockType.PARAGRAPH, "last", 13, 13),
+            ],
+        )
+
+    def test_iter_blocks_yields_each_block_once_it_ends(self):
+        read = []
+
+        def lines():
+            for line in ["# Title", "", "text", "more", "", "```", "code", "```"]:
+                read.append(line)
+                yield line
+
+        blocks = iter_blocks(lines())
+        self.assertEqual(next(blocks), Block(BlockType.HEADING, "# Title", 1, 1))
+        self.assertEqual(read, ["# Title", ""])
+        self.assertEqual(next(blocks), Block(BlockType.PARAGRAPH, "text\nmore", 3, 4))
+        self.assertEqual(list(blocks), [Block(BlockType.CODE, "```\ncode\n```", 6, 8)])
+
+    def test_iter_blocks_reparses_unclosed_fence(self):
+        md = "```\nnot closed\n\n- a\n\nstill open"
+        self.assertEqual(list(iter_blocks(md.split("\n"))), parse_blocks(md))
+        self.assertEqual(
+            [(block.block_type, block.start_line) for block in iter_blocks(md.split("\n"))],
+            [(BlockType.PARAGRAPH, 1), (BlockType.UNORDERED_LIST, 4), (BlockType.PARAGRAPH, 6)],
+        )
+
+
 class TestBlockMarkdownBlockToBlocktype(unittest.TestCase):
     def test_block_to_blocktype_heading(self):
         block = "# This is a heading"
@@ -267,3 +347,46 @@ the **same** even with inline stuff
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
+
+    def test_code_with_blank_lines_and_info_string(self):
+        md = """
+```python
+def f():
+
+    return 1
+```
+"""
+
+        node = markdown_to_html_node(md)
+        html = node.to_html()
+        self.assertEqual(
+            html,
+            "<div><pre><code>def f():\n\n    return 1\n</code></pre></div>",
+        )
+
+    def test_four_backtick_fence_holds_three_backtick_fences(self):
+        md = "````\n```\ninner\n```\n````"
+        self.assertEqual(parse_blocks(md), [Block(BlockType.CODE, md, 1, 5)])
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code>```\ninner\n```\n</code></pre></div>",
+        )
+
+    def test_longer_closing_run_is_stripped_whole(self):
+        self.assertEqual(
+            markdown_to_html_node("```\ncode\n````").to_html(),
+            "<div><pre><code>code\n</code></pre></div>",
+        )
+        self.assertEqual(
+            markdown_to_html_node("````\nx\n`````").to_html(),
+            "<div><pre><code>x\n</code></pre></div>",
+        )
+
+    def test_backtick_only_line_is_not_a_one_line_fence(self):
+        self.assertEqual(markdown_to_html_node("````").to_html(), "<div><p></p></div>")
+        self.assertEqual(parse_blocks("``````"), [Block(BlockType.PARAGRAPH, "``````", 1, 1)])
+        self.assertEqual(markdown_to_html_node("````````").to_html(), "<div><p></p></div>")
+        self.assertEqual(
+            markdown_to_html_node("text\n\n````\n\nmore").to_html(),
+            "<div><p>text</p><p></p><p>more</p></div>",
+        )
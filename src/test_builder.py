@@ -0,0 +1,84 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import gencontent
+from builder import Site
+from fixtures import SiteTestCase
+
+
+class TestSite(SiteTestCase):
+    touch_writes = True
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.site_config(basepath="/site/", incremental=True, check_links=True)
+        self.write(self.config.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.config.static_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.config.content_dir, "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        self.write(os.path.join(self.config.content_dir, "blog", "tom.md"), "# Tom\n\n[Home](/)")
+
+    def build(self, site):
+        with redirect_stdout(StringIO()):
+            return site.build()
+
+    def test_build_report(self):
+        report = self.build(Site(self.config))
+        self.assertEqual((len(report.results), report.pages_rendered), (2, 2))
+        self.assertEqual(report.broken_links, [(os.path.join(self.config.content_dir, "index.md"), 3, "/blog/tom")])
+        self.assertIn("blog/tom.html", report.changes.changed)
+        self.assertTrue(os.path.isfile(os.path.join(self.config.dest_dir, "index.css")))
+
+    def test_warm_rebuild_skips_untouched_pages_without_reading_them(self):
+        site = Site(self.config)
+        self.build(site)
+        with mock.patch.object(gencontent, "build_page", wraps=gencontent.build_page) as build_page:
+            report = self.build(site)
+        self.assertEqual((report.pages_rendered, report.pages_skipped), (0, 2))
+        self.assertEqual(build_page.call_count, 0)
+        self.assertEqual(len(report.changes.changed), 0)
+
+        self.write(os.path.join(self.config.content_dir, "blog", "tom.md"), "# Tom Bombadil")
+        with mock.patch.object(gencontent, "build_page", wraps=gencontent.build_page) as build_page:
+            report = self.build(site)
+        self.assertEqual([call.args[0] for call in build_page.call_args_list], [os.path.join(self.config.content_dir, "blog", "tom.md")])
+        self.assertEqual(report.pages_rendered, 1)
+
+    def test_template_change_rebuilds_every_page(self):
+        site = Site(self.config)
+        self.build(site)
+        self.write(self.config.template_path, "<h1>{{ Title }}</h1>{{ Content }}")
+        report = self.build(site)
+        self.assertEqual(report.pages_rendered, 2)
+        with open(os.path.join(self.config.dest_dir, "index.html"), 'r') as file:
+            self.assertTrue(file.read().startswith("<h1>Home</h1>"))
+
+    def test_cold_site_reuses_the_manifest(self):
+        self.build(Site(self.config))
+        report = self.build(Site(self.config))
+        self.assertEqual((report.pages_rendered, report.pages_skipped), (0, 2))
+
+
+    def test_turning_gzip_and_fingerprint_off_removes_their_outputs(self):
+        self.config.gzip = True
+        self.config.fingerprint = True
+        self.build(Site(self.config))
+        published = sorted(os.listdir(self.config.dest_dir))
+        self.assertIn("index.html.gz", published)
+        self.assertIn("asset-manifest.json", published)
+        self.assertEqual(len([name for name in published if name.startswith("index.") and name.endswith(".css")]), 1)
+
+        self.config.gzip = False
+        self.config.fingerprint = False
+        report = self.build(Site(self.config))
+        published = [name for _, _, file_names in os.walk(self.config.dest_dir) for name in file_names]
+        self.assertEqual([name for name in published if name.endswith(".gz") or name.endswith(".json")], [])
+        self.assertEqual([name for name in published if name.endswith(".css")], ["index.css"])
+        self.assertIn("index.html.gz", report.changes.deleted)
+        self.assertIn("asset-manifest.json", report.changes.deleted)
+
+
+if __name__ == "__main__":
+    unittest.main()
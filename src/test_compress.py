@@ -0,0 +1,50 @@
+import gzip
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from compress import compress_outputs
+from fixtures import SiteTestCase
+
+
+class TestCompressOutputs(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state_path = os.path.join(self.cache_dir, "gzip.json")
+        os.makedirs(os.path.join(self.dest_dir, "images"))
+        self.write(os.path.join(self.dest_dir, "index.html"), "<p>hello</p>" * 100)
+        self.write(os.path.join(self.dest_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.dest_dir, "images", "a.png"), "png bytes")
+
+    def compress(self, jobs=1):
+        with redirect_stdout(StringIO()):
+            return compress_outputs(self.dest_dir, self.state_path, jobs)
+
+    def test_compresses_text_outputs_only(self):
+        report = self.compress()
+        self.assertEqual(report.files_compressed, 2)
+        self.assertLess(report.ratio(), 1.0)
+        with gzip.open(os.path.join(self.dest_dir, "index.html.gz"), 'rt') as file:
+            self.assertEqual(file.read(), "<p>hello</p>" * 100)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "images", "a.png.gz")))
+
+    def test_unchanged_outputs_are_skipped(self):
+        self.compress()
+        self.write(os.path.join(self.dest_dir, "index.css"), "body { color: red }")
+        report = self.compress(jobs=2)
+        self.assertEqual(report.files_compressed, 1)
+        self.assertEqual(report.files_skipped, 1)
+        with gzip.open(os.path.join(self.dest_dir, "index.css.gz"), 'rt') as file:
+            self.assertEqual(file.read(), "body { color: red }")
+
+    def test_stale_gzip_is_deleted(self):
+        self.compress()
+        os.remove(os.path.join(self.dest_dir, "index.css"))
+        report = self.compress()
+        self.assertEqual(report.files_deleted, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "index.css.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+
+import copystatic
+from copystatic import copy_file_fast, load_sync_state, sync_files
+from fixtures import SiteTestCase, read_file
+
+
+class TestCopyStaticSyncFiles(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source_dir = self.static_dir
+        self.state_path = os.path.join(self.cache_dir, "static.json")
+        os.makedirs(os.path.join(self.source_dir, "images"))
+        self.write(os.path.join(self.source_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.source_dir, "images", "a.png"), "png bytes")
+
+    def sync(self, **kwargs):
+        return sync_files(self.source_dir, self.dest_dir, self.state_path, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        report = self.sync()
+        self.assertEqual(report.files_copied, 2)
+        self.assertEqual(report.bytes_copied, len("body {}") + len("png bytes"))
+        self.assertEqual(read_file(os.path.join(self.dest_dir, "images", "a.png")), "png bytes")
+
+    def test_second_sync_skips_unchanged_files(self):
+        self.sync()
+        report = self.sync()
+        self.assertEqual(report.files_copied, 0)
+        self.assertEqual(report.files_skipped, 2)
+        self.assertEqual(report.bytes_skipped, len("body {}") + len("png bytes"))
+
+    def test_sync_state_read_from_disk_is_reused(self):
+        self.sync()
+        copystatic.sync_state_cache.clear()
+        self.addCleanup(copystatic.sync_state_cache.clear)
+        files = load_sync_state(self.state_path)
+        self.assertEqual(sorted(files), ["images/a.png", "index.css"])
+        self.assertIs(load_sync_state(self.state_path), files)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.source_dir, "index.css"), "body { margin: 0 }")
+        report = self.sync()
+        self.assertEqual(report.files_copied, 1)
+        self.assertEqual(read_file(os.path.join(self.dest_dir, "index.css")), "body { margin: 0 }")
+
+    def test_hash_skips_touched_but_identical_file(self):
+        self.sync()
+        source_path = os.path.join(self.source_dir, "index.css")
+        stat = os.stat(source_path)
+        os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.sync(use_hash=True).files_copied, 0)
+        self.assertEqual(self.sync().files_copied, 0)
+
+    def test_stale_synced_file_is_deleted_but_pages_are_kept(self):
+        self.sync()
+        self.write(os.path.join(self.dest_dir, "index.html"), "<p>page</p>")
+        os.remove(os.path.join(self.source_dir, "images", "a.png"))
+        report = self.sync()
+        self.assertEqual(report.files_deleted, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "images")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, "index.html")))
+
+    def test_hardlink_sync_then_copy_does_not_touch_source(self):
+        self.sync(hardlink=True)
+        self.write(os.path.join(self.source_dir, "index.css"), "body { color: red }")
+        self.sync()
+        self.assertEqual(read_file(os.path.join(self.dest_dir, "index.css")), "body { color: red }")
+
+    def test_copy_file_fast_replaces_existing_file(self):
+        source_path = os.path.join(self.source_dir, "index.css")
+        dest_path = os.path.join(self.root, "copy.css")
+        self.write(dest_path, "old content that is longer")
+        method = copy_file_fast(source_path, dest_path)
+        self.assertIn(method, ("reflink", "copy_file_range", "copy"))
+        self.assertEqual(read_file(dest_path), "body {}")
+        self.assertEqual(os.stat(dest_path).st_mtime_ns, os.stat(source_path).st_mtime_ns)
+
+
+if __name__ == "__main__":
+    unittest.main()
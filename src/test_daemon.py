@@ -0,0 +1,68 @@
+import os
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from builder import Site
+from client import send_request
+from daemon import BuildDaemon, run_daemon
+from fixtures import SiteTestCase
+
+
+class TestBuildDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.config = self.site_config(basepath="/site/", incremental=True)
+        os.makedirs(self.static_dir)
+        self.page_path = os.path.join(self.content_dir, "index.md")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(self.page_path, "# Home\n\n[Tom](/blog/tom)")
+        self.daemon = BuildDaemon(Site(self.config))
+
+    def handle(self, request):
+        with redirect_stdout(StringIO()):
+            return self.daemon.handle(request)
+
+    def test_build_and_status(self):
+        response = self.handle({"command": "build"})
+        self.assertTrue(response["ok"])
+        self.assertEqual((response["build"]["pages"], response["build"]["rendered"]), (1, 1))
+        status = self.handle({"command": "status"})
+        self.assertEqual((status["builds"], status["pages"], status["requests"]), (1, 1, 2))
+        self.assertEqual(status["last_build"], response["build"])
+
+    def test_preview_matches_build(self):
+        self.handle({"command": "build"})
+        with open(os.path.join(self.config.dest_dir, "index.html"), 'r') as file:
+            self.assertEqual(self.handle({"command": "preview", "path": self.page_path})["html"], file.read())
+
+        html = self.handle({"command": "preview", "path": self.page_path, "markdown": "# Unsaved"})["html"]
+        self.assertEqual(html, "<title>Unsaved</title><div><h1>Unsaved</h1></div>")
+
+    def test_errors(self):
+        self.assertEqual(self.handle({"command": "explode"}), {"ok": False, "error": "ValueError: unknown command 'explode'"})
+        response = self.handle({"command": "preview", "path": self.page_path, "markdown": "no title"})
+        self.assertFalse(response["ok"])
+        self.assertIn("has no title", response["error"])
+
+    def test_socket_round_trip(self):
+        socket_path = os.path.join(self.root, "daemon.sock")
+        with redirect_stdout(StringIO()):
+            thread = threading.Thread(target=run_daemon, args=(self.daemon.site, socket_path))
+            thread.start()
+            try:
+                for _ in range(100):
+                    if os.path.exists(socket_path):
+                        break
+                    thread.join(0.05)
+                self.assertIn("<h1>Home</h1>", send_request(socket_path, {"command": "preview", "path": self.page_path})["html"])
+            finally:
+                send_request(socket_path, {"command": "stop"})
+                thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from urllib.request import urlopen
+
+from builder import Site
+from devserver import DevRequestHandler, DevServer, FileWatcher, LiveReload
+from fixtures import SiteTestCase, read_file, read_tree
+
+
+class TestDevServerRebuild(SiteTestCase):
+    touch_writes = True
+
+    def setUp(self):
+        super().setUp()
+        self.write(self.template_path, "<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content_dir, "blog", "post.md"), "# Post\n\nText")
+        self.write(os.path.join(self.static_dir, "index.css"), "body {}")
+        self.config = self.site_config(incremental=True, search=True)
+        self.dev_server = DevServer(Site(self.config))
+        self.output = StringIO()
+        with redirect_stdout(self.output):
+            self.dev_server.build()
+        self.watcher = FileWatcher([self.content_dir, self.static_dir, self.template_path])
+
+    def rebuild(self, changed, deleted):
+        with redirect_stdout(self.output):
+            return self.dev_server.rebuild(changed, deleted)
+
+    def test_changed_page_is_rebuilt(self):
+        post_path = os.path.join(self.content_dir, "blog", "post.md")
+        self.write(post_path, "# Post\n\nNew text")
+        changed, deleted = self.watcher.poll()
+        self.assertEqual((changed, deleted), ([post_path], []))
+        self.assertEqual(self.rebuild(changed, deleted), 1)
+        self.assertIn("New text", read_file(os.path.join(self.dest_dir, "blog", "post.html")))
+        # The build options of the site apply to rebuilds too
+        self.assertIn("new", read_file(os.path.join(self.dest_dir, "search", "shards", "ne.json")))
+
+    def test_rebuild_matches_a_full_build(self):
+        self.write(os.path.join(self.content_dir, "blog", "post.md"), "# Post\n\nNew text")
+        os.remove(os.path.join(self.content_dir, "index.md"))
+        self.rebuild(*self.watcher.poll())
+        rebuilt = sorted(read_tree(self.dest_dir))
+        with redirect_stdout(self.output):
+            Site(self.config).build()
+        built = sorted(read_tree(self.dest_dir))
+        self.assertEqual(rebuilt, built)
+        self.assertNotIn("index.html", rebuilt)
+
+    def test_new_page_in_new_directory(self):
+        page_path = os.path.join(self.content_dir, "about", "index.md")
+        self.write(page_path, "# About")
+        self.assertEqual(self.rebuild(*self.watcher.poll()), 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, "about", "index.html")))
+
+    def test_deleted_page_is_removed(self):
+        os.remove(os.path.join(self.content_dir, "blog", "post.md"))
+        self.rebuild(*self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog")))
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write(self.template_path, "<h1>{{ Title }}</h1><body>{{ Content }}</body>")
+        self.assertEqual(self.rebuild(*self.watcher.poll()), 2)
+        self.assertTrue(read_file(os.path.join(self.dest_dir, "index.html")).startswith("<h1>Home</h1>"))
+
+    def test_static_change_is_synced(self):
+        self.write(os.path.join(self.static_dir, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.rebuild(*self.watcher.poll()), 0)
+        self.assertEqual(read_file(os.path.join(self.dest_dir, "index.css")), "body { margin: 0 }")
+
+
+class TestDevServerRequestHandler(unittest.TestCase):
+    def test_html_gets_live_reload_script(self):
+        with tempfile.TemporaryDirectory() as dest_dir:
+            with open(os.path.join(dest_dir, "index.html"), 'w') as file:
+                file.write("<html><body><p>hi</p></body></html>")
+            with open(os.path.join(dest_dir, "index.css"), 'w') as file:
+                file.write("body {}")
+            server = ThreadingHTTPServer(("127.0.0.1", 0), lambda *args: DevRequestHandler(*args, directory=dest_dir))
+            server.live_reload = LiveReload()
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                base_url = f"http://127.0.0.1:{server.server_address[1]}"
+                html = urlopen(base_url + "/").read().decode()
+                css = urlopen(base_url + "/index.css").read().decode()
+            finally:
+                server.shutdown()
+                server.server_close()
+            self.assertIn("<p>hi</p><script>", html)
+            self.assertTrue(html.endswith("</script></body></html>"))
+            self.assertEqual(css, "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
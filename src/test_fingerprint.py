@@ -0,0 +1,79 @@
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fingerprint import build_asset_map, copy_assets
+from fixtures import SiteTestCase
+from gencontent import generate_pages_recursive
+from manifest import hash_bytes
+from urls import UrlResolver
+
+
+class TestFingerprint(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hash_state_path = os.path.join(self.cache_dir, "fingerprints.json")
+        self.copy_state_path = os.path.join(self.cache_dir, "assets.json")
+        os.makedirs(os.path.join(self.static_dir, "images"))
+        self.write(os.path.join(self.static_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.static_dir, "images", "a.png"), "png bytes")
+        self.write(os.path.join(self.static_dir, "robots.txt"), "User-agent: *")
+
+    def publish(self):
+        with redirect_stdout(StringIO()):
+            assets = build_asset_map(self.static_dir, self.hash_state_path)
+            copy_assets(assets, self.static_dir, self.dest_dir, self.copy_state_path)
+        return assets
+
+    def test_assets_are_published_under_hashed_names(self):
+        assets = self.publish()
+        css_name = f"index.{hash_bytes(b'body {}')[:8]}.css"
+        self.assertEqual(assets.urls["/index.css"], "/" + css_name)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, css_name)))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, "robots.txt")))
+        self.assertNotIn("/robots.txt", assets.urls)
+        with open(os.path.join(self.dest_dir, "asset-manifest.json"), 'r') as file:
+            self.assertEqual(json.load(file), assets.urls)
+
+    def test_changed_asset_replaces_old_name(self):
+        old_name = self.publish().urls["/index.css"]
+        self.write(os.path.join(self.static_dir, "index.css"), "body { color: red }")
+        new_name = self.publish().urls["/index.css"]
+        self.assertNotEqual(old_name, new_name)
+        self.assertFalse(os.path.exists(self.dest_dir + old_name))
+        self.assertTrue(os.path.exists(self.dest_dir + new_name))
+
+    def test_hashes_are_cached_by_size_and_mtime(self):
+        self.publish()
+        with open(self.hash_state_path, 'r') as file:
+            state = json.load(file)
+        state["files"]["index.css"]["hash"] = "cafebabe" * 8
+        with open(self.hash_state_path, 'w') as file:
+            json.dump(state, file)
+        self.assertEqual(self.publish().urls["/index.css"], "/index.cafebabe.css")
+
+    def test_resolver_rewrites_asset_urls(self):
+        resolve_url = UrlResolver("/site/", self.publish()).resolve
+        css_url = resolve_url("/index.css?v=1")
+        self.assertTrue(css_url.startswith("/site/index.") and css_url.endswith(".css?v=1"))
+        self.assertEqual(resolve_url("/blog/"), "/site/blog/")
+
+    def test_pages_reference_fingerprinted_assets(self):
+        assets = self.publish()
+        content_dir = os.path.join(self.root, "content")
+        template_path = os.path.join(self.root, "template.html")
+        os.makedirs(content_dir)
+        self.write(template_path, '<link href="/index.css">{{ Content }}')
+        self.write(os.path.join(content_dir, "index.md"), "# Home\n\n![a](/images/a.png)")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(content_dir, template_path, self.dest_dir, "/", assets=assets)
+        with open(os.path.join(self.dest_dir, "index.html"), 'r') as file:
+            html = file.read()
+        self.assertIn(f'<link href="{assets.urls["/index.css"]}">', html)
+        self.assertIn(f'<img src="{assets.urls["/images/a.png"]}" alt="a">', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
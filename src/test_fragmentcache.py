@@ -0,0 +1,146 @@
+import os
+import pickle
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import fragmentcache
+from block_markdown import BlockType, block_to_html_node, parse_blocks
+from fixtures import SiteTestCase, read_tree
+from fragmentcache import FragmentCache
+from gencontent import PageResult, generate_pages_recursive, memoized_body_html
+from profiler import Profiler
+from pageindex import PageIndex
+
+
+def render(cache, block, url_key, resolve_url=None):
+    """(html, title, hit) of one block, hit None when it is not memoized."""
+    result = PageResult(None, None)
+    html, title = memoized_body_html([block], cache, url_key, resolve_url, result)
+    hit = None if result.fragment_hits + result.fragment_misses == 0 else result.fragment_hits == 1
+    return html[len("<div>"):-len("</div>")], title, hit
+
+
+class TestFragmentCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "fragments.json")
+
+    def test_hit_returns_the_same_html_and_replays_urls(self):
+        cache = FragmentCache()
+        block = parse_blocks("A **bold** [link](/blog/) and ![img](/a.png)")[0]
+        expected = block_to_html_node(block.text, block.block_type, lambda url: "/site" + url).to_html()
+        for hit in [False, True]:
+            urls = []
+            html, title, was_hit = render(cache, block, "/site/", lambda url: urls.append(url) or "/site" + url)
+            self.assertEqual((html, title, was_hit), (expected, None, hit))
+            self.assertEqual(urls, ["/blog/", "/a.png"])
+
+    def test_h1_title_and_key(self):
+        cache = FragmentCache()
+        block = parse_blocks("# The _Title_")[0]
+        self.assertEqual(render(cache, block, "/")[1:], ("The Title", False))
+        self.assertEqual(render(cache, block, "/site/")[1:], ("The Title", False))
+        self.assertEqual(render(cache, parse_blocks("> # The _Title_")[0], "/")[2], False)
+        self.assertEqual(len(cache.entries), 3)
+
+    def test_large_blocks_are_not_memoized(self):
+        cache = FragmentCache()
+        block = parse_blocks("x" * (fragmentcache.MAX_FRAGMENT_CHARS + 1))[0]
+        self.assertIsNone(render(cache, block, "/")[2])
+        self.assertIsNone(render(cache, block, "/")[2])
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_least_recently_used_blocks_are_evicted(self):
+        cache = FragmentCache(max_entries=2)
+        a, b, c = parse_blocks("a\n\nb\n\nc")
+        render(cache, a, "/")
+        render(cache, b, "/")
+        render(cache, a, "/")
+        render(cache, c, "/")
+        self.assertEqual([key[2] for key in cache.entries], ["a", "c"])
+
+    def test_only_repeated_blocks_are_saved(self):
+        cache = FragmentCache(self.path)
+        once, twice = parse_blocks("once\n\ntwice")
+        render(cache, once, "/")
+        render(cache, twice, "/")
+        render(cache, twice, "/")
+        cache.save()
+
+        loaded = FragmentCache(self.path)
+        loaded.load()
+        self.assertEqual(list(loaded.entries), [("/", BlockType.PARAGRAPH.value, "twice")])
+        self.assertTrue(render(loaded, twice, "/")[2])
+
+        original_version = fragmentcache.PARSER_VERSION
+        fragmentcache.PARSER_VERSION = original_version + 1
+        try:
+            stale = FragmentCache(self.path)
+            stale.load()
+        finally:
+            fragmentcache.PARSER_VERSION = original_version
+        self.assertEqual(len(stale.entries), 0)
+
+    def test_workers_share_repeated_blocks_through_the_parent(self):
+        block = parse_blocks("Written by [Tom](/about/)")[0]
+        worker = pickle.loads(pickle.dumps(FragmentCache(self.path)))
+        self.addCleanup(fragmentcache.worker_caches.clear)
+        self.assertIs(pickle.loads(pickle.dumps(FragmentCache(self.path))), worker)
+        render(worker, block, "/")
+        render(worker, block, "/")
+        repeated = worker.take_repeated()
+        self.assertEqual(worker.take_repeated(), [])
+
+        parent = FragmentCache(self.path)
+        parent.merge(pickle.loads(pickle.dumps(repeated)))
+        self.assertEqual(render(parent, block, "/")[0], '<p>Written by <a href="/about/">Tom</a></p>')
+        self.assertTrue(render(parent, block, "/")[2])
+
+    def test_serializing_misses_has_its_own_span(self):
+        profiler = Profiler()
+        blocks = parse_blocks("# Title\n\ntext")
+        html, title = memoized_body_html(blocks, FragmentCache(), "/", None, PageResult(None, None), profiler, {"page": "a.md"})
+        self.assertEqual((html, title), ("<div><h1>Title</h1><p>text</p></div>", "Title"))
+        self.assertEqual([event[0] for event in profiler.events], ["inline_parse", "html_serialize"])
+
+
+class TestFragmentCacheBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(6):
+            self.write(os.path.join(self.content_dir, f"post{i}", "index.md"), f"# Post {i}\n\nPost _{i}_ body\n\n- [Home](/)\n- [About](/about/)\n\n> Opinions are my own")
+
+    def build(self, name, jobs=1, fragment_cache=None):
+        page_index = PageIndex(None)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content_dir, self.template_path, os.path.join(self.root, name), "/site/", jobs=jobs, page_index=page_index, fragment_cache=fragment_cache)
+        return page_index
+
+    def test_memoized_build_matches_plain_build(self):
+        plain_index = self.build("plain")
+        cache = FragmentCache(os.path.join(self.root, "fragments.json"))
+        memo_index = self.build("memo", fragment_cache=cache)
+        self.assertEqual(read_tree(os.path.join(self.root, "memo")), read_tree(os.path.join(self.root, "plain")))
+        self.assertEqual(memo_index.pages, plain_index.pages)
+        self.assertEqual(memo_index.links, plain_index.links)
+        # Post i, its body, the list and the quote; the last two repeat
+        self.assertEqual((cache.hits, cache.misses), (10, 14))
+
+    def test_parallel_build_shares_repeated_blocks(self):
+        cache = FragmentCache(os.path.join(self.root, "fragments.json"))
+        self.build("plain")
+        self.build("parallel", jobs=3, fragment_cache=cache)
+        self.assertEqual(read_tree(os.path.join(self.root, "parallel")), read_tree(os.path.join(self.root, "plain")))
+        self.assertEqual(cache.hits + cache.misses, 24)
+        self.assertEqual(sorted(key[1] for key in cache.entries), ["quote", "unordered_list"])
+
+        next_build = FragmentCache(cache.path)
+        next_build.load()
+        self.build("again", jobs=3, fragment_cache=next_build)
+        self.assertEqual((next_build.hits, next_build.misses), (12, 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from io import StringIO
+
+from frontmatter import split_front_matter, split_front_matter_lines
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        markdown = """---
+title: "Tom: a Mistake"
+date: 2024-05-01
+tags: [tolkien, essays]
+draft: false
+---
+# Heading
+
+Body"""
+        front_matter, body, body_start_line = split_front_matter(markdown)
+        self.assertEqual(
+            front_matter,
+            {"title": "Tom: a Mistake", "date": "2024-05-01", "tags": ["tolkien", "essays"], "draft": False},
+        )
+        self.assertEqual(body, "# Heading\n\nBody")
+        self.assertEqual(body_start_line, 7)
+
+    def test_block_list_and_single_tag(self):
+        front_matter, _, _ = split_front_matter("---\ntags:\n  - a\n  - b\nauthor: me\n---\n")
+        self.assertEqual(front_matter, {"tags": ["a", "b"], "author": "me"})
+        front_matter, _, _ = split_front_matter("---\ntags: solo\n---\n")
+        self.assertEqual(front_matter["tags"], ["solo"])
+
+    def test_document_without_front_matter(self):
+        for markdown in ("# Title\n\n---\n", "---\nnever closed"):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown, 1))
+
+    def test_split_front_matter_lines(self):
+        for markdown in ("---\ntitle: Tom\n---\n# Heading\n\nBody", "# Title\n\n---\n", "---\nnever closed", ""):
+            front_matter, body, body_start_line = split_front_matter(markdown)
+            streamed_front_matter, body_lines, streamed_start_line = split_front_matter_lines(StringIO(markdown + "\n"))
+            self.assertEqual((streamed_front_matter, list(body_lines), streamed_start_line), (front_matter, body.split("\n"), body_start_line))
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\njust words\n---\n")
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ndraft: maybe\n---\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
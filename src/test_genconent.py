@@ -1,20 +1,88 @@
+import os
 import unittest
 
-from gencontent import extract_title
+from fixtures import SiteTestCase, read_tree
+from gencontent import BuildError, generate_pages_recursive
+from pageindex import PageIndex
 
 
-class TestGenContentExtractTitle(unittest.TestCase):
-    def test_extract_title(self):
-        md = """
-# This is a title that ends with spaces 
-"""
-        self.assertEqual(extract_title(md), "This is a title that ends with spaces")
+class TestGenContentGeneratePagesRecursive(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template_path, "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}")
+        for i in range(6):
+            page_dir = os.path.join(self.content_dir, "blog", f"post{i}")
+            os.makedirs(page_dir)
+            self.write(os.path.join(page_dir, "index.md"), f"# Post {i}\n\nSome **bold** text and a [link](/blog/post{i})")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\n![img](/images/a.png)")
 
-    def test_split_nodes_delimiter_with_invalid_markdown(self):
-        with self.assertRaises(Exception):
-            md = """
-This is not a title that ends with spaces 
-"""
-            extract_title(md)
+    def test_parallel_build_matches_serial_build(self):
+        serial_dir = os.path.join(self.root, "serial")
+        parallel_dir = os.path.join(self.root, "parallel")
+        generate_pages_recursive(self.content_dir, self.template_path, serial_dir, "/site/")
+        generate_pages_recursive(self.content_dir, self.template_path, parallel_dir, "/site/", jobs=3)
+        serial_files = read_tree(serial_dir)
+        self.assertEqual(len(serial_files), 7)
+        self.assertEqual(serial_files, read_tree(parallel_dir))
 
+    def test_streamed_build_matches_in_memory_build(self):
+        self.write(
+            os.path.join(self.content_dir, "blog", "post0", "index.md"),
+            "---\ndate: 2024-01-02\n---\nIntro [a](/a)\n\n# Post *0*\n\n```\ncode\n\n```\n\n- [b](/b)",
+        )
+        memory_dir = os.path.join(self.root, "memory")
+        streamed_dir = os.path.join(self.root, "streamed")
+        memory_index = PageIndex(None)
+        streamed_index = PageIndex(None)
+        generate_pages_recursive(self.content_dir, self.template_path, memory_dir, "/site/", page_index=memory_index)
+        generate_pages_recursive(self.content_dir, self.template_path, streamed_dir, "/site/", page_index=streamed_index, stream_threshold=0)
+        self.assertEqual(read_tree(memory_dir), read_tree(streamed_dir))
+        self.assertEqual(memory_index.pages, streamed_index.pages)
+        self.assertEqual(memory_index.links, streamed_index.links)
+        self.assertEqual(streamed_index.links[os.path.join(self.content_dir, "blog", "post0", "index.md")], [["/a", 4], ["/b", 13]])
 
+    def test_basepath_only_resolves_urls_not_code_or_prose(self):
+        self.write(os.path.join(self.content_dir, "index.md"), '# Home\n\n[home](/) says `href="/x"`\n\n```\n<a href="/y">\n```')
+        dest_dir = os.path.join(self.root, "docs")
+        generate_pages_recursive(self.content_dir, self.template_path, dest_dir, "/site/")
+        with open(os.path.join(dest_dir, "index.html"), 'r') as file:
+            html = file.read()
+        self.assertIn('<link href="/site/index.css">', html)
+        self.assertIn('<a href="/site/">home</a>', html)
+        self.assertIn('<code>href="/x"</code>', html)
+        self.assertIn('<a href="/y">', html)
+
+    def test_front_matter_drafts_and_page_index(self):
+        self.write(os.path.join(self.root, "post.html"), "<h1>{{ Title }}</h1><p>{{ tags }}</p>{{ Content }}")
+        self.write(
+            os.path.join(self.content_dir, "blog", "post0", "index.md"),
+            "---\ntitle: First\ndate: 2024-01-02\ntags: [a, b]\ntemplate: post.html\n---\nNo heading here",
+        )
+        self.write(os.path.join(self.content_dir, "blog", "post1", "index.md"), "---\ndraft: true\n---\n# Draft")
+        dest_dir = os.path.join(self.root, "docs")
+        page_index = PageIndex(None)
+        results = generate_pages_recursive(self.content_dir, self.template_path, dest_dir, "/", page_index=page_index)
+
+        with open(os.path.join(dest_dir, "blog", "post0", "index.html"), 'r') as file:
+            self.assertEqual(file.read(), "<h1>First</h1><p>a, b</p><div><p>No heading here</p></div>")
+        self.assertFalse(os.path.exists(os.path.join(dest_dir, "blog", "post1", "index.html")))
+        self.assertEqual([result.from_path for result in results if result.draft], [os.path.join(self.content_dir, "blog", "post1", "index.md")])
+
+        entry = page_index.pages[os.path.join(self.content_dir, "blog", "post0", "index.md")]
+        self.assertEqual(entry, {"title": "First", "date": "2024-01-02", "tags": ["a", "b"], "template": "post.html", "url": "/blog/post0/"})
+        self.assertEqual(page_index.pages[os.path.join(self.content_dir, "index.md")], {"title": "Home", "url": "/"})
+        self.assertEqual(len(page_index.pages), 6)
+
+    def test_page_without_title_fails(self):
+        self.write(os.path.join(self.content_dir, "index.md"), "no title")
+        with self.assertRaisesRegex(ValueError, "has no title"):
+            generate_pages_recursive(self.content_dir, self.template_path, os.path.join(self.root, "docs"), "/")
+
+    def test_parallel_build_reports_failed_pages_and_builds_the_rest(self):
+        self.write(os.path.join(self.content_dir, "blog", "post3", "index.md"), "No title here")
+        dest_dir = os.path.join(self.root, "docs")
+        with self.assertRaises(BuildError) as context:
+            generate_pages_recursive(self.content_dir, self.template_path, dest_dir, "/", jobs=3)
+        failed = [result.from_path for result in context.exception.failed_results]
+        self.assertEqual(failed, [os.path.join(self.content_dir, "blog", "post3", "index.md")])
+        self.assertEqual(len(read_tree(dest_dir)), 6)
@@ -121,5 +121,48 @@ class TestParentNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span><div>child</div></div>",
         )
 
+    def test_to_html_without_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).to_html()
+
+    def test_to_html_with_leaf_without_value(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", [LeafNode("b", None)]).to_html()
+
+
+class TestHTMLNodeStreaming(unittest.TestCase):
+    def test_iter_html_chunks(self):
+        node = ParentNode("div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")])], {"class": "c"})
+        self.assertEqual(
+            list(node.iter_html()),
+            ['<div class="c">', "<b>bold</b>", "<p>", "text", "</p>", "</div>"],
+        )
+
+    def test_render_to_matches_to_html(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("a", "link", {"href": "/x"})]) for _ in range(3)])
+        chunks = []
+        node.render_to(chunks.append)
+        self.assertEqual("".join(chunks), node.to_html())
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode(None, "leaf")
+        for _ in range(10000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), len("<span></span>") * 10000 + len("leaf"))
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_base_node_to_html_is_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").to_html()
+
+    def test_text_content(self):
+        node = ParentNode("h1", [LeafNode(None, "The "), LeafNode("b", "Lord"), LeafNode(None, " of the Rings")])
+        self.assertEqual(node.text_content(), "The Lord of the Rings")
+
 if __name__ == "__main__":
     unittest.main()
@@ -251,3 +251,63 @@ class TestInlineMarkdownTextToTextNodes(unittest.TestCase):
         expected_textnodes = []
         self.assertListEqual(textnodes, expected_textnodes)
 
+    def test_text_to_textnodes_code_is_not_split_on_emphasis(self):
+        text = "Use `a ** b` and `snake_case` here"
+        textnodes = text_to_textnodes(text)
+        expected_textnodes = [
+            TextNode("Use ", TextType.TEXT),
+            TextNode("a ** b", TextType.CODE),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("snake_case", TextType.CODE),
+            TextNode(" here", TextType.TEXT),
+        ]
+        self.assertListEqual(textnodes, expected_textnodes)
+
+    def test_text_to_textnodes_link_url_with_underscores(self):
+        text = "See [the _docs_](https://example.com/some_page_name) for **more**"
+        textnodes = text_to_textnodes(text)
+        expected_textnodes = [
+            TextNode("See ", TextType.TEXT),
+            TextNode("the _docs_", TextType.LINK, "https://example.com/some_page_name"),
+            TextNode(" for ", TextType.TEXT),
+            TextNode("more", TextType.BOLD),
+        ]
+        self.assertListEqual(textnodes, expected_textnodes)
+
+    def test_text_to_textnodes_emphasis_contents_are_literal(self):
+        text = "_see [a](b) and **c**_"
+        textnodes = text_to_textnodes(text)
+        expected_textnodes = [
+            TextNode("see [a](b) and **c**", TextType.ITALIC),
+        ]
+        self.assertListEqual(textnodes, expected_textnodes)
+
+    def test_text_to_textnodes_many_links(self):
+        text = " ".join(f"[l{i}](/p/{i})" for i in range(500))
+        textnodes = text_to_textnodes(text)
+        self.assertEqual(len(textnodes), 999)
+        self.assertEqual(textnodes[-1], TextNode("l499", TextType.LINK, "/p/499"))
+
+    def test_text_to_textnodes_unmatched_delimiter(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("This is **not closed")
+
+    def test_text_to_textnodes_delimiters_in_links_do_not_pair_outside(self):
+        # The old split_nodes pipeline paired these with the _ in the URL
+        with self.assertRaises(Exception):
+            text_to_textnodes("[l](/a_b) some_thing")
+        with self.assertRaises(Exception):
+            text_to_textnodes("[x.png](_)_!![i](u)a")
+        self.assertListEqual(
+            text_to_textnodes("[l](/a_b) some_thing_"),
+            [
+                TextNode("l", TextType.LINK, "/a_b"),
+                TextNode(" some", TextType.TEXT),
+                TextNode("thing", TextType.ITALIC),
+            ],
+        )
+
+    def test_text_to_textnodes_lone_characters_are_text(self):
+        text = "5 * 3 ! [not a link] (nor this)"
+        self.assertListEqual(text_to_textnodes(text), [TextNode(text, TextType.TEXT)])
+
@@ -0,0 +1,76 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase
+from gencontent import generate_pages_recursive
+from linkcheck import LinkCollector, check_links, link_target
+from pageindex import PageIndex
+from parsecache import ParseCache
+
+
+class TestLinkCollector(unittest.TestCase):
+    def test_locate_lines(self):
+        collector = LinkCollector()
+        for url in ["/a", "/b.png", "/a"]:
+            collector.resolve(url)
+        markdown = "# [A](/a)\n\ntext\n![b](/b.png) and\n[again](/a)"
+        self.assertEqual(collector.locate(markdown, 5), [["/a", 5], ["/b.png", 8], ["/a", 9]])
+
+    def test_wraps_resolver(self):
+        collector = LinkCollector(lambda url: "/site" + url)
+        self.assertEqual(collector.resolve("/a"), "/site/a")
+        self.assertEqual(collector.urls, ["/a"])
+
+
+class TestLinkTarget(unittest.TestCase):
+    def test_internal_links(self):
+        self.assertEqual(link_target("/blog/tom?x=1#top", "/"), "/blog/tom")
+        self.assertEqual(link_target("../images/a%20b.png", "/blog/tom/"), "/blog/images/a b.png")
+        self.assertEqual(link_target("/", "/blog/"), "/")
+
+    def test_external_links_are_skipped(self):
+        for url in ["https://example.com", "//cdn.example.com/x.js", "mailto:a@b.c", "#top", ""]:
+            self.assertIsNone(link_target(url, "/"))
+
+
+class TestCheckLinks(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content_dir, "blog", "tom"))
+        os.makedirs(os.path.join(self.dest_dir, "images"))
+        self.write(self.template_path, "{{ Content }}")
+        self.write(os.path.join(self.dest_dir, "images", "tom.png"), "png")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\n[Tom](/blog/tom) [Missing](/blog/missing)")
+        self.write(
+            os.path.join(self.content_dir, "blog", "tom", "index.md"),
+            "---\ntitle: Tom\n---\n![Tom](/images/tom.png)\n\n![Gone](../gone.png) [Home](/) [Out](https://example.com)",
+        )
+        self.page_index = PageIndex(None)
+
+    def build_and_check(self, parse_cache=None):
+        with redirect_stdout(StringIO()):
+            self.page_index.begin_build()
+            generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, "/site/", parse_cache=parse_cache, page_index=self.page_index)
+            return check_links(self.page_index, self.dest_dir)
+
+    def test_broken_links_report_file_and_line(self):
+        report = self.build_and_check()
+        self.assertEqual(report.links, 5)
+        self.assertEqual(report.failures, [
+            (os.path.join(self.content_dir, "blog", "tom", "index.md"), 6, "../gone.png"),
+            (os.path.join(self.content_dir, "index.md"), 3, "/blog/missing"),
+        ])
+
+    def test_cached_pages_keep_their_links(self):
+        parse_cache = ParseCache(os.path.join(self.root, "cache"))
+        self.build_and_check(parse_cache)
+        self.page_index = PageIndex(None)
+        report = self.build_and_check(parse_cache)
+        self.assertEqual(parse_cache.hits, 2)
+        self.assertEqual(len(report.failures), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
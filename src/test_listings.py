@@ -0,0 +1,66 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase
+from listings import blog_posts, generate_listings
+from pageindex import PageIndex
+
+
+class TestListings(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state_path = os.path.join(self.cache_dir, "listings.json")
+        self.write(self.template_path, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.page_index = PageIndex(None)
+        self.page_index.pages["content/index.md"] = {"title": "Home", "url": "/"}
+        for i in range(5):
+            self.page_index.pages[f"content/blog/post{i}/index.md"] = {"title": f"Post {i}", "date": f"2024-01-0{i + 1}", "url": f"/blog/post{i}/"}
+
+    def generate(self, site_url=None):
+        with redirect_stdout(StringIO()):
+            return generate_listings(self.page_index, self.template_path, self.dest_dir, "/site/", site_url, self.state_path, page_size=2)
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest_dir, *parts), 'r') as file:
+            return file.read()
+
+    def test_blog_posts_newest_first(self):
+        self.page_index.pages["content/blog/undated/index.md"] = {"title": "Undated", "url": "/blog/undated/"}
+        urls = [post["url"] for post in blog_posts(self.page_index)]
+        self.assertEqual(urls, ["/blog/post4/", "/blog/post3/", "/blog/post2/", "/blog/post1/", "/blog/post0/", "/blog/undated/"])
+
+    def test_paginated_listing(self):
+        report = self.generate()
+        self.assertEqual(report.rendered, 3)
+        first = self.read("blog", "index.html")
+        self.assertIn('<a href="/site/blog/post4/">Post 4</a> <time datetime="2024-01-05">2024-01-05</time>', first)
+        self.assertIn('<a href="/site/blog/page/2/" rel="next">Older posts</a>', first)
+        last = self.read("blog", "page", "3", "index.html")
+        self.assertIn("<title>Blog, page 3</title>", last)
+        self.assertIn('<a href="/site/blog/page/2/" rel="prev">Newer posts</a>', last)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "feed.xml")))
+
+    def test_only_changed_slices_are_rendered(self):
+        self.generate(site_url="https://example.com")
+        # post0 is on the last listing page and in the feed, the sitemap
+        # only lists urls and dates
+        self.page_index.pages["content/blog/post0/index.md"]["title"] = "Renamed"
+        report = self.generate(site_url="https://example.com")
+        self.assertEqual((report.rendered, report.skipped), (2, 3))
+        self.assertIn("Renamed", self.read("blog", "page", "3", "index.html"))
+        self.assertIn("<loc>https://example.com/site/blog/page/3/</loc>", self.read("sitemap.xml"))
+        self.assertIn("<pubDate>Mon, 01 Jan 2024 00:00:00 +0000</pubDate>", self.read("feed.xml"))
+
+    def test_stale_listing_pages_are_removed(self):
+        self.generate()
+        for i in range(3, 5):
+            del self.page_index.pages[f"content/blog/post{i}/index.md"]
+        report = self.generate()
+        self.assertEqual(report.deleted, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog", "page", "3")))
+
+
+if __name__ == "__main__":
+    unittest.main()
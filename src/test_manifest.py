@@ -0,0 +1,72 @@
+import os
+import unittest
+
+from fixtures import SiteTestCase
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+
+
+class TestManifestIncrementalBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        os.makedirs(self.dest_dir)
+        self.write(self.template_path, "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content_dir, "blog", "post.md"), "# Post\n\nSome text")
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        results = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, basepath, manifest)
+        manifest.prune(self.dest_dir)
+        manifest.save()
+        return manifest, results
+
+    def rendered(self, results):
+        return sorted(os.path.relpath(result.from_path, self.content_dir) for result in results if result.rendered)
+
+    def test_first_build_renders_everything(self):
+        _, results = self.build()
+        self.assertEqual(self.rendered(results), ["blog/post.md", "index.md"])
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, "blog", "post.html")))
+
+    def test_unchanged_build_renders_nothing(self):
+        self.build()
+        _, results = self.build()
+        self.assertEqual(self.rendered(results), [])
+
+    def test_changed_source_renders_only_that_page(self):
+        self.build()
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\nWelcome back")
+        _, results = self.build()
+        self.assertEqual(self.rendered(results), ["index.md"])
+
+    def test_changed_template_renders_every_page(self):
+        self.build()
+        self.write(self.template_path, "<h1>{{ Title }}</h1>{{ Content }}")
+        _, results = self.build()
+        self.assertEqual(self.rendered(results), ["blog/post.md", "index.md"])
+
+    def test_changed_basepath_renders_every_page(self):
+        self.build()
+        _, results = self.build("/site/")
+        self.assertEqual(self.rendered(results), ["blog/post.md", "index.md"])
+
+    def test_missing_output_is_rendered_again(self):
+        self.build()
+        os.remove(os.path.join(self.dest_dir, "index.html"))
+        _, results = self.build()
+        self.assertEqual(self.rendered(results), ["index.md"])
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content_dir, "blog", "post.md"))
+        manifest, _ = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest_dir, "index.html")))
+        self.assertNotIn(os.path.join(self.content_dir, "blog", "post.md"), manifest.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
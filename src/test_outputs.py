@@ -0,0 +1,80 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import outputs
+from copystatic import copy_files
+from fixtures import SiteTestCase
+from outputs import OutputChanges, load_json_state, remove_stale_outputs, save_json_state, write_output
+
+
+class TestOutputs(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(self.dest_dir)
+
+    def test_write_output_skips_identical_content(self):
+        path = os.path.join(self.dest_dir, "index.html")
+        self.assertTrue(write_output(path, "<p>one</p>"))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(write_output(path, "<p>one</p>"))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_output(path, "<p>two</p>"))
+        with open(path, 'r') as file:
+            self.assertEqual(file.read(), "<p>two</p>")
+        self.assertEqual(os.listdir(self.dest_dir), ["index.html"])
+
+    def test_written_outputs_get_the_mode_of_new_files(self):
+        path = os.path.join(self.dest_dir, "index.html")
+        umask = os.umask(0o022)
+        try:
+            outputs.UMASK = 0o022
+            write_output(path, "<p>one</p>")
+        finally:
+            os.umask(umask)
+            outputs.UMASK = umask
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+        os.chmod(path, 0o664)
+        write_output(path, "<p>two</p>")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o664)
+
+    def test_interrupted_state_save_keeps_the_previous_state(self):
+        path = os.path.join(self.cache_dir, "state.json")
+        save_json_state(path, {"files": {"a": 1}})
+        with self.assertRaises(TypeError):
+            save_json_state(path, {"files": {"a": object()}})
+        self.assertEqual(load_json_state(path, "state"), {"files": {"a": 1}})
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["state.json"])
+
+        self.write(path, '{"files": {"a"')
+        with redirect_stdout(StringIO()) as stdout:
+            self.assertIsNone(load_json_state(path, "state"))
+        self.assertIn("Ignoring unreadable state", stdout.getvalue())
+        self.assertIsNone(load_json_state(os.path.join(self.root, "missing.json"), "state"))
+
+    def test_copy_files_keeps_identical_files_and_removes_stale(self):
+        source_dir = os.path.join(self.root, "static")
+        self.write(os.path.join(source_dir, "index.css"), "body {}")
+        self.write(os.path.join(source_dir, "images", "a.png"), "png")
+        self.write(os.path.join(self.dest_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.dest_dir, "old", "gone.html"), "old")
+        os.utime(os.path.join(self.dest_dir, "index.css"), ns=(0, 0))
+
+        changes = OutputChanges(self.dest_dir)
+        with redirect_stdout(StringIO()):
+            dest_paths = copy_files(source_dir, self.dest_dir, changes=changes)
+            remove_stale_outputs(self.dest_dir, dest_paths, changes)
+
+        self.assertEqual(os.stat(os.path.join(self.dest_dir, "index.css")).st_mtime_ns, 0)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "old")))
+        self.assertEqual(
+            changes.to_dict(),
+            {"changed": [os.path.join("images", "a.png")], "deleted": [os.path.join("old", "gone.html")]},
+        )
+        self.assertEqual(changes.unchanged, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import unittest
+
+import parsecache
+from fixtures import SiteTestCase, read_file
+from gencontent import generate_pages_recursive
+from parsecache import ParseCache
+
+
+class TestParseCache(SiteTestCase):
+    def test_get_missing_entry(self):
+        self.assertIsNone(ParseCache(self.cache_dir).get("abc"))
+
+    def test_put_then_get(self):
+        cache = ParseCache(self.cache_dir)
+        cache.put("abc", "<div><p>hi</p></div>", "Hi", links=[["/blog/", 3]])
+        self.assertEqual(cache.get("abc"), ("<div><p>hi</p></div>", "Hi", [["/blog/", 3]]))
+
+    def test_parser_version_is_part_of_the_key(self):
+        cache = ParseCache(self.cache_dir)
+        cache.put("abc", "<div></div>")
+        original_version = parsecache.PARSER_VERSION
+        parsecache.PARSER_VERSION = original_version + 1
+        try:
+            self.assertIsNone(cache.get("abc"))
+        finally:
+            parsecache.PARSER_VERSION = original_version
+
+    def test_evict_least_recently_used(self):
+        cache = ParseCache(self.cache_dir, max_bytes=250)
+        for i, key in enumerate(("old", "used", "new")):
+            cache.put(key, "x" * 100)
+            path = cache.entry_path(key)
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        # Reading "old" makes it the most recently used entry
+        cache.get("old")
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("used"))
+        self.assertIsNotNone(cache.get("old"))
+        self.assertIsNotNone(cache.get("new"))
+
+
+class TestParseCacheBuild(SiteTestCase):
+    def test_second_build_hits_and_matches(self):
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        for name in ("a", "b"):
+            self.write(os.path.join(self.content_dir, f"{name}.md"), f"# {name}\n\nSee [home](/)")
+
+        outputs = []
+        for run in range(2):
+            cache = ParseCache(os.path.join(self.root, "parse"))
+            dest_dir = os.path.join(self.root, f"docs{run}")
+            generate_pages_recursive(self.content_dir, self.template_path, dest_dir, "/site/", parse_cache=cache)
+            outputs.append(read_file(os.path.join(dest_dir, "a.html")))
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('href="/site/"', outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from fixtures import SiteTestCase, read_tree
+from gencontent import generate_pages_recursive
+from profiler import NULL_PROFILER, NULL_SPAN, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_span_records_event(self):
+        profiler = Profiler()
+        with profiler.span("read", "page", {"page": "a.md"}):
+            pass
+        self.assertEqual(len(profiler.events), 1)
+        name, category, start_ns, end_ns, pid, args = profiler.events[0]
+        self.assertEqual((name, category, pid, args), ("read", "page", os.getpid(), {"page": "a.md"}))
+        self.assertLessEqual(start_ns, end_ns)
+
+    def test_chrome_trace_events(self):
+        profiler = Profiler()
+        profiler.extend([("copy", "asset", 2000, 5000, 42, {"file": "a.png"})])
+        event = profiler.to_chrome_trace()["traceEvents"][0]
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual((event["ts"], event["dur"], event["tid"]), (2.0, 3.0, 42))
+        self.assertEqual(event["args"], {"file": "a.png"})
+
+    def test_slowest_pages(self):
+        profiler = Profiler()
+        profiler.extend([
+            ("page", "page", 0, 100, 1, {"page": "fast.md"}),
+            ("read", "page", 0, 40, 1, {"page": "fast.md"}),
+            ("page", "page", 0, 300, 1, {"page": "slow.md"}),
+            ("read", "page", 0, 200, 1, {"page": "slow.md"}),
+            ("copy", "asset", 0, 900, 1, {"file": "big.png"}),
+        ])
+        self.assertEqual(
+            profiler.slowest_pages(1),
+            [("slow.md", 300, {"read": 200})],
+        )
+
+    def test_null_profiler_records_nothing(self):
+        self.assertFalse(NULL_PROFILER.enabled)
+        with NULL_PROFILER.span("read", "page") as span:
+            self.assertIs(span, NULL_SPAN)
+        NULL_PROFILER.extend([("read", "page", 0, 1, 1, None)])
+        self.assertEqual(len(NULL_PROFILER.events), 0)
+
+
+class TestProfilerBuild(SiteTestCase):
+    def test_profiled_build_records_every_stage_and_same_output(self):
+        self.write(self.template_path, "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\nSome **text** and [a link](/blog)")
+
+        profiler = Profiler()
+        generate_pages_recursive(self.content_dir, self.template_path, os.path.join(self.root, "profiled"), "/site/", profiler=profiler)
+        generate_pages_recursive(self.content_dir, self.template_path, os.path.join(self.root, "plain"), "/site/")
+
+        stages = {name for name, _, _, _, _, _ in profiler.events}
+        self.assertEqual(stages, {"page", "read", "block_parse", "inline_parse", "html_serialize", "template_fill", "write"})
+        self.assertEqual(read_tree(os.path.join(self.root, "profiled")), read_tree(os.path.join(self.root, "plain")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase
+from gencontent import PageResult
+from pageindex import PageIndex
+from search import build_search_index, markdown_terms, shard_name
+from urls import UrlResolver
+
+
+class TestSearchTerms(unittest.TestCase):
+    def test_markdown_terms_skip_urls_and_syntax(self):
+        terms = markdown_terms(StringIO("---\ntitle: Ignored\n---\n# The Ring\n\nThe **ring** of [power](/rings/power) ![Sauron](/eye.png)\n\n- a b c"))
+        self.assertEqual(terms, {"the": 2, "ring": 2, "of": 1, "power": 1, "sauron": 1})
+
+    def test_markdown_terms_of_code_and_lists(self):
+        terms = markdown_terms(StringIO("---\ntitle: x\n---\n# Ring\n\n```\ncode ring\n```\n\n1. one ring\n2. two"))
+        self.assertEqual(terms, {"ring": 3, "code": 1, "one": 1, "two": 1})
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("ri"), "ri")
+        self.assertEqual(shard_name("é"), "_c3a9")
+
+
+class TestBuildSearchIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state_path = os.path.join(self.cache_dir, "search.json")
+        self.page_index = PageIndex(None)
+        self.results = []
+        self.add_page("ring", "# Ring\n\nOne ring to rule them")
+        self.add_page("tom", "# Tom\n\nOld Tom Bombadil")
+
+    def add_page(self, name, markdown, source_hash="v1"):
+        from_path = os.path.join(self.root, f"{name}.md")
+        self.write(from_path, markdown)
+        self.page_index.pages[from_path] = {"title": name.title(), "url": f"/{name}/"}
+        self.results = [result for result in self.results if result.from_path != from_path]
+        self.results.append(PageResult(from_path, os.path.join(self.dest_dir, name, "index.html"), source_hash))
+
+    def build(self, url_resolver=None):
+        with redirect_stdout(StringIO()):
+            return build_search_index(self.results, self.page_index, self.dest_dir, self.state_path, url_resolver=url_resolver)
+
+    def read_json(self, *parts):
+        with open(os.path.join(self.dest_dir, "search", *parts), 'r') as file:
+            return json.load(file)
+
+    def test_index_files(self):
+        report = self.build()
+        self.assertEqual(report.pages_tokenized, 2)
+        self.assertEqual(self.read_json("docs.json"), {"0": ["/ring/", "Ring"], "1": ["/tom/", "Tom"]})
+        self.assertEqual(self.read_json("shards", "ri.json"), {"ring": [[0, 3]]})
+        self.assertEqual(self.read_json("shards", "to.json"), {"to": [[0, 1]], "tom": [[1, 3]]})
+        self.assertIn("ri", self.read_json("index.json")["shards"])
+
+    def test_only_changed_pages_are_tokenized(self):
+        self.build()
+        self.add_page("tom", "# Tom\n\nTom sings", source_hash="v2")
+        report = self.build()
+        self.assertEqual(report.pages_tokenized, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "search", "shards", "bo.json")))
+        self.assertEqual(self.read_json("shards", "si.json"), {"sings": [[1, 1]]})
+        self.assertEqual(self.read_json("shards", "ri.json"), {"ring": [[0, 3]]})
+
+    def test_urls_include_the_basepath(self):
+        self.build(UrlResolver("/ssg/"))
+        self.assertEqual(self.read_json("docs.json"), {"0": ["/ssg/ring/", "Ring"], "1": ["/ssg/tom/", "Tom"]})
+        report = self.build(UrlResolver("/other/"))
+        self.assertEqual(report.pages_tokenized, 0)
+        self.assertEqual(self.read_json("docs.json"), {"0": ["/other/ring/", "Ring"], "1": ["/other/tom/", "Tom"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
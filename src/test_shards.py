@@ -0,0 +1,77 @@
+import argparse
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from builder import Site
+from fixtures import SiteTestCase, read_tree
+from shards import page_shard, parse_shard, shard_cache_dir, shard_dest_dir
+
+
+class TestShardHelpers(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        for value in ["0/3", "4/3", "1/0", "a/b", "3"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_page_shard_is_stable_and_spreads_pages(self):
+        self.assertEqual(page_shard("blog/tom/index.md", 4), page_shard("blog/tom/index.md", 4))
+        counts = {}
+        for i in range(400):
+            shard = page_shard(f"blog/post{i}/index.md", 4)
+            counts[shard] = counts.get(shard, 0) + 1
+        self.assertEqual(sorted(counts), [1, 2, 3, 4])
+        self.assertGreater(min(counts.values()), 60)
+
+
+class TestShardedBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shard_dir = os.path.join(self.root, "shards")
+        self.write(self.template_path, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.static_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\n[Blog](/blog/)")
+        for i in range(12):
+            self.write(os.path.join(self.content_dir, "blog", f"post{i}", "index.md"), f"---\ndate: 2024-01-{i + 10}\n---\n# Post {i}\n\n[Home](/)")
+
+    def config(self, name, **options):
+        return self.site_config(
+            dest_dir=os.path.join(self.root, name, "docs"),
+            cache_dir=os.path.join(self.root, name, "cache"),
+            basepath="/site/",
+            site_url="https://example.com",
+            search=True,
+            check_links=True,
+            **options,
+        )
+
+    def build_shard(self, index, count):
+        config = self.config("unused", shard=(index, count))
+        config.dest_dir = shard_dest_dir(self.shard_dir, index, count)
+        config.cache_dir = shard_cache_dir(self.shard_dir, index, count)
+        config.changes_path = os.path.join(config.cache_dir, "changes.json")
+        return Site(config).build()
+
+    def test_merged_shards_match_a_single_build(self):
+        with redirect_stdout(StringIO()):
+            Site(self.config("single")).build()
+            shard_pages = [len(self.build_shard(index, 3).results) for index in range(1, 4)]
+            report = Site(self.config("merged")).merge(3, self.shard_dir)
+        self.assertEqual(sum(shard_pages), 13)
+        self.assertEqual(report.broken_links, [])
+        single = read_tree(os.path.join(self.root, "single", "docs"))
+        self.assertIn(os.path.join("blog", "page", "2", "index.html"), single)
+        self.assertIn("sitemap.xml", single)
+        self.assertEqual(read_tree(os.path.join(self.root, "merged", "docs")), single)
+
+    def test_merge_needs_every_shard(self):
+        with redirect_stdout(StringIO()):
+            self.build_shard(1, 2)
+            with self.assertRaisesRegex(ValueError, "Shard 2/2 has not been built"):
+                Site(self.config("merged")).merge(2, self.shard_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+
+from fixtures import SiteTestCase
+from htmlnode import LeafNode, ParentNode
+from template import compile_template, load_template
+
+
+class TestTemplateCompileTemplate(unittest.TestCase):
+    def test_render_title_and_content(self):
+        template = compile_template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        html = template.render({"Title": "Hello", "Content": "<p>text</p>"})
+        self.assertEqual(html, "<title>Hello</title><article><p>text</p></article>")
+
+    def test_variable_names(self):
+        template = compile_template("{{ Title }}{{Content}}{{ author }}")
+        self.assertEqual(template.variable_names(), ["Title", "Content", "author"])
+
+    def test_repeated_variable(self):
+        template = compile_template("<h1>{{ Title }}</h1><title>{{ Title }}</title>")
+        self.assertEqual(template.render({"Title": "A"}), "<h1>A</h1><title>A</title>")
+
+    def test_missing_variable_renders_empty(self):
+        template = compile_template("<p>{{ date }}</p>")
+        self.assertEqual(template.render({}), "<p></p>")
+
+    def test_non_string_variable(self):
+        template = compile_template("<p>{{ count }}</p>")
+        self.assertEqual(template.render({"count": 3}), "<p>3</p>")
+
+    def test_basepath_rewrites_template_attributes(self):
+        template = compile_template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        html = template.render({"Content": '<a href="/blog">blog</a>'})
+        self.assertEqual(html, '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/blog">blog</a>')
+
+    def test_template_without_variables(self):
+        template = compile_template("<p>static</p>")
+        self.assertEqual(template.render({"Title": "unused"}), "<p>static</p>")
+
+    def test_render_to_streams_nodes_and_generators(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}{{ Footer }}")
+        chunks = []
+        template.render_to(chunks.append, {
+            "Title": "A",
+            "Content": ParentNode("p", [LeafNode("b", "x")]),
+            "Footer": (chunk for chunk in ["<footer>", "</footer>"]),
+        })
+        self.assertEqual("".join(chunks), "<title>A</title><p><b>x</b></p><footer></footer>")
+        self.assertEqual(
+            template.render({"Title": "A", "Content": ParentNode("p", [LeafNode("b", "x")])}),
+            "<title>A</title><p><b>x</b></p>",
+        )
+
+
+class TestTemplateLoadTemplate(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template_path, "<title>{{ Title }}</title>")
+
+    def test_load_template_is_cached(self):
+        self.assertIs(load_template(self.template_path), load_template(self.template_path))
+
+    def test_load_template_is_cached_per_basepath(self):
+        self.assertIsNot(load_template(self.template_path), load_template(self.template_path, "/site/"))
+
+    def test_load_template_recompiles_after_change(self):
+        first = load_template(self.template_path)
+        self.write(self.template_path, "<h1>{{ Title }}</h1><p>changed</p>")
+        second = load_template(self.template_path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render({"Title": "A"}), "<h1>A</h1><p>changed</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from textnode import TextNode, TextType, text_node_to_html_node
+from urls import UrlResolver
 
 
 class TestTextNode(unittest.TestCase):
@@ -29,6 +30,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD, "www.example.com")
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_text(self):
         node = TextNode("This is a text node", TextType.TEXT)
         html_node = text_node_to_html_node(node)
@@ -71,5 +76,12 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(html_node.value, "")
         self.assertEqual(html_node.props, {'src':'https://www.google.com/images', 'alt': 'This is a text node'})
 
+    def test_link_and_image_urls_are_resolved(self):
+        resolve_url = UrlResolver("/site/").resolve
+        link = text_node_to_html_node(TextNode("blog", TextType.LINK, '/blog/'), resolve_url)
+        self.assertEqual(link.props, {'href': '/site/blog/'})
+        image = text_node_to_html_node(TextNode("logo", TextType.IMAGE, '/logo.png'), resolve_url)
+        self.assertEqual(image.props, {'src': '/site/logo.png', 'alt': 'logo'})
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from urls import UrlResolver, resolve_attribute_urls
+
+
+class TestUrlResolver(unittest.TestCase):
+    def test_root_relative_urls_get_basepath(self):
+        resolver = UrlResolver("/site/")
+        self.assertEqual(resolver.resolve("/blog/tom/"), "/site/blog/tom/")
+        self.assertEqual(resolver.resolve("/"), "/site/")
+
+    def test_other_urls_pass_through(self):
+        resolver = UrlResolver("/site/")
+        for url in ("https://example.com/a", "//cdn.example.com/a.js", "mailto:me@example.com", "#top", "../other/", "image.png"):
+            self.assertEqual(resolver.resolve(url), url)
+
+    def test_default_basepath_changes_nothing(self):
+        self.assertEqual(UrlResolver().resolve("/blog/"), "/blog/")
+
+    def test_resolve_attribute_urls(self):
+        html = '<a href="/a">x</a><img src="/b.png" alt="/c" /><p>href="/d"</p>'
+        self.assertEqual(
+            resolve_attribute_urls(html, UrlResolver("/site/").resolve),
+            '<a href="/site/a">x</a><img src="/site/b.png" alt="/c" /><p>href="/site/d"</p>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type: TextType, url=None):
         self.text = text
         self.text_type = text_type
@@ -24,7 +26,9 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
-def text_node_to_html_node(text_node: TextNode):
+def text_node_to_html_node(text_node: TextNode, resolve_url=None):
+    """resolve_url, when given, maps link and image URLs as written to the
+    URLs emitted in the page (see urls.UrlResolver)."""
     match text_node.text_type: 
         case TextType.TEXT:
             return LeafNode(None, text_node.text)
@@ -35,8 +39,10 @@ def text_node_to_html_node(text_node: TextNode):
         case TextType.CODE:
             return LeafNode('code', text_node.text)
         case TextType.LINK:
-            return LeafNode('a', text_node.text, {'href': text_node.url})
+            url = text_node.url if resolve_url is None else resolve_url(text_node.url)
+            return LeafNode('a', text_node.text, {'href': url})
         case TextType.IMAGE:
-            return LeafNode('img', "", {'src': text_node.url, 'alt': text_node.text})
+            url = text_node.url if resolve_url is None else resolve_url(text_node.url)
+            return LeafNode('img', "", {'src': url, 'alt': text_node.text})
         case _:
             raise ValueError(f"invalid text type: {text_node.text_type}")    
@@ -0,0 +1,42 @@
+import re
+
+
+url_attribute_regex = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+class UrlResolver:
+    """Turns URLs as written in content and templates into URLs that work when
+    the site is served from basepath.
+
+    Root-relative URLs (/blog/) get the basepath prefixed, after being mapped
+    to their fingerprinted name when assets (see fingerprint.AssetMap) has
+    one. Absolute URLs (https://..., mailto:..., //host/...), fragments and
+    page-relative links are returned unchanged."""
+
+    def __init__(self, basepath='/', assets=None):
+        self.basepath = basepath
+        self.assets = assets
+
+    @property
+    def key(self):
+        """Identifies the mapping, for caches of output that embeds resolved URLs."""
+        if self.assets is None:
+            return self.basepath
+        return f"{self.basepath}\0{self.assets.digest}"
+
+    def resolve(self, url):
+        if url is None or not url.startswith('/') or url.startswith('//'):
+            return url
+        if self.assets is not None:
+            url = self.assets.lookup(url)
+        if self.basepath == '/':
+            return url
+        return self.basepath + url[1:]
+
+    def __repr__(self) -> str:
+        return f"UrlResolver({self.basepath}, assets={self.assets})"
+
+
+def resolve_attribute_urls(html, resolve_url):
+    """Apply resolve_url to every href and src attribute value in html."""
+    return url_attribute_regex.sub(lambda match: f'{match.group(1)}="{resolve_url(match.group(2))}"', html)